@@ -3,17 +3,18 @@ AI Medical Chatbot - Main Application
 Optimized for LLaMA-3 8B Q3_K_S (3.2GB) on 4GB VRAM systems
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 import json
-import csv
-import io
+import math
 import os
 import sys
+import threading
 import traceback
 import re
+import signal
 from datetime import datetime, date, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 import warnings
@@ -21,7 +22,21 @@ warnings.filterwarnings('ignore')
 from sqlalchemy import text  
 
 from config import Config
-from database.models import db, User, ChatHistory, UserAnalytics
+from database.models import db, User, ChatHistory, UserAnalytics, UserIntentCount
+from database.db_handler import DatabaseHandler
+from database.stats_service import UserStatsService
+from database.search import ChatHistorySearch, highlight_text
+from database.export import EXPORT_FORMATS, export_history
+from database.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_history_page
+from database.write_behind import ChatWriteBehind, new_chat_row
+from database.migrations import run_migrations
+from database.engine import build_engine_options, install_sqlite_pragmas, normalize_database_uri, sqlite_pragmas
+from utils.inference_scheduler import InferenceScheduler, SchedulerSaturated
+from utils.model_readiness import ModelReadiness, WARMING, READY, DEGRADED
+from utils.background_tasks import BackgroundTaskQueue
+from utils.pii_handler import pii_handler
+from utils.safety_pipeline import SafetyPipeline
+from utils.keyword_matcher import EMERGENCY_TIERS, EMERGENCY, HIGH_RISK, FALLBACK_EMERGENCY_WORDS, check_emergency, inappropriate_matcher
 
 from flask_socketio import SocketIO, emit, join_room
 import json
@@ -34,9 +49,49 @@ app = Flask(__name__)
 app.config.from_object(Config)
 Config.init_app(app)
 
+app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config)
+
 
 db.init_app(app)
 
+user_stats_service = UserStatsService(ttl_seconds=app.config['USER_STATS_CACHE_TTL'])
+chat_search = ChatHistorySearch()
+
+
+def run_in_app_context(task):
+    """Background tasks query the database, so they need an app context"""
+    with app.app_context():
+        return task()
+
+
+background_tasks = BackgroundTaskQueue(
+    name='chat-side-effects',
+    max_size=app.config['BACKGROUND_TASK_QUEUE_SIZE'],
+    wrapper=run_in_app_context
+)
+
+
+def on_chat_batch_flushed(rows):
+    """Side effects of a write-behind batch, once its rows are committed"""
+    for row in rows:
+        user_stats_service.invalidate(row['user_id'])
+        background_tasks.submit(publish_chat_update, row['user_id'], chat_update_payload(row))
+
+
+chat_write_behind = None
+if app.config['WRITE_BEHIND_ENABLED']:
+    chat_write_behind = ChatWriteBehind(
+        batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+        flush_interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL'],
+        max_pending=app.config['WRITE_BEHIND_MAX_PENDING'],
+        max_batch_attempts=app.config['WRITE_BEHIND_MAX_ATTEMPTS'],
+        wrapper=run_in_app_context,
+        on_flush=on_chat_batch_flushed
+    )
+    print(f"✅ Chat write-behind enabled (batch: {app.config['WRITE_BEHIND_BATCH_SIZE']}, "
+          f"interval: {app.config['WRITE_BEHIND_FLUSH_INTERVAL']}s)")
+
 
 socketio = SocketIO(
     app, 
@@ -116,25 +171,107 @@ def check_system_resources():
 system_info = check_system_resources()
 
 
-# ML Models Initialization - CORRECTED FOR Q3_K_M
+# Fallback Classes - served while models load and if loading fails
 
 
-ml_models_loaded = False
-rag_system = None
-safety_checker = None
+class FallbackSafetyChecker:
+    # The ML checker also refuses security topics; a medical fallback should not refuse "virus"
+    ALLOWED_INAPPROPRIATE_TIERS = {'security'}
+    
+    def __init__(self):
+        self.emergency_keywords = EMERGENCY_TIERS[EMERGENCY] + FALLBACK_EMERGENCY_WORDS
+        self.high_risk_symptoms = EMERGENCY_TIERS[HIGH_RISK]
+    
+    def check_emergency(self, text):
+        """Check for emergency situations"""
+        return check_emergency(text, fallback_words=True)
+    
+    def validate_query(self, text, check_toxicity=True):
+        """Validate if query is appropriate (no toxicity model in the fallback)"""
+        if len(text) < 3:
+            return False, "Query too short. Please provide more details."
+        
+        if len(text) > 1000:
+            return False, "Query too long. Please keep it under 1000 characters."
+        
+        
+        if any(hit.tier not in self.ALLOWED_INAPPROPRIATE_TIERS for hit in inappropriate_matcher.find_all(text)):
+            return False, "This query contains inappropriate requests. Please consult a healthcare professional directly."
+        
+        return True, "Valid query"
+    
+    def contains_pii(self, text):
+        """Check for Personally Identifiable Information"""
+        return pii_handler.contains_pii(text)
 
-print("\n📥 Loading ML models...")
 
-try:
-    
-    from ml_models.rag_system import OptimizedMedicalRAG
+
+class FallbackMedicalRAG:
+    def __init__(self):
+        self.knowledge_base = [
+            {
+                "question": "What are common flu symptoms?",
+                "answer": "Common flu symptoms include fever, cough, sore throat, body aches, headache, chills, and fatigue. Symptoms usually come on suddenly.",
+                "category": "infectious_diseases",
+                "severity": "moderate"
+            },
+            {
+                "question": "How to manage high blood pressure?",
+                "answer": "High blood pressure can be managed through lifestyle changes: regular exercise, healthy diet low in sodium, weight management, limited alcohol, no smoking, stress reduction, and prescribed medications if needed.",
+                "category": "chronic_conditions",
+                "severity": "serious"
+            }
+        ]
+        self.llama_model = None
+        
+        print("✅ Fallback RAG System created")
     
-    print("✅ OptimizedMedicalRAG module imported")
+    def prepare_query(self, user_query):
+        """No retrieval stage in fallback mode"""
+        return None
     
-   
-    from config import Config
+    def query(self, user_query, prepared=None, check_cache=True):
+        """Simple query response"""
+        response = f"I understand you're asking about: {user_query}\n\n"
+        response += "I'm your AI medical assistant. For accurate medical information, please consult with a healthcare professional.\n\n"
+        response += "**General Health Tips:**\n"
+        response += "• Stay hydrated and get enough rest\n"
+        response += "• Eat a balanced diet with fruits and vegetables\n"
+        response += "• Exercise regularly\n"
+        response += "• Get regular health check-ups\n\n"
+        response += "**⚠️ Important:** I provide general information only. Always consult healthcare professionals for medical advice."
+        
+        return {
+            'response': response,
+            'confidence': 0.5,
+            'intent': 'general_health',
+            'timestamp': datetime.now().isoformat(),
+            'model': 'fallback',
+            'processing_time': 0.1
+        }
     
-    optimized_config = {
+    def query_stream(self, user_query, prepared=None, check_cache=True):
+        """Single-event stream matching OptimizedMedicalRAG.query_stream"""
+        yield {'type': 'done', 'result': self.query(user_query)}
+
+
+safety_checker = FallbackSafetyChecker()
+safety_pipeline = SafetyPipeline(**Config.get_safety_pipeline_config())
+rag_system = FallbackMedicalRAG()
+
+
+# ML Models Initialization - CORRECTED FOR Q3_K_M
+# Models load on a background thread so the server binds its port immediately;
+# the fallbacks above answer until the real ones are swapped in
+
+
+ml_models_loaded = False
+model_readiness = ModelReadiness()
+
+
+def build_rag_config():
+    """RAG / LLaMA configuration derived from app.config"""
+    return {
         'llama_config': {
             'n_ctx': app.config['LLAMA_CONTEXT_SIZE'],      
             'n_gpu_layers': app.config['LLAMA_N_GPU_LAYERS'], 
@@ -143,193 +280,160 @@ try:
             'offload_kqv': True,   
             'use_mmap': True,
             'f16_kv': True,
-            'n_batch': app.config['LLAMA_BATCH_SIZE']  
+            'n_batch': app.config['LLAMA_BATCH_SIZE'],
+            'cache_system_prompt': app.config['LLAMA_CACHE_SYSTEM_PROMPT']
+        },
+        'embedding_model': app.config['EMBEDDING_MODEL'],
+        'embedding_backend': app.config['EMBEDDING_BACKEND'],
+        'embedding_onnx_path': app.config['EMBEDDING_ONNX_PATH'],
+        'embedding_cache': Config.get_embedding_cache_config(),
+        'response_cache': {
+            'enabled': app.config['RESPONSE_CACHE_ENABLED'],
+            'threshold': app.config['RESPONSE_CACHE_THRESHOLD'],
+            'max_entries': app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+            'ttl_seconds': app.config['RESPONSE_CACHE_TTL'],
+            'persist_path': app.config['RESPONSE_CACHE_PATH'] or None
         },
-        'embedding_model': app.config['EMBEDDING_MODEL']
+        'vector_index': Config.get_vector_index_config(),
+        'micro_batch': {
+            'enabled': app.config['MICRO_BATCH_ENABLED'],
+            'max_batch_size': app.config['MICRO_BATCH_MAX_SIZE'],
+            'max_wait_ms': app.config['MICRO_BATCH_MAX_WAIT_MS']
+        }
     }
+
+
+def warm_up_models(rag):
+    """Run one embedding + retrieval pass and a short generation so the first chat is fast"""
+    rag.prepare_query("What are common flu symptoms?")
     
-    # Initialize RAG System with Q3_K_M optimizations
-    print(f"🔧 Configuring for Q3_K_M model (3.74GB)...")
-    print(f"   • Context size: {app.config['LLAMA_CONTEXT_SIZE']}")
-    print(f"   • GPU layers: {app.config['LLAMA_N_GPU_LAYERS']}")
-    print(f"   • Max tokens: {app.config['LLAMA_MAX_TOKENS']}")
-    print(f"   • Batch size: {app.config['LLAMA_BATCH_SIZE']}")
-    print(f"   • Temperature: {app.config['LLAMA_TEMPERATURE']}")
-    
-    rag_system = OptimizedMedicalRAG(
-        
-        knowledge_base_path=app.config.get('KNOWLEDGE_BASE_PATH', 'data/medical_knowledge/medical_faqs.json'),
-        llama_model_path=app.config.get('LLAMA_MODEL_PATH'),
-        vector_db_path=app.config.get('VECTOR_DB_PATH', 'data/vector_db/medical_index.faiss'),
-        config=optimized_config
-    )
-    print(f"\n🔍 APP DEBUG: RAG system initialized")
-    print(f"🔍 APP DEBUG: LLaMA model loaded: {'✅ YES' if rag_system.llama_model else '❌ NO'}")
-    print(f"🔍 APP DEBUG: RAG class: {rag_system.__class__.__name__}")
-    
-    print("✅ Medical RAG System initialized")
+    if rag.llama_model:
+        print("🔥 Pre-warming LLaMA model...")
+        rag.llama_model.generate_response(
+            prompt="Hello",
+            max_tokens=10,
+            temperature=0.1
+        )
+        print("✅ Model pre-warmed - first response will be faster")
+
+
+def load_ml_models():
+    """Load the safety checker and RAG system, then warm them up (runs on the loader thread)"""
+    global rag_system, safety_checker, ml_models_loaded
     
+    print("\n📥 Loading ML models...")
     
-   
-    # 🚀 PRE-WARM MODEL FOR FASTER FIRST RESPONSE
-  
-    if rag_system.llama_model:
+    try:
+        
+        from ml_models.rag_system import OptimizedMedicalRAG
+        
+        print("✅ OptimizedMedicalRAG module imported")
+        
+        # Initialize RAG System with Q3_K_M optimizations
+        print(f"🔧 Configuring for Q3_K_M model (3.74GB)...")
+        print(f"   • Context size: {app.config['LLAMA_CONTEXT_SIZE']}")
+        print(f"   • GPU layers: {app.config['LLAMA_N_GPU_LAYERS']}")
+        print(f"   • Max tokens: {app.config['LLAMA_MAX_TOKENS']}")
+        print(f"   • Batch size: {app.config['LLAMA_BATCH_SIZE']}")
+        print(f"   • Temperature: {app.config['LLAMA_TEMPERATURE']}")
+        
+        rag = OptimizedMedicalRAG(
+            
+            knowledge_base_path=app.config.get('KNOWLEDGE_BASE_PATH', 'data/medical_knowledge/medical_faqs.json'),
+            llama_model_path=app.config.get('LLAMA_MODEL_PATH'),
+            vector_db_path=app.config.get('VECTOR_DB_PATH', 'data/vector_db/medical_index.faiss'),
+            config=build_rag_config()
+        )
+        print(f"\n🔍 APP DEBUG: RAG system initialized")
+        print(f"🔍 APP DEBUG: LLaMA model loaded: {'✅ YES' if rag.llama_model else '❌ NO'}")
+        print(f"🔍 APP DEBUG: RAG class: {rag.__class__.__name__}")
+        
+        # Initialize Safety Checker
         try:
-                print("🔥 Pre-warming LLaMA model...")
-                
-                warmup_response = rag_system.llama_model.generate_response(
-                    prompt="Hello",
-                    max_tokens=10,
-                    temperature=0.1
-                )
-                print("✅ Model pre-warmed - first response will be faster")
+            from ml_models.safety_checker import SafetyChecker
+            safety_checker = SafetyChecker(toxicity_config=Config.get_toxicity_config())
+            print("✅ Safety Checker loaded")
         except Exception as e:
-                print(f"⚠️ Pre-warm failed: {e}")
+            print(f"⚠️  Using fallback safety checker: {e}")
+        
+    except Exception as e:
+        print(f"❌ ML initialization error: {e}")
+        traceback.print_exc()
+        model_readiness.set_state(DEGRADED, f"Model loading failed, using fallback responses: {e}")
+        return
     
-    # Initialize Safety Checker
+    model_readiness.set_state(WARMING, "Running warm-up pass")
+    warm_up_error = None
     try:
-        from ml_models.safety_checker import SafetyChecker
-        safety_checker = SafetyChecker()
-        print("✅ Safety Checker loaded")
-    except ImportError:
-        print("⚠️  Using fallback safety checker")
-        safety_checker = None
+        warm_up_models(rag)
+    except Exception as e:
+        warm_up_error = e
+        print(f"⚠️ Pre-warm failed: {e}")
     
+    rag_system = rag
     ml_models_loaded = True
     
-    
     print("\n📊 Model Information:")
     print(f"   • Model: LLaMA-3 8B Q3_K_M (3.74GB)")
     print(f"   • Status: {'✅ Loaded' if rag_system.llama_model else '❌ Not available'}")
-    print(f"   • Embeddings: {rag_system.embedding_generator.model_name}")
+    print(f"   • Embeddings: {rag_system.embedding_generator.model_name} ({rag_system.embedding_generator.backend})")
     print(f"   • Knowledge Base: {len(rag_system.knowledge_base)} entries")
     
-except ImportError as e:
-    print(f"❌ Failed to import ML modules: {e}")
-    traceback.print_exc()
-except Exception as e:
-    print(f"❌ ML initialization error: {e}")
-    traceback.print_exc()
+    if not rag_system.llama_model:
+        model_readiness.set_state(DEGRADED, "LLaMA model unavailable, running in retrieval-only mode")
+    elif warm_up_error is not None:
+        model_readiness.set_state(DEGRADED, f"Warm-up failed: {warm_up_error}")
+    else:
+        model_readiness.set_state(READY, "LLaMA-3 8B loaded and warmed up")
+
+
+if app.config['LAZY_MODEL_LOADING']:
+    threading.Thread(target=load_ml_models, name='model-loader', daemon=True).start()
+else:
+    load_ml_models()
+
+
+# Inference Scheduler - the only path into the shared LLaMA instance
 
 
-# Fallback Classes (if ML models fail)
+inference_scheduler = InferenceScheduler(
+    max_queue=app.config['INFERENCE_MAX_QUEUE'],
+    max_per_user=app.config['INFERENCE_MAX_PER_USER']
+)
+print(f"✅ Inference scheduler ready (queue: {app.config['INFERENCE_MAX_QUEUE']}, per user: {app.config['INFERENCE_MAX_PER_USER']})")
 
 
-if not safety_checker:
-    print("⚠️  Creating fallback Safety Checker")
+def prepare_rag_query(user_query):
+    """
+    Run embedding + retrieval on the request thread, batched with other
+    concurrent requests, so the scheduler job only has to generate
     
-    class FallbackSafetyChecker:
-        def __init__(self):
-            self.emergency_keywords = [
-                'heart attack', 'stroke', 'suicide', 'severe pain',
-                'bleeding heavily', 'can\'t breathe', 'unconscious',
-                'chest pain', 'shortness of breath', 'sudden paralysis',
-                'choking', 'overdose', 'poisoning', 'seizure',
-                'broken bone', 'deep cut', 'difficulty breathing',
-                'chest pressure', 'paralysis', 'dying', 'emergency'
-            ]
-            
-            self.high_risk_symptoms = [
-                'severe headache', 'high fever', 'seizure',
-                'broken bone', 'deep cut', 'poisoning',
-                'difficulty breathing', 'chest pressure'
-            ]
-        
-        def check_emergency(self, text):
-            """Check for emergency situations"""
-            text_lower = text.lower()
-            
-            for keyword in self.emergency_keywords:
-                if keyword in text_lower:
-                    return True, "EMERGENCY_DETECTED", keyword
-            
-            for symptom in self.high_risk_symptoms:
-                if symptom in text_lower:
-                    return True, "HIGH_RISK_SYMPTOM", symptom
-            
-            return False, "SAFE", ""
-        
-        def validate_query(self, text):
-            """Validate if query is appropriate"""
-            if len(text) < 3:
-                return False, "Query too short. Please provide more details."
-            
-            if len(text) > 1000:
-                return False, "Query too long. Please keep it under 1000 characters."
-            
-            
-            inappropriate_patterns = [
-                r'\b(diagnose me|prescribe me|cure me|treat me)\b',
-                r'\b(suicide|kill myself|end my life|self-harm)\b',
-                r'\b(overdose|poison|illegal drugs|abuse)\b',
-            ]
-            
-            for pattern in inappropriate_patterns:
-                if re.search(pattern, text, re.IGNORECASE):
-                    return False, "This query contains inappropriate requests. Please consult a healthcare professional directly."
-            
-            return True, "Valid query"
-        
-        def contains_pii(self, text):
-            """Check for Personally Identifiable Information"""
-            patterns = {
-                'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-                'phone': r'\b(\+\d{1,3}[-.]?)?\(?\d{3}\)?[-.]?\d{3}[-.]?\d{4}\b',
-                'ssn': r'\b\d{3}[-.]?\d{2}[-.]?\d{4}\b',
-            }
-            
-            found_pii = []
-            for pii_type, pattern in patterns.items():
-                if re.search(pattern, text):
-                    found_pii.append(pii_type)
-            
-            return len(found_pii) > 0, found_pii
-    
-    safety_checker = FallbackSafetyChecker()
-
-if not rag_system:
-    print("⚠️  Creating fallback RAG System")
-    
-    class FallbackMedicalRAG:
-        def __init__(self):
-            self.knowledge_base = [
-                {
-                    "question": "What are common flu symptoms?",
-                    "answer": "Common flu symptoms include fever, cough, sore throat, body aches, headache, chills, and fatigue. Symptoms usually come on suddenly.",
-                    "category": "infectious_diseases",
-                    "severity": "moderate"
-                },
-                {
-                    "question": "How to manage high blood pressure?",
-                    "answer": "High blood pressure can be managed through lifestyle changes: regular exercise, healthy diet low in sodium, weight management, limited alcohol, no smoking, stress reduction, and prescribed medications if needed.",
-                    "category": "chronic_conditions",
-                    "severity": "serious"
-                }
-            ]
-            
-            print("✅ Fallback RAG System created")
-        
-        def query(self, user_query):
-            """Simple query response"""
-            response = f"I understand you're asking about: {user_query}\n\n"
-            response += "I'm your AI medical assistant. For accurate medical information, please consult with a healthcare professional.\n\n"
-            response += "**General Health Tips:**\n"
-            response += "• Stay hydrated and get enough rest\n"
-            response += "• Eat a balanced diet with fruits and vegetables\n"
-            response += "• Exercise regularly\n"
-            response += "• Get regular health check-ups\n\n"
-            response += "**⚠️ Important:** I provide general information only. Always consult healthcare professionals for medical advice."
-            
-            return {
-                'response': response,
-                'confidence': 0.5,
-                'intent': 'general_health',
-                'timestamp': datetime.now().isoformat(),
-                'model': 'fallback',
-                'processing_time': 0.1
-            }
+    Returns:
+        Prepared query for rag_system.query(), or None to let the job retrieve itself
+    """
+    try:
+        return rag_system.prepare_query(user_query)
+    except Exception as e:
+        print(f"⚠️ Batched retrieval failed, retrying inside the job: {e}")
+        return None
+
+
+def cached_rag_result(prepared, start_time):
+    """
+    Response-cache lookup on the request thread, so cache hits are answered
+    without queueing behind LLaMA generations or being rejected when the
+    scheduler is saturated
     
-    rag_system = FallbackMedicalRAG()
+    Returns:
+        Cached result, or None on a miss (or when retrieval did not run here)
+    """
+    if not prepared or not hasattr(rag_system, 'cached_result'):
+        return None
+    try:
+        return rag_system.cached_result(prepared['embedding'], start_time)
+    except Exception as e:
+        print(f"⚠️ Response cache lookup failed: {e}")
+        return None
 
 
 # Flask-Login User Loader
@@ -346,6 +450,8 @@ def load_user(user_id):
 
 with app.app_context():
     try:
+        if install_sqlite_pragmas(db.engine, sqlite_pragmas(app.config)):
+            print(f"✅ SQLite profile: WAL={app.config['SQLITE_WAL']}, synchronous={app.config['SQLITE_SYNCHRONOUS']}")
        
         if app.config['DEBUG']:
             
@@ -353,6 +459,9 @@ with app.app_context():
         db.create_all()
         print("✅ Database tables created")
         
+        # Bring existing databases up to the current indexes/constraints
+        run_migrations()
+        
        
         admin = User.query.filter_by(username='admin').first()  
         if not admin:
@@ -383,39 +492,6 @@ def sanitize_input(text: str, max_length: int = 1000) -> str:
     text = re.sub(r'\s+', ' ', text)
     return text
 
-def contains_pii(text: str):
-    """
-    Check if text contains Personally Identifiable Information (PII)
-    Returns: (has_pii, pii_types, sanitized_text)
-    """
-    import re
-    
-    pii_patterns = {
-        'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-        'phone': r'\b(\+\d{1,3}[-.]?)?\(?\d{3}\)?[-.]?\d{3}[-.]?\d{4}\b',
-        'ssn': r'\b\d{3}[-.]?\d{2}[-.]?\d{4}\b',
-        'credit_card': r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b',
-    }
-    
-    sanitized = text
-    found_pii = []
-    
-    for pii_type, pattern in pii_patterns.items():
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        for match in matches:
-            found_pii.append(pii_type)
-            
-            if pii_type == 'email':
-                sanitized = sanitized.replace(match.group(), '[EMAIL]')
-            elif pii_type == 'phone':
-                sanitized = sanitized.replace(match.group(), '[PHONE]')
-            elif pii_type == 'ssn':
-                sanitized = sanitized.replace(match.group(), '[SSN]')
-            elif pii_type == 'credit_card':
-                sanitized = sanitized.replace(match.group(), '[CREDIT_CARD]')
-    
-    return len(found_pii) > 0, found_pii, sanitized
-
 def generate_session_id() -> str:
     """Generate unique session ID"""
     import uuid
@@ -478,58 +554,39 @@ def create_emergency_response(keywords: List[str]) -> str:
 def save_chat_to_history(user_id: int, user_query: str, bot_response: str, 
                          intent: str = None, confidence: float = None, 
                          entities: List[Dict] = None, processing_time: float = None) -> ChatHistory:
-    """Save chat to database history AND broadcast real-time update"""
+    """
+    Save chat to database history and schedule the real-time update
+    
+    The chat row and the daily analytics upsert are committed in one
+    transaction; stats recomputation and Socket.IO broadcasts run on the
+    background task queue after the commit. With write-behind enabled the
+    row is queued instead and the returned record has no id yet.
+    """
+    row = new_chat_row(
+        user_id=user_id,
+        user_query=user_query[:500],
+        bot_response=bot_response[:2000],
+        intent=intent,
+        entities=json.dumps(entities) if entities else None,
+        confidence=confidence,
+        processing_time=processing_time
+    )
+    
+    if chat_write_behind and chat_write_behind.enqueue(row):
+        return ChatHistory(**row)
+    
     try:
-        print(f"🔴 DEBUG SAVE: user_id={user_id}, query='{user_query[:50]}...'")
-        print(f"🔴 DEBUG SAVE: intent={intent}, confidence={confidence}")
-        
-        chat_record = ChatHistory(
-            user_id=user_id,
-            user_query=user_query[:500],
-            bot_response=bot_response[:2000],
-            intent=intent,
-            entities=json.dumps(entities) if entities else None,
-            confidence=confidence,
-            processing_time=processing_time,
-            timestamp=datetime.utcnow()
-        )
+        chat_record = ChatHistory(**row)
         
         db.session.add(chat_record)
         
         # Update user analytics
-        update_user_analytics(user_id, intent)
+        update_user_analytics(user_id, intent, confidence)
         
         db.session.commit()
+        user_stats_service.invalidate(user_id)
         
-        
-        saved_id = chat_record.id
-        verify = ChatHistory.query.get(saved_id)
-        print(f"✅ DEBUG SAVE: Record saved with ID={saved_id}, exists={verify is not None}")
-        
-        
-        try:
-            stats = get_user_statistics(user_id)
-            print(f"📡 DEBUG SAVE: Broadcasting stats: {stats}")
-            socketio.emit('dashboard_update', {
-                'user_id': user_id,
-                'stats': stats
-            }, room=f'user_{user_id}')
-            print(f"📡 Real-time update sent for user {user_id}")
-        except Exception as e:
-            print(f"⚠️ Could not send real-time update: {e}")
-            
-        
-        try:
-            broadcast_analytics_update(user_id, {
-                'query': user_query[:100],
-                'intent': intent,
-                'confidence': confidence,
-                'processing_time': processing_time,
-                'timestamp': datetime.utcnow().isoformat()
-            })
-            print(f"📊 Analytics update triggered for user {user_id}")
-        except Exception as e:
-             print(f"⚠️ Could not trigger analytics update: {e}")    
+        background_tasks.submit(publish_chat_update, user_id, chat_update_payload(row))
         
         return chat_record
         
@@ -540,108 +597,41 @@ def save_chat_to_history(user_id: int, user_query: str, bot_response: str,
         db.session.rollback()
         return None
 
-def update_user_analytics(user_id: int, intent: str = None):
-    """Update user analytics"""
+def chat_update_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary of a saved chat for the analytics_update broadcast"""
+    return {
+        'query': row['user_query'][:100],
+        'intent': row['intent'],
+        'confidence': row['confidence'],
+        'processing_time': row['processing_time'],
+        'timestamp': row['timestamp'].isoformat()
+    }
+
+def update_user_analytics(user_id: int, intent: str = None, confidence: float = None):
+    """Stage the daily analytics upsert in the current transaction (the caller commits)"""
+    DatabaseHandler.upsert_daily_analytics(
+        user_id,
+        confidence_sum=confidence or 0.0,
+        intents={intent: 1} if intent else None
+    )
+
+def publish_chat_update(user_id: int, chat_data: Dict[str, Any]):
+    """Recompute stats and push them to the user's dashboard (runs on the background task queue)"""
     try:
-        today = datetime.utcnow().date()
-        analytics = UserAnalytics.query.filter_by(
-            user_id=user_id,
-            date=today
-        ).first()
-        
-        if not analytics:
-            analytics = UserAnalytics(
-                user_id=user_id,
-                date=today,
-                total_chats=0,
-                avg_confidence=0.0,
-                common_intents='{}'
-            )
-            db.session.add(analytics)
-        
-        analytics.total_chats += 1
-        
-        if intent:
-            try:
-                intents_dict = json.loads(analytics.common_intents) if analytics.common_intents else {}
-            except (json.JSONDecodeError, TypeError):
-                intents_dict = {}
-            
-            intents_dict[intent] = intents_dict.get(intent, 0) + 1
-            analytics.common_intents = json.dumps(intents_dict)
-        
-        db.session.commit()
-        return analytics
-        
+        stats = get_user_statistics(user_id)
+        socketio.emit('dashboard_update', {
+            'user_id': user_id,
+            'stats': stats
+        }, room=f'user_{user_id}')
+        print(f"📡 Real-time update sent for user {user_id}")
     except Exception as e:
-        print(f"❌ Error updating analytics: {e}")
-        db.session.rollback()
-        return None
-
+        print(f"⚠️ Could not send real-time update: {e}")
+    
+    broadcast_analytics_update(user_id, chat_data)
 
 def get_user_statistics(user_id):
-    """Get current statistics for a user"""
-    print(f"🔍 DEBUG STATS: Called for user_id={user_id}")
-    
-    
-    all_users = User.query.all()
-    print(f"🔍 DEBUG: All users in DB: {[{'id': u.id, 'name': u.username} for u in all_users]}")
-    
-    all_chats = ChatHistory.query.all()
-    print(f"🔍 DEBUG: All chats in DB: {len(all_chats)} total")
-    
-    
-    total_chats = ChatHistory.query.filter_by(user_id=user_id).count()
-    print(f"🔍 DEBUG: total_chats for user {user_id} = {total_chats}")
-    
-    # Check some actual records
-    user_chats = ChatHistory.query.filter_by(user_id=user_id).all()
-    print(f"🔍 DEBUG: Found {len(user_chats)} chat records for user {user_id}")
-    for i, chat in enumerate(user_chats[:3]):  
-        print(f"   Chat {i+1}: ID={chat.id}, Intent={chat.intent}, Confidence={chat.confidence}")
-    
-    # Average confidence
-    avg_conf_result = db.session.query(db.func.avg(ChatHistory.confidence)).filter_by(user_id=user_id).scalar()
-    print(f"🔍 DEBUG: avg_conf_result raw = {avg_conf_result}")
-    avg_confidence = round((avg_conf_result or 0) * 100, 1)
-    
-    
-    from datetime import datetime, timedelta
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    most_common = db.session.query(
-        ChatHistory.intent,
-        db.func.count(ChatHistory.intent).label('count')
-    ).filter(
-        ChatHistory.user_id == user_id,
-        ChatHistory.timestamp >= thirty_days_ago
-    ).group_by(ChatHistory.intent).order_by(db.desc('count')).first()
-    
-    most_common_intent = most_common[0].replace('_', ' ').upper() if most_common else 'N/A'
-    print(f"🔍 DEBUG: most_common_intent = {most_common_intent}")
-    
-    
-    last_chat = ChatHistory.query.filter_by(user_id=user_id).order_by(ChatHistory.timestamp.desc()).first()
-    if last_chat:
-        print(f"🔍 DEBUG: Last chat timestamp = {last_chat.timestamp}")
-        time_diff = (datetime.utcnow() - last_chat.timestamp).seconds
-        if time_diff < 60:
-            last_active = 'Just now'
-        elif time_diff < 3600:
-            last_active = f'{time_diff//60} min ago'
-        else:
-            last_active = last_chat.timestamp.strftime('%H:%M')
-    else:
-        last_active = 'Never'
-    
-    result = {
-        'total_chats': total_chats,
-        'avg_confidence': avg_confidence,
-        'most_common_intent': most_common_intent,
-        'last_active': last_active
-    }
-    
-    print(f"🔍 DEBUG STATS: Returning {result}")
-    return result
+    """Get current statistics for a user (cached; invalidated when the user's chats change)"""
+    return user_stats_service.get(user_id)
 
 def generate_insights(daily_stats: List[Dict], most_common_intent: str) -> List[Dict]:
     """Generate insights from analytics data"""
@@ -858,6 +848,101 @@ def get_current_user():
     except Exception as e:
         return jsonify({'error': str(e), 'success': False}), 500
 
+def scheduler_busy_response(error: SchedulerSaturated):
+    """429 when the user already has work queued, 503 when the server is saturated"""
+    response = jsonify({
+        'error': str(error),
+        'queue_depth': error.queue_depth,
+        'retry_after': error.retry_after,
+        'success': False
+    })
+    response.status_code = 429 if error.per_user else 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def inference_timeout_response():
+    """503 when a queued inference job did not finish within INFERENCE_JOB_TIMEOUT"""
+    retry_after = max(1, math.ceil(inference_scheduler.estimate_wait()))
+    response = jsonify({
+        'error': 'The medical assistant is taking too long to respond. Please try again shortly.',
+        'timed_out': True,
+        'retry_after': retry_after,
+        'success': False
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def models_warming_response():
+    """503 while the models are still loading or warming up"""
+    status = model_readiness.get_status()
+    retry_after = app.config['MODEL_LOADING_RETRY_AFTER']
+    response = jsonify({
+        'error': 'The medical assistant is warming up. Please try again in a few seconds.',
+        'warming_up': True,
+        'model_state': status['state'],
+        'retry_after': retry_after,
+        'success': False
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def run_chat_safety_checks(data: Dict[str, Any], start_time: datetime):
+    """
+    Safety pre-checks shared by the chat endpoints
+    
+    Returns: (user_query, session_id, early_response) where early_response is
+    a Flask response when the message is answered without calling the model
+    """
+    user_query = (data.get('message') or '').strip()
+    session_id = data.get('session_id', generate_session_id())
+    
+    if not user_query:
+        return user_query, session_id, (jsonify({'error': 'Empty message', 'success': False}), 400)
+    
+   
+    user_query = sanitize_input(user_query, max_length=1000)
+    
+    # Tiered checks: lexical stages first, the toxicity model only for risky messages
+    verdict = safety_pipeline.run(user_query, safety_checker)
+    
+    if verdict.action == 'emergency':
+        keyword = verdict.emergency_keyword
+        processing_time = (datetime.now() - start_time).total_seconds()
+        emergency_response = create_emergency_response([keyword])
+        
+        # Save emergency chat
+        save_chat_to_history(
+            user_id=current_user.id,
+            user_query=user_query,
+            bot_response=emergency_response,
+            intent='emergency',
+            confidence=1.0,
+            entities=[{'type': 'emergency', 'keyword': keyword}],
+            processing_time=processing_time
+        )
+        
+        return user_query, session_id, jsonify({
+            'response': emergency_response,
+            'emergency': True,
+            'intent': 'emergency',
+            'confidence': 1.0,
+            'processing_time': processing_time,
+            'session_id': session_id,
+            'success': True
+        })
+    
+    if verdict.action == 'block':
+        return user_query, session_id, (jsonify({'error': verdict.message, 'success': False}), 400)
+    
+    if verdict.pii_types:
+        print(f"⚠️ PII detected in query: {verdict.pii_types}")
+        user_query = verdict.text
+        log_activity(current_user.id, "PII_DETECTED", f"Types: {verdict.pii_types}")
+    
+    return user_query, session_id, None
+
 @app.route('/api/chat', methods=['POST'])
 @login_required
 def chat():
@@ -868,60 +953,34 @@ def chat():
     
     try:
         data = request.json
-        user_query = data.get('message', '').strip()
-        session_id = data.get('session_id', generate_session_id())
-        
-        if not user_query:
-            return jsonify({'error': 'Empty message', 'success': False}), 400
-        
-       
-        user_query = sanitize_input(user_query, max_length=1000)
-        
-        # Check for emergency
-        is_emergency, emergency_type, keyword = safety_checker.check_emergency(user_query)
-        if is_emergency:
-            processing_time = (datetime.now() - start_time).total_seconds()
-            emergency_response = create_emergency_response([keyword])
-            
-            # Save emergency chat
-            save_chat_to_history(
-                user_id=current_user.id,
-                user_query=user_query,
-                bot_response=emergency_response,
-                intent='emergency',
-                confidence=1.0,
-                entities=[{'type': 'emergency', 'keyword': keyword}],
-                processing_time=processing_time
-            )
-            
-            return jsonify({
-                'response': emergency_response,
-                'emergency': True,
-                'intent': 'emergency',
-                'confidence': 1.0,
-                'processing_time': processing_time,
-                'session_id': session_id,
-                'success': True
-            })
-        
-        # Validate query
-        is_valid, validation_msg = safety_checker.validate_query(user_query)
-        if not is_valid:
-            return jsonify({'error': validation_msg, 'success': False}), 400
-        
-       
-        has_pii, pii_types, sanitized_query = contains_pii(user_query)
-        if has_pii:
-            print(f"⚠️ PII detected in query: {pii_types}")
-            user_query = sanitized_query  
-            log_activity(current_user.id, "PII_DETECTED", f"Types: {pii_types}")
+        user_query, session_id, early_response = run_chat_safety_checks(data, start_time)
+        if early_response is not None:
+            return early_response
         
+        # Emergencies are answered above without the model; everything else waits for it
+        if not model_readiness.serving:
+            return models_warming_response()
         
         print(f"\n🔍 CHAT DEBUG: Calling RAG for: {user_query}")
         print(f"🔍 CHAT DEBUG: RAG has LLaMA: {rag_system.llama_model is not None}")
         
         rag_start = datetime.now()
-        result = rag_system.query(user_query)
+        prepared = prepare_rag_query(user_query)
+        result = cached_rag_result(prepared, rag_start)
+        if result is None:
+            # The job only re-checks the cache if retrieval could not run here
+            try:
+                job = inference_scheduler.submit(
+                    current_user.id, rag_system.query, user_query,
+                    prepared=prepared, check_cache=prepared is None
+                )
+            except SchedulerSaturated as e:
+                return scheduler_busy_response(e)
+            try:
+                result = job.wait(timeout=app.config['INFERENCE_JOB_TIMEOUT'])
+            except TimeoutError:
+                print(f"⚠️ Chat inference timed out after {app.config['INFERENCE_JOB_TIMEOUT']}s")
+                return inference_timeout_response()
         rag_time = (datetime.now() - rag_start).total_seconds()
         
         print(f"🔍 CHAT DEBUG: Got response from: {result.get('model', 'unknown')}")
@@ -959,6 +1018,7 @@ def chat():
             'chat_id': chat_record.id if chat_record else None,
             'model': result.get('model', 'unknown'),
             'optimized': result.get('optimized', False),
+            'cached': result.get('cached', False),
             'success': True
         })
         
@@ -993,56 +1053,257 @@ Please try:
             'processing_time': processing_time
         }), 500
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+@login_required
+def chat_stream():
+    """
+    Streaming chat endpoint (server-sent events)
+    
+    Emits 'delta' events as LLaMA generates and a final 'done' event with the
+    cleaned response and metadata. Emergency, validation and empty-message
+    answers are returned as plain JSON exactly like /api/chat.
+    """
+    start_time = datetime.now()
+    
+    data = request.json or {}
+    user_query, session_id, early_response = run_chat_safety_checks(data, start_time)
+    if early_response is not None:
+        return early_response
+    
+    if not model_readiness.serving:
+        return models_warming_response()
+    
+    user_id = current_user.id
+    
+    prepared = prepare_rag_query(user_query)
+    cached = cached_rag_result(prepared, start_time)
+    
+    job = None
+    if cached is None:
+        try:
+            job = inference_scheduler.submit(
+                user_id, rag_system.query_stream, user_query,
+                prepared=prepared, check_cache=prepared is None, stream=True
+            )
+        except SchedulerSaturated as e:
+            return scheduler_busy_response(e)
+    
+    def generate():
+        try:
+            result = cached or {}
+            if job is not None:
+                for event in job.events(timeout=app.config['INFERENCE_JOB_TIMEOUT']):
+                    if event['type'] == 'delta':
+                        yield sse_event('delta', {'text': event['text']})
+                    else:
+                        result = event['result']
+            
+            response = result.get('response', '')
+            intent = result.get('intent', 'general_health')
+            confidence = result.get('confidence', 0.5)
+            retrieved_info = result.get('retrieved_info', [])
+            total_time = (datetime.now() - start_time).total_seconds()
+            
+            # Persist only once the full, safety-validated response is known
+            chat_record = save_chat_to_history(
+                user_id=user_id,
+                user_query=user_query,
+                bot_response=response,
+                intent=intent,
+                confidence=confidence,
+                entities=retrieved_info,
+                processing_time=total_time
+            )
+            
+            log_activity(user_id, "CHAT_STREAM", 
+                        f"Query: {user_query[:50]}... | Time: {total_time:.2f}s | Intent: {intent}")
+            
+            yield sse_event('done', {
+                'response': response,
+                'intent': intent,
+                'confidence': confidence,
+                'processing_time': total_time,
+                'retrieved_info': retrieved_info[:3],
+                'session_id': session_id,
+                'chat_id': chat_record.id if chat_record else None,
+                'model': result.get('model', 'unknown'),
+                'optimized': result.get('optimized', False),
+                'cached': result.get('cached', False),
+                'success': True
+            })
+            
+        except TimeoutError:
+            # Headers are already sent, so the timeout travels as an SSE error event
+            print(f"⚠️ Chat stream inference timed out after {app.config['INFERENCE_JOB_TIMEOUT']}s")
+            yield sse_event('error', {
+                'error': 'The medical assistant is taking too long to respond. Please try again shortly.',
+                'timed_out': True,
+                'retry_after': max(1, math.ceil(inference_scheduler.estimate_wait())),
+                'success': False
+            })
+        except Exception as e:
+            print(f"❌ Chat stream error: {e}")
+            traceback.print_exc()
+            yield sse_event('error', {
+                'error': 'Sorry, I encountered an error. Please try again.',
+                'success': False
+            })
+        finally:
+            # Client disconnected or stream finished: stop generating for this request
+            if job is not None:
+                job.cancel()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def pending_history_rows(user_id: int, search: str = '') -> List[ChatHistory]:
+    """Unflushed write-behind rows of a user as transient ChatHistory objects, newest first"""
+    if not chat_write_behind:
+        return []
+    
+    search = search.lower()
+    return [
+        ChatHistory(**row)
+        for row in chat_write_behind.pending_for_user(user_id)
+        if not search or search in row['user_query'].lower() or search in row['bot_response'].lower()
+    ]
+
+def format_history_record(record: ChatHistory, highlight: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """JSON shape of a history entry"""
+    item = {
+        'id': record.id,
+        'user_query': record.user_query,
+        'bot_response': record.bot_response,
+        'timestamp': record.timestamp.isoformat(),
+        'intent': record.intent,
+        'confidence': record.confidence,
+        'processing_time': record.processing_time,
+        'entities': json.loads(record.entities) if record.entities else []
+    }
+    if highlight:
+        item['highlight'] = highlight
+    return item
+
+def history_cursor_page(user_id: int, search: str, cursor: str, per_page: int,
+                        pending: List[Tuple[ChatHistory, Optional[Dict[str, Any]]]],
+                        include_total: bool) -> Tuple[List[Tuple[ChatHistory, Optional[Dict[str, Any]]]], Dict[str, Any]]:
+    """
+    One cursor page of history: keyset on (timestamp, id) when browsing,
+    an offset inside the opaque cursor for ranked search results
+    
+    Raises:
+        InvalidCursor: if the cursor is malformed
+    """
+    position = decode_cursor(cursor)
+    
+    # Unflushed write-behind rows are the newest, so they lead the first page
+    records = list(pending) if not position else []
+    
+    if search:
+        try:
+            offset = int(position.get('offset', 0))
+        except (TypeError, ValueError):
+            raise InvalidCursor("Malformed cursor")
+        hits = chat_search.search(user_id, search, limit=per_page + 1, offset=offset)
+        records += hits[:per_page]
+        next_cursor = encode_cursor({'offset': offset + per_page}) if len(hits) > per_page else None
+        total = chat_search.count(user_id, search) + len(pending) if include_total else None
+    else:
+        page_records, next_cursor = keyset_history_page(user_id, cursor, per_page)
+        records += [(record, None) for record in page_records]
+        # The stats service already keeps a cached per-user count
+        total = user_stats_service.get(user_id)['total_chats'] + len(pending) if include_total else None
+    
+    pagination = {
+        'mode': 'cursor',
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None
+    }
+    if include_total:
+        pagination['total_records'] = total
+    return records, pagination
+
 @app.route('/api/history')
 @login_required
 def get_history():
-    """Get chat history with pagination"""
+    """
+    Get chat history, newest first (or best match first when searching)
+    
+    Pass cursor= (empty for the first page, then next_cursor) for keyset
+    pagination, optionally with include_total=true; page= keeps the classic
+    numbered pages with a total count.
+    """
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         search = request.args.get('search', '').strip()
-        
-        
-        query = ChatHistory.query.filter_by(user_id=current_user.id)
-        
+        page = max(page, 1)
+        per_page = max(per_page, 1)
+        
+        # Read-your-writes: rows still in the write-behind buffer are newer than anything stored
+        pending = [
+            (record, {
+                'user_query': highlight_text(record.user_query, search),
+                'bot_response': highlight_text(record.bot_response, search)
+            } if search else None)
+            for record in pending_history_rows(current_user.id, search)
+        ]
+        
+        if 'cursor' in request.args:
+            include_total = request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+            try:
+                records, pagination = history_cursor_page(
+                    current_user.id, search, request.args.get('cursor', ''), per_page, pending, include_total
+                )
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor', 'success': False}), 400
+            return jsonify({
+                'history': [format_history_record(record, highlight) for record, highlight in records],
+                'pagination': pagination,
+                'success': True
+            })
         
         if search:
-            query = query.filter(
-                (ChatHistory.user_query.contains(search)) |
-                (ChatHistory.bot_response.contains(search))
-            )
-        
-        
-        history = query.order_by(ChatHistory.timestamp.desc()).paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        # Format response
-        history_list = []
-        for record in history.items:
-            history_list.append({
-                'id': record.id,
-                'user_query': record.user_query,
-                'bot_response': record.bot_response,
-                'timestamp': record.timestamp.isoformat(),
-                'intent': record.intent,
-                'confidence': record.confidence,
-                'processing_time': record.processing_time,
-                'entities': json.loads(record.entities) if record.entities else []
-            })
+            # Full-text index, best match first, with highlighted snippets
+            fetch = lambda offset, limit: chat_search.search(current_user.id, search, limit=limit, offset=offset)
+            count = lambda: chat_search.count(current_user.id, search)
+        else:
+            query = ChatHistory.query.filter_by(user_id=current_user.id)
+            fetch = lambda offset, limit: [
+                (record, None)
+                for record in query.order_by(ChatHistory.timestamp.desc()).offset(offset).limit(limit).all()
+            ]
+            count = query.count
+        
+        offset = (page - 1) * per_page
+        records = pending[offset:offset + per_page]
+        
+        db_limit = per_page - len(records)
+        if db_limit > 0:
+            records += fetch(max(0, offset - len(pending)), db_limit)
+        
+        total = count() + len(pending)
+        total_pages = (total + per_page - 1) // per_page
+        pagination = {
+            'page': page,
+            'per_page': per_page,
+            'total_pages': total_pages,
+            'total_records': total,
+            'has_next': page < total_pages,
+            'has_prev': page > 1
+        }
         
         return jsonify({
-            'history': history_list,
-            'pagination': {
-                'page': history.page,
-                'per_page': history.per_page,
-                'total_pages': history.pages,
-                'total_records': history.total,
-                'has_next': history.has_next,
-                'has_prev': history.has_prev
-            },
+            'history': [format_history_record(record, highlight) for record, highlight in records],
+            'pagination': pagination,
             'success': True
         })
         
@@ -1238,31 +1499,23 @@ def get_analytics():
         health_score = min(100, (today_chats * 10) + (total_chats // 10))
         
         # Get most common intent
-        most_common = db.session.query(
-            ChatHistory.intent,
-            db.func.count(ChatHistory.intent).label('count')
-        ).filter_by(user_id=current_user.id)\
-         .group_by(ChatHistory.intent)\
-         .order_by(db.desc('count'))\
-         .first()
-        
-        most_common_intent = most_common[0] if most_common else None
+        top_intents = DatabaseHandler.get_intent_distribution(current_user.id, limit=1)
+        most_common_intent = next(iter(top_intents), None)
         
         
+        daily_intents = DatabaseHandler.get_daily_intents(current_user.id, start_date, end_date)
         daily_stats = []
         for a in analytics:
             daily_stats.append({
                 'date': a.date.isoformat(),
                 'chats': a.total_chats,
-                'intents': json.loads(a.common_intents) if a.common_intents else {}
+                'intents': daily_intents.get(a.date, {})
             })
         
-        
-        intent_distribution = {}
-        for a in analytics[-7:]:  
-            intents = json.loads(a.common_intents) if a.common_intents else {}
-            for intent, count in intents.items():
-                intent_distribution[intent] = intent_distribution.get(intent, 0) + count
+        # Intent mix of the last week, aggregated in the database
+        intent_distribution = DatabaseHandler.get_intent_distribution(
+            current_user.id, start_date=end_date - timedelta(days=6), end_date=end_date
+        )
         
         
         recent_interactions = []
@@ -1355,16 +1608,13 @@ def get_chart_data():
         for a in analytics[-7:]:  
             daily_stats.append({
                 'date': a.date.isoformat(),
-                'chats': a.total_chats,
-                'intents': json.loads(a.common_intents) if a.common_intents else {}
+                'chats': a.total_chats
             })
         
         
-        intent_counts = {}
-        for a in analytics:
-            intents = json.loads(a.common_intents) if a.common_intents else {}
-            for intent, count in intents.items():
-                intent_counts[intent] = intent_counts.get(intent, 0) + count
+        intent_counts = DatabaseHandler.get_intent_distribution(
+            current_user.id, start_date=start_date, end_date=end_date
+        )
         
         return jsonify({
             'activity_data': {
@@ -1386,47 +1636,38 @@ def get_chart_data():
 @app.route('/api/download_history')
 @login_required
 def download_history():
-    """Download chat history as CSV"""
+    """
+    Download chat history, streamed as it is read from the database
+    
+    Query args: format=csv|jsonl (default csv), gzip=true for a .gz file
+    """
     try:
-        # Get all history for user
-        history = ChatHistory.query.filter_by(user_id=current_user.id)\
-            .order_by(ChatHistory.timestamp.desc())\
-            .all()
-        
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        
-        writer.writerow([
-            'ID', 'Timestamp', 'User Query', 'AI Response', 
-            'Intent', 'Confidence', 'Processing Time (s)'
-        ])
+        fmt = request.args.get('format', 'csv').lower()
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
         
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'error': f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
         
-        for record in history:
-            writer.writerow([
-                record.id,
-                record.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                record.user_query[:200],
-                record.bot_response[:200],
-                record.intent or 'N/A',
-                f"{record.confidence * 100:.1f}%" if record.confidence else 'N/A',
-                f"{record.processing_time:.2f}" if record.processing_time else 'N/A'
-            ])
-        
-        output.seek(0)
+        # Flush buffered chats so the export includes them
+        if chat_write_behind:
+            chat_write_behind.flush()
         
         # Create filename
-        filename = f"medai_history_{current_user.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        filename = f"medai_history_{current_user.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[fmt]['extension']}"
+        if compress:
+            filename += '.gz'
         
         log_activity(current_user.id, "DOWNLOAD_HISTORY", filename)
         
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
+        # No Content-Length, so the body goes out chunked as rows are encoded
+        return Response(
+            stream_with_context(export_history(current_user.id, fmt, compress=compress)),
+            mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt]['mimetype'],
+            headers={
+                'Content-Disposition': f'attachment; filename="{secure_filename(filename)}"',
+                'Cache-Control': 'no-store',
+                'X-Accel-Buffering': 'no'
+            }
         )
         
     except Exception as e:
@@ -1481,6 +1722,7 @@ def delete_history_record(record_id):
         
         db.session.delete(record)
         db.session.commit()
+        user_stats_service.invalidate(current_user.id)
         
         log_activity(current_user.id, "DELETE_HISTORY", f"Record ID: {record_id}")
         
@@ -1509,12 +1751,19 @@ def clear_all_history():
             }), 400
         
         
-        deleted_count = ChatHistory.query.filter_by(user_id=current_user.id).delete()
+        # Drop buffered rows first: discard_user waits out an in-flight batch,
+        # which would otherwise commit chats and analytics after the DELETE
+        deleted_count = 0
+        if chat_write_behind:
+            deleted_count += chat_write_behind.discard_user(current_user.id)
+        deleted_count += ChatHistory.query.filter_by(user_id=current_user.id).delete()
         
         # Reset analytics
         UserAnalytics.query.filter_by(user_id=current_user.id).delete()
+        UserIntentCount.query.filter_by(user_id=current_user.id).delete()
         
         db.session.commit()
+        user_stats_service.invalidate(current_user.id)
         
         log_activity(current_user.id, "CLEAR_ALL_HISTORY", f"Deleted {deleted_count} records")
         
@@ -1558,11 +1807,23 @@ def system_status():
             'models': {
                 'llama_loaded': ml_models_loaded and rag_system.llama_model is not None,
                 'embedding_model': app.config['EMBEDDING_MODEL'],
+                'embedding_backend': getattr(getattr(rag_system, 'embedding_generator', None), 'backend', app.config['EMBEDDING_BACKEND']),
                 'context_size': app.config['LLAMA_CONTEXT_SIZE'],
                 'gpu_layers': app.config['LLAMA_N_GPU_LAYERS'],
                 'batch_size': batch_size,  
                 **model_info
             },
+            'model_state': model_readiness.get_status(),
+            'scheduler': inference_scheduler.get_status(),
+            'user_stats_cache': user_stats_service.get_cache_stats(),
+            'background_tasks': background_tasks.get_stats(),
+            'write_behind': chat_write_behind.get_stats() if chat_write_behind else None,
+            'history_search': 'fts5' if chat_search.fts_available() else 'like',
+            'safety_pipeline': safety_pipeline.get_stats(),
+            'toxicity': safety_checker.toxicity_scorer.get_stats() if getattr(safety_checker, 'toxicity_scorer', None) else None,
+            'response_cache': rag_system.response_cache.get_stats() if getattr(rag_system, 'response_cache', None) else None,
+            'embedding_cache': rag_system.embedding_generator.get_cache_stats() if getattr(rag_system, 'embedding_generator', None) else None,
+            'retrieval_batching': rag_system.retrieval_batcher.get_stats() if getattr(rag_system, 'retrieval_batcher', None) else None,
             'database': 'connected',
             'success': True
         })
@@ -1633,7 +1894,13 @@ def broadcast_analytics_update(user_id, chat_data=None):
 
 @app.route('/api/system/health')
 def health_check():
-    """Health check endpoint - FIXED: SQLAlchemy 2.x compatibility"""
+    """
+    Health check endpoint - FIXED: SQLAlchemy 2.x compatibility
+    
+    Liveness (the process answers and the database responds) is reported
+    separately from readiness (models loaded), so a server that is still
+    loading models is healthy but not yet ready.
+    """
     try:
         
         from sqlalchemy import text
@@ -1641,20 +1908,32 @@ def health_check():
         
         
         model_status = 'loaded' if ml_models_loaded else 'fallback'
-        if rag_system and hasattr(rag_system, 'llama_model'):
-            model_status = 'llama_loaded' if rag_system.llama_model else 'fallback'
+        if rag_system and getattr(rag_system, 'llama_model', None):
+            model_status = 'llama_loaded'
+        
+        readiness = model_readiness.get_status()
         
         return jsonify({
             'status': 'healthy',
+            'live': True,
+            'ready': readiness['ready'],
             'timestamp': datetime.now().isoformat(),
             'checks': {
                 'database': 'ok',
                 'models': model_status,
                 'memory': 'ok'
-            }
+            },
+            'readiness': readiness
         })
     except Exception as e:
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+        return jsonify({'status': 'unhealthy', 'live': True, 'ready': False, 'error': str(e)}), 500
+
+@app.route('/api/system/ready')
+def readiness_check():
+    """Readiness probe: 200 once chat can be served (ready or degraded), 503 while loading"""
+    readiness = model_readiness.get_status()
+    status_code = 200 if readiness['serving'] else 503
+    return jsonify(readiness), status_code
 
 @app.route('/logout')
 @login_required
@@ -1716,10 +1995,10 @@ if __name__ == '__main__':
     print("="*70)
     print(f"📁 Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
     print(f"🔐 Debug Mode: {app.config['DEBUG']}")
-    print(f"🤖 ML Models: {'✅ LLaMA-3 8B Q3_K_M (3.74GB)' if ml_models_loaded else '⚠️ Fallback Mode'}")
+    print(f"🤖 ML Models: {model_readiness.state} (LLaMA-3 8B Q3_K_M, 3.74GB)")
     print(f"📡 Real-time dashboard: ENABLED (Socket.IO)")
     
-    if ml_models_loaded:
+    if model_readiness.state != DEGRADED:
         print(f"   • Context: {app.config['LLAMA_CONTEXT_SIZE']} tokens")
         print(f"   • GPU Layers: {app.config['LLAMA_N_GPU_LAYERS']}")
         print(f"   • Batch Size: {app.config['LLAMA_BATCH_SIZE']}")
@@ -1734,12 +2013,16 @@ if __name__ == '__main__':
     print("📡 Real-time dashboard: http://localhost:5000/dashboard")
     print("📊 System Status: http://localhost:5000/api/system/status")
     print("❤️  Health Check: http://localhost:5000/api/system/health")
+    print("🚦 Readiness: http://localhost:5000/api/system/ready")
     print("="*70 + "\n")
     
     # Create necessary directories
     for directory in ['uploads', 'data/vector_db', 'data/medical_knowledge', 'models']:
         os.makedirs(directory, exist_ok=True)
     
+    # Turn SIGTERM into a normal exit so atexit handlers drain buffered chat writes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
    
     try:
         socketio.run(
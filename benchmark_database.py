@@ -0,0 +1,124 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(".")
+
+from flask import Flask
+
+from config import Config
+from database.models import db, User, ChatHistory
+from database.db_handler import DatabaseHandler
+from database.engine import build_engine_options, install_sqlite_pragmas, sqlite_pragmas
+
+
+def create_app(db_path, tuned):
+    """Minimal app bound to a fresh SQLite file, with or without the tuned engine profile"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config) if tuned else {}
+    db.init_app(app)
+
+    with app.app_context():
+        if tuned:
+            install_sqlite_pragmas(db.engine, sqlite_pragmas(app.config))
+        db.create_all()
+        for i in range(4):
+            db.session.add(User(username=f"bench{i}", email=f"bench{i}@medai.com", password_hash='x'))
+        db.session.commit()
+
+    return app
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(name, tuned, args):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app(db_path, tuned)
+    write_latencies, read_latencies, errors = [], [], []
+    lock = threading.Lock()
+    stop_reading = threading.Event()
+
+    def writer(worker_id):
+        user_id = worker_id % 4 + 1
+        with app.app_context():
+            for i in range(args.chats):
+                start = time.perf_counter()
+                try:
+                    db.session.add(ChatHistory(
+                        user_id=user_id,
+                        user_query=f"What are the symptoms of condition {i}?",
+                        bot_response="Common symptoms include fever, fatigue and headache. " * 8,
+                        intent='symptom_inquiry',
+                        confidence=0.8,
+                        processing_time=1.0
+                    ))
+                    DatabaseHandler.upsert_daily_analytics(user_id, confidence_sum=0.8, intents={'symptom_inquiry': 1})
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(str(e).splitlines()[0])
+                    continue
+                with lock:
+                    write_latencies.append(time.perf_counter() - start)
+
+    def reader(worker_id):
+        user_id = worker_id % 4 + 1
+        with app.app_context():
+            while not stop_reading.is_set():
+                start = time.perf_counter()
+                try:
+                    ChatHistory.query.filter_by(user_id=user_id)\
+                        .order_by(ChatHistory.timestamp.desc()).limit(10).all()
+                    db.session.rollback()  # end the read transaction like a request teardown would
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e).splitlines()[0])
+                    continue
+                with lock:
+                    read_latencies.append(time.perf_counter() - start)
+
+    writers = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+
+    start = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop_reading.set()
+    for thread in readers:
+        thread.join()
+
+    print(f"\n📊 {name}")
+    print(f"   • Inserts: {len(write_latencies)} in {elapsed:.2f}s ({len(write_latencies) / elapsed:.0f}/s)")
+    print(f"   • Insert latency p50/p95: {percentile(write_latencies, 50) * 1000:.1f} / {percentile(write_latencies, 95) * 1000:.1f} ms")
+    print(f"   • History reads: {len(read_latencies)} ({len(read_latencies) / elapsed:.0f}/s)")
+    print(f"   • Read latency p50/p95: {percentile(read_latencies, 50) * 1000:.1f} / {percentile(read_latencies, 95) * 1000:.1f} ms")
+    print(f"   • Errors: {len(errors)}{f' (e.g. {errors[0]})' if errors else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent chat inserts and history reads: stock SQLite vs tuned profile")
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--chats', type=int, default=200, help="Chats inserted per writer")
+    args = parser.parse_args()
+
+    print(f"🧪 Benchmarking SQLite profiles ({args.writers} writers x {args.chats} chats, {args.readers} readers)...")
+    run_profile("Stock SQLAlchemy settings", tuned=False, args=args)
+    run_profile("Tuned profile (WAL, synchronous=NORMAL, cache, mmap, busy_timeout, pool)", tuned=True, args=args)
+
+
+if __name__ == "__main__":
+    main()
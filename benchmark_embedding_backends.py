@@ -0,0 +1,143 @@
+import argparse
+import json
+import sys
+import time
+sys.path.append(".")
+
+import numpy as np
+
+from config import Config
+from ml_models.embedding_backends import EMBEDDING_BACKENDS
+from ml_models.embeddings import EmbeddingGenerator
+from ml_models.rag_system import OptimizedMedicalRAG
+from ml_models.similarity import rank_candidates_batch
+
+EVAL_SET_PATH = 'data/medical_knowledge/faq_retrieval_eval.json'
+
+
+def load_chunks():
+    """Knowledge base chunks exactly as the RAG system indexes them"""
+    # Only the chunking step is needed, not the LLaMA model or an existing index
+    rag = OptimizedMedicalRAG.__new__(OptimizedMedicalRAG)
+    with open(Config.KNOWLEDGE_BASE_PATH, 'r', encoding='utf-8') as f:
+        rag.knowledge_base = json.load(f).get('medical_faqs', [])
+    rag._create_text_chunks()
+    return rag.knowledge_base, rag.text_chunks, np.asarray(rag.chunk_entry_ids)
+
+
+def retrieval_metrics(ranked, chunk_entry_ids, targets, k):
+    """recall@1, recall@k and MRR at the FAQ-entry level (several chunks map to one entry)"""
+    recall_1 = recall_k = reciprocal_rank = 0.0
+    for hits, target in zip(ranked, targets):
+        entries = list(dict.fromkeys(int(chunk_entry_ids[i]) for i, _ in hits))
+        if target in entries:
+            rank = entries.index(target) + 1
+            recall_1 += rank == 1
+            recall_k += rank <= k
+            reciprocal_rank += 1.0 / rank
+    n = len(targets)
+    return {'recall@1': recall_1 / n, f'recall@{k}': recall_k / n, 'mrr': reciprocal_rank / n}
+
+
+def evaluate(backend, onnx_path, knowledge_base, chunks, chunk_entry_ids, eval_queries, k, latency_runs):
+    generator = EmbeddingGenerator(
+        model_name=Config.EMBEDDING_MODEL,
+        backend=backend,
+        onnx_path=onnx_path,
+        cache_config={'enabled': False}
+    )
+    if generator.backend != backend:
+        print(f"⚠️ {backend} unavailable, skipping")
+        return None
+
+    start = time.perf_counter()
+    chunk_embeddings = generator.get_embeddings(chunks, batch_size=16)
+    index_s = time.perf_counter() - start
+
+    questions = {entry['question']: entry_id for entry_id, entry in enumerate(knowledge_base)}
+    targets = [questions[item['question']] for item in eval_queries]
+    query_embeddings = generator.get_embeddings([item['query'] for item in eval_queries])
+
+    # A failed encode comes back as zero vectors, which would score as a (bad) result
+    if not (np.linalg.norm(chunk_embeddings, axis=1).all() and np.linalg.norm(query_embeddings, axis=1).all()):
+        print(f"⚠️ {backend} failed to encode, skipping")
+        return None
+
+    # Every chunk is ranked so each entry has a rank
+    ranked = rank_candidates_batch(query_embeddings, chunk_embeddings, top_k=len(chunks), threshold=-1.0)
+
+    # Single-query latency, the cost paid on every chat
+    generator.get_embeddings(["warm-up query"])
+    timings = []
+    for i in range(latency_runs):
+        query = eval_queries[i % len(eval_queries)]['query']
+        start = time.perf_counter()
+        generator.get_embeddings([query])
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'backend': backend,
+        **retrieval_metrics(ranked, chunk_entry_ids, targets, k),
+        'query_ms_p50': float(np.percentile(timings, 50)),
+        'query_ms_p95': float(np.percentile(timings, 95)),
+        'index_build_s': index_s,
+        'chunk_embeddings': chunk_embeddings,
+        'query_embeddings': query_embeddings
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends on FAQ retrieval quality and CPU query latency")
+    parser.add_argument('--backends', nargs='+', default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--latency-runs', type=int, default=100)
+    parser.add_argument('--onnx-path', default=Config.EMBEDDING_ONNX_PATH, help="Where the ONNX export is saved and reused")
+    parser.add_argument('--output', help="Write the results table to this JSON file")
+    args = parser.parse_args()
+
+    knowledge_base, chunks, chunk_entry_ids = load_chunks()
+    with open(EVAL_SET_PATH, 'r', encoding='utf-8') as f:
+        eval_queries = json.load(f)['queries']
+
+    print(f"🧪 Embedding backends: {Config.EMBEDDING_MODEL}")
+    print(f"   {len(chunks)} chunks from {len(knowledge_base)} FAQs, {len(eval_queries)} evaluation queries")
+
+    results = [
+        result for result in (
+            evaluate(backend, args.onnx_path, knowledge_base, chunks, chunk_entry_ids, eval_queries, args.k, args.latency_runs)
+            for backend in args.backends
+        ) if result
+    ]
+    if not results:
+        return
+
+    # Quality delta against the first backend (fp32 by default): retrieval metrics
+    # plus how closely each backend reproduces the reference vectors
+    reference = results[0]
+    print(f"\n📊 Delta vs {reference['backend']}")
+    print(f"   {'backend':<8} {'recall@1':>9} {f'recall@{args.k}':>9} {'mrr':>7} {'cos(ref)':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'index s':>8}")
+    for result in results:
+        cosine = np.concatenate([
+            np.sum(result['chunk_embeddings'] * reference['chunk_embeddings'], axis=1),
+            np.sum(result['query_embeddings'] * reference['query_embeddings'], axis=1)
+        ])
+        result['mean_cosine_to_reference'] = float(cosine.mean())
+        result['min_cosine_to_reference'] = float(cosine.min())
+        result['mrr_delta'] = result['mrr'] - reference['mrr']
+        print(f"   {result['backend']:<8} {result['recall@1']:>9.3f} {result[f'recall@{args.k}']:>9.3f} "
+              f"{result['mrr']:>7.3f} {result['mean_cosine_to_reference']:>9.4f} "
+              f"{result['query_ms_p50']:>8.2f} {result['query_ms_p95']:>8.2f} {result['index_build_s']:>8.2f}")
+
+    if args.output:
+        table = [
+            {key: value for key, value in result.items() if not key.endswith('_embeddings')}
+            for result in results
+        ]
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'model': Config.EMBEDDING_MODEL, 'eval_set': EVAL_SET_PATH, 'results': table}, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
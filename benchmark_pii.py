@@ -0,0 +1,104 @@
+import argparse
+import hashlib
+import re
+import sys
+import time
+sys.path.append(".")
+
+from utils.pii_handler import PIIHandler
+
+# The per-pattern implementations PIIHandler replaced, kept here for comparison
+LEGACY_PATTERNS = {
+    'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    'phone': r'\b(\+\d{1,3}[-.]?)?\(?\d{3}\)?[-.]?\d{3}[-.]?\d{4}\b',
+    'ssn': r'\b\d{3}[-.]?\d{2}[-.]?\d{4}\b',
+    'credit_card': r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b',
+}
+LEGACY_MASKS = {'email': '[EMAIL_{hash}]', 'phone': '[PHONE_{hash}]', 'ssn': '[SSN_{hash}]', 'credit_card': '[CARD_{hash}]'}
+LEGACY_LABELS = {'email': '[EMAIL]', 'phone': '[PHONE]', 'ssn': '[SSN]', 'credit_card': '[CREDIT_CARD]'}
+
+
+def legacy_detect_and_mask(text):
+    """Old PIIHandler.detect_and_mask: one finditer and str.replace pass per pattern"""
+    masked_text = text
+    detected_types = []
+    for pii_type, pattern in LEGACY_PATTERNS.items():
+        matches = list(re.finditer(pattern, text, re.IGNORECASE))
+        if matches:
+            detected_types.append(pii_type)
+            for match in matches:
+                pii_hash = hashlib.md5(match.group().encode()).hexdigest()[:8]
+                masked_text = masked_text.replace(match.group(), LEGACY_MASKS[pii_type].format(hash=pii_hash))
+    return masked_text, detected_types
+
+
+def legacy_app_contains_pii(text):
+    """Old app.contains_pii: label masks, one pass per pattern"""
+    sanitized = text
+    found_pii = []
+    for pii_type, pattern in LEGACY_PATTERNS.items():
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            found_pii.append(pii_type)
+            sanitized = sanitized.replace(match.group(), LEGACY_LABELS[pii_type])
+    return len(found_pii) > 0, found_pii, sanitized
+
+
+def legacy_safety_contains_pii(text):
+    """Old SafetyChecker.contains_pii: detection only"""
+    found_pii = [pii_type for pii_type, pattern in LEGACY_PATTERNS.items() if re.search(pattern, text)]
+    return len(found_pii) > 0, found_pii
+
+
+SAMPLES = {
+    'clean query': "What are the common symptoms of seasonal flu and how long do they usually last?",
+    'numbers, no PII': "My blood pressure was 140/90 this morning and I took 500 mg of paracetamol at 8.",
+    'email + phone': "Please email me at jane.doe@example.com or call 555-123-4567 about my test results.",
+    'phone, SSN and card': "My numbers: 5551234567, 555.987.6543 and SSN 123-45-6789, card 4111 1111 1111 1111.",
+}
+
+# The SSN also occurs inside the card number: the legacy str.replace passes mask
+# it there first, the card match no longer applies and part of the card leaks
+OVERLAP_SAMPLE = "SSN 123456789, card 4111123456789111"
+
+
+def bench(fn, text, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(text)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PII detection and masking: combined single-pass engine vs per-pattern loops")
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    handler = PIIHandler()
+    candidates = [
+        ("legacy PIIHandler.detect_and_mask", legacy_detect_and_mask),
+        ("legacy app.contains_pii", legacy_app_contains_pii),
+        ("legacy SafetyChecker.contains_pii", legacy_safety_contains_pii),
+        ("PIIHandler.detect_and_mask", handler.detect_and_mask),
+        ("PIIHandler.detect_and_mask (labels)", lambda text: handler.detect_and_mask(text, hashed=False)),
+        ("PIIHandler.contains_pii", handler.contains_pii),
+    ]
+
+    print(f"🧪 PII micro-benchmark ({args.iterations} iterations per sample, µs per call)")
+    for name, text in SAMPLES.items():
+        print(f"\n📊 {name}: {text}")
+        for label, fn in candidates:
+            print(f"   • {label:<40} {bench(fn, text, args.iterations):8.2f}")
+
+    print(f"\n🔍 Overlapping matches: {OVERLAP_SAMPLE}")
+    print(f"   legacy: {legacy_detect_and_mask(OVERLAP_SAMPLE)[0]}")
+    print(f"   new:    {handler.detect_and_mask(OVERLAP_SAMPLE)[0]}")
+
+    batch = list(SAMPLES.values()) * 2500
+    start = time.perf_counter()
+    handler.detect_and_mask_batch(batch)
+    elapsed = time.perf_counter() - start
+    print(f"\n📦 detect_and_mask_batch: {len(batch)} texts in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import sys
+import time
+sys.path.append(".")
+
+import numpy as np
+
+from ml_models.similarity import rank_candidates, rank_candidates_batch
+
+
+def legacy_find_most_similar(query_embedding, candidate_embeddings, top_k=3, threshold=0.5):
+    """Old EmbeddingGenerator.find_most_similar scoring: per-candidate norms and a full sort"""
+    similarities = []
+    for i, cand_emb in enumerate(candidate_embeddings):
+        similarity = np.dot(query_embedding, cand_emb) / (
+            np.linalg.norm(query_embedding) * np.linalg.norm(cand_emb)
+        )
+        if similarity >= threshold:
+            similarities.append((i, float(similarity)))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities[:top_k]
+
+
+def unit_vectors(rng, count, dimension):
+    vectors = rng.standard_normal((count, dimension)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="find_most_similar scoring: Python loop vs matrix product + argpartition")
+    parser.add_argument('--candidates', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--dimension', type=int, default=768)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    candidates = unit_vectors(rng, args.candidates, args.dimension)
+    # Queries are perturbed candidates so every query has close neighbours
+    picks = rng.integers(0, args.candidates, args.queries)
+    queries = candidates[picks] + 0.3 * unit_vectors(rng, args.queries, args.dimension)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    threshold = 0.0
+
+    print(f"🧪 Similarity ranking: {args.candidates} candidates x {args.dimension} dims, top-{args.top_k}")
+
+    legacy, legacy_ms = timed(lambda: legacy_find_most_similar(queries[0], candidates, args.top_k, threshold), 1)
+    ranked, vector_ms = timed(lambda: rank_candidates(queries[0], candidates, args.top_k, threshold), args.repeats)
+    same = [i for i, _ in legacy] == [i for i, _ in ranked]
+    print("\n📊 One query")
+    print(f"   • legacy loop            {legacy_ms:10.2f} ms")
+    print(f"   • rank_candidates        {vector_ms:10.2f} ms  ({legacy_ms / vector_ms:.0f}x, same ranking: {same})")
+
+    looped, loop_ms = timed(
+        lambda: [rank_candidates(query, candidates, args.top_k, threshold) for query in queries], args.repeats
+    )
+    batched, batch_ms = timed(
+        lambda: rank_candidates_batch(queries, candidates, args.top_k, threshold), args.repeats
+    )
+    same = all([i for i, _ in a] == [i for i, _ in b] for a, b in zip(looped, batched))
+    print(f"\n📊 {args.queries} queries")
+    print(f"   • rank_candidates loop   {loop_ms:10.2f} ms")
+    print(f"   • rank_candidates_batch  {batch_ms:10.2f} ms  ({loop_ms / batch_ms:.1f}x, same ranking: {same})")
+    print(f"   • legacy loop (est.)     {legacy_ms * args.queries:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import sys
+import time
+sys.path.append(".")
+
+import faiss
+import numpy as np
+
+from ml_models.rag_system import build_vector_index, apply_search_params
+from config import Config
+
+
+def load_vectors(args):
+    """Knowledge base chunk embeddings, or random unit vectors with --synthetic N"""
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((args.synthetic, args.dimension)).astype('float32')
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    import json
+    from ml_models.rag_system import OptimizedMedicalRAG
+    from sentence_transformers import SentenceTransformer
+
+    # Only the chunking step is needed, not the LLaMA model or an existing index
+    rag = OptimizedMedicalRAG.__new__(OptimizedMedicalRAG)
+    with open(Config.KNOWLEDGE_BASE_PATH, 'r', encoding='utf-8') as f:
+        rag.knowledge_base = json.load(f).get('medical_faqs', [])
+    rag._create_text_chunks()
+
+    model = SentenceTransformer(Config.EMBEDDING_MODEL)
+    vectors = model.encode(rag.text_chunks, batch_size=32, show_progress_bar=True).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def timed_search(index, queries, k):
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    return found, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FAISS index types on recall@k and latency")
+    parser.add_argument('--synthetic', type=int, default=0, help="Use N random vectors instead of the knowledge base")
+    parser.add_argument('--dimension', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=9)
+    args = parser.parse_args()
+
+    print("🧪 Benchmarking vector index types...")
+    vectors = load_vectors(args)
+    n = len(vectors)
+
+    # Queries are perturbed corpus vectors so every query has real neighbours
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n, min(args.queries, n), replace=False)].copy()
+    queries += rng.normal(scale=0.05, size=queries.shape).astype('float32')
+    faiss.normalize_L2(queries)
+
+    flat = build_vector_index(vectors, {'type': 'flat'})
+    truth, flat_ms = timed_search(flat, queries, args.k)
+    print(f"\n📊 {n} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    print(f"   flat        recall@{args.k}=1.000  {flat_ms:.3f} ms/query")
+
+    sweeps = {
+        'ivf_flat': ('nprobe', [1, 4, 8, 16, 32]),
+        'ivf_pq': ('nprobe', [4, 8, 16, 32]),
+        'hnsw': ('ef_search', [16, 32, 64, 128])
+    }
+
+    for index_type, (knob, values) in sweeps.items():
+        start = time.perf_counter()
+        index = build_vector_index(vectors, {'type': index_type})
+        build_s = time.perf_counter() - start
+        print(f"\n🔧 {index_type} (built in {build_s:.2f}s)")
+
+        for value in values:
+            apply_search_params(index, {knob: value})
+            found, ms = timed_search(index, queries, args.k)
+            print(f"   {knob}={value:<4} recall@{args.k}={recall_at_k(found, truth, args.k):.3f}  {ms:.3f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
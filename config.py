@@ -15,12 +15,33 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///medical_chatbot.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    
+    # DATABASE ENGINE PROFILE
+    
+    # Pool sizing for the threaded server (Socket.IO, inference and background writer threads)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # server databases only
+    
+    # SQLite pragmas applied to every connection
+    SQLITE_WAL = os.getenv('SQLITE_WAL', 'True').lower() in ('true', '1', 't')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))  # bytes, 0 disables
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    
    
     # LLaMA-3 8B Q3_K_M MODEL SETTINGS
 
     
     LLAMA_MODEL_PATH = os.getenv('LLAMA_MODEL_PATH', 'models/Meta-Llama-3-8B-Instruct.Q3_K_M.gguf')
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-mpnet-base-v2')
+    # pytorch (fp32), int8 (dynamic quantization) or onnx; changing it rebuilds the FAISS index.
+    # int8/onnx retrieval quality against fp32 has not been measured on the real model weights yet:
+    # run benchmark_embedding_backends.py on the deployment hardware before switching
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'pytorch')
+    EMBEDDING_ONNX_PATH = os.getenv('EMBEDDING_ONNX_PATH', 'models/embeddings-onnx')  # exported graph, reused across restarts
     
     
     LLAMA_CONTEXT_SIZE = int(os.getenv('LLAMA_CONTEXT_SIZE', 1536))  
@@ -38,6 +59,7 @@ class Config:
     LLAMA_OFFLOAD_KQV = os.getenv('LLAMA_OFFLOAD_KQV', 'True').lower() in ('true', '1', 't')
     LLAMA_USE_MMAP = os.getenv('LLAMA_USE_MMAP', 'True').lower() in ('true', '1', 't')
     LLAMA_F16_KV = os.getenv('LLAMA_F16_KV', 'True').lower() in ('true', '1', 't')
+    LLAMA_CACHE_SYSTEM_PROMPT = os.getenv('LLAMA_CACHE_SYSTEM_PROMPT', 'True').lower() in ('true', '1', 't')
     
     
     # KNOWLEDGE BASE & VECTOR DATABASE
@@ -45,9 +67,84 @@ class Config:
     VECTOR_DB_PATH = os.getenv('VECTOR_DB_PATH', 'data/vector_db/medical_index.faiss')
     KNOWLEDGE_BASE_PATH = os.getenv('KNOWLEDGE_BASE_PATH', 'data/medical_knowledge/medical_faqs.json')
     
+    # flat (exact), ivf_flat, hnsw or ivf_pq; changing build parameters rebuilds the index
+    VECTOR_INDEX_TYPE = os.getenv('VECTOR_INDEX_TYPE', 'flat')
+    VECTOR_INDEX_NLIST = int(os.getenv('VECTOR_INDEX_NLIST', 0))  # 0 = 4 * sqrt(num_chunks)
+    VECTOR_INDEX_NPROBE = int(os.getenv('VECTOR_INDEX_NPROBE', 8))
+    VECTOR_INDEX_HNSW_M = int(os.getenv('VECTOR_INDEX_HNSW_M', 32))
+    VECTOR_INDEX_EF_CONSTRUCTION = int(os.getenv('VECTOR_INDEX_EF_CONSTRUCTION', 80))
+    VECTOR_INDEX_EF_SEARCH = int(os.getenv('VECTOR_INDEX_EF_SEARCH', 64))
+    VECTOR_INDEX_PQ_M = int(os.getenv('VECTOR_INDEX_PQ_M', 16))
+    VECTOR_INDEX_PQ_NBITS = int(os.getenv('VECTOR_INDEX_PQ_NBITS', 8))
+    VECTOR_INDEX_TRAIN_SAMPLE = int(os.getenv('VECTOR_INDEX_TRAIN_SAMPLE', 50000))
+    
+    
+    # SEMANTIC RESPONSE CACHE
+    
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+    RESPONSE_CACHE_THRESHOLD = float(os.getenv('RESPONSE_CACHE_THRESHOLD', 0.92))  # cosine similarity
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 86400))  # seconds, 0 = no expiry
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', 'data/vector_db/response_cache')
+    
+    
+    # EMBEDDING CACHE
+    
+    EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+    EMBEDDING_CACHE_MAX_MB = int(os.getenv('EMBEDDING_CACHE_MAX_MB', 64))  # in-memory LRU budget
+    EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', 'data/vector_db/embedding_cache.sqlite3')  # empty = memory only
+    
+    
+    # DASHBOARD STATISTICS
+    
+    USER_STATS_CACHE_TTL = float(os.getenv('USER_STATS_CACHE_TTL', 30))  # seconds, 0 = no caching
+    BACKGROUND_TASK_QUEUE_SIZE = int(os.getenv('BACKGROUND_TASK_QUEUE_SIZE', 1000))  # pending stats/broadcast jobs
+    
+    
+    # CHAT HISTORY WRITE-BEHIND
+    
+    WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'False').lower() in ('true', '1', 't')
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 50))  # rows that trigger a flush
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 0.5))  # max seconds a row waits
+    WRITE_BEHIND_MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', 5000))  # beyond this, writes go direct
+    WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv('WRITE_BEHIND_MAX_ATTEMPTS', 5))  # then rows are written one by one and rows with permanent errors dropped
+    
+    
+    # MODEL LOADING
+    
+    LAZY_MODEL_LOADING = os.getenv('LAZY_MODEL_LOADING', 'True').lower() in ('true', '1', 't')  # load on a background thread
+    MODEL_LOADING_RETRY_AFTER = int(os.getenv('MODEL_LOADING_RETRY_AFTER', 15))  # seconds, sent while warming up
+    
+    
+    # RETRIEVAL MICRO-BATCHING
+    
+    MICRO_BATCH_ENABLED = os.getenv('MICRO_BATCH_ENABLED', 'True').lower() in ('true', '1', 't')
+    MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', 32))
+    MICRO_BATCH_MAX_WAIT_MS = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', 5))  # extra latency for a lone request
+    
+    
+    # INFERENCE SCHEDULING
+    
+    INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', 16))
+    INFERENCE_MAX_PER_USER = int(os.getenv('INFERENCE_MAX_PER_USER', 2))
+    INFERENCE_JOB_TIMEOUT = int(os.getenv('INFERENCE_JOB_TIMEOUT', 180))  # seconds
+    
+    
+    # TOXICITY CLASSIFIER
+    
+    TOXICITY_MODEL = os.getenv('TOXICITY_MODEL', 'unitary/toxic-bert')
+    TOXICITY_BACKEND = os.getenv('TOXICITY_BACKEND', 'pytorch')  # pytorch, int8 (dynamic quantization) or onnx
+    TOXICITY_ONNX_PATH = os.getenv('TOXICITY_ONNX_PATH', 'models/toxic-bert-onnx')  # exported graph, reused across restarts
+    TOXICITY_THRESHOLD = float(os.getenv('TOXICITY_THRESHOLD', 0.8))
+    TOXICITY_CACHE_SIZE = int(os.getenv('TOXICITY_CACHE_SIZE', 4096))  # recent verdicts kept
+    TOXICITY_BATCH_MAX_SIZE = int(os.getenv('TOXICITY_BATCH_MAX_SIZE', 16))
+    TOXICITY_BATCH_MAX_WAIT_MS = float(os.getenv('TOXICITY_BATCH_MAX_WAIT_MS', 10))
+    
     
     # SAFETY & CONTENT SETTINGS
    
+    SAFETY_RISK_THRESHOLD = float(os.getenv('SAFETY_RISK_THRESHOLD', 0.3))  # lexical risk at which the toxicity model runs (0 = always)
+    SAFETY_TRACE_SIZE = int(os.getenv('SAFETY_TRACE_SIZE', 50))  # recent pipeline decision traces kept for the status endpoint
     EMERGENCY_RESPONSE = os.getenv('EMERGENCY_RESPONSE', '⚠️ EMERGENCY DETECTED: Please seek immediate medical attention or call emergency services (911/112)!')
     DISCLAIMER = os.getenv('DISCLAIMER', 'Disclaimer: I am an AI assistant providing general health information. Always consult with healthcare professionals for medical advice, diagnosis, or treatment.')
     
@@ -87,7 +184,56 @@ class Config:
             'repeat_penalty': Config.LLAMA_REPEAT_PENALTY,
             'offload_kqv': Config.LLAMA_OFFLOAD_KQV,
             'f16_kv': Config.LLAMA_F16_KV,
-            'use_mmap': Config.LLAMA_USE_MMAP
+            'use_mmap': Config.LLAMA_USE_MMAP,
+            'cache_system_prompt': Config.LLAMA_CACHE_SYSTEM_PROMPT
+        }
+    
+    @staticmethod
+    def get_vector_index_config():
+        """Get FAISS index type and build/search parameters"""
+        return {
+            'type': Config.VECTOR_INDEX_TYPE,
+            'nlist': Config.VECTOR_INDEX_NLIST,
+            'nprobe': Config.VECTOR_INDEX_NPROBE,
+            'hnsw_m': Config.VECTOR_INDEX_HNSW_M,
+            'ef_construction': Config.VECTOR_INDEX_EF_CONSTRUCTION,
+            'ef_search': Config.VECTOR_INDEX_EF_SEARCH,
+            'pq_m': Config.VECTOR_INDEX_PQ_M,
+            'pq_nbits': Config.VECTOR_INDEX_PQ_NBITS,
+            'train_sample': Config.VECTOR_INDEX_TRAIN_SAMPLE
+        }
+    
+    @staticmethod
+    def get_embedding_cache_config():
+        """Get embedding cache budget and persistent store settings"""
+        return {
+            'enabled': Config.EMBEDDING_CACHE_ENABLED,
+            'max_bytes': Config.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+            'persist_path': Config.EMBEDDING_CACHE_PATH or None
+        }
+    
+    @staticmethod
+    def get_toxicity_config():
+        """Get toxicity classifier backend, cache and batching settings"""
+        return {
+            'model_name': Config.TOXICITY_MODEL,
+            'backend': Config.TOXICITY_BACKEND,
+            'onnx_path': Config.TOXICITY_ONNX_PATH,
+            'threshold': Config.TOXICITY_THRESHOLD,
+            'cache_size': Config.TOXICITY_CACHE_SIZE,
+            'micro_batch': {
+                'enabled': Config.MICRO_BATCH_ENABLED,
+                'max_batch_size': Config.TOXICITY_BATCH_MAX_SIZE,
+                'max_wait_ms': Config.TOXICITY_BATCH_MAX_WAIT_MS
+            }
+        }
+    
+    @staticmethod
+    def get_safety_pipeline_config():
+        """Get tiered safety pipeline settings"""
+        return {
+            'risk_threshold': Config.SAFETY_RISK_THRESHOLD,
+            'trace_size': Config.SAFETY_TRACE_SIZE
         }
     
     @staticmethod
@@ -2,6 +2,7 @@
 Database package for AI Medical Chatbot
 """
 from .db_handler import DatabaseHandler
-from .models import db, User, ChatHistory, UserAnalytics
+from .models import db, User, ChatHistory, UserAnalytics, UserIntentCount
+from .stats_service import UserStatsService
 
-__all__ = ['DatabaseHandler', 'db', 'User', 'ChatHistory', 'UserAnalytics']
\ No newline at end of file
+__all__ = ['DatabaseHandler', 'db', 'User', 'ChatHistory', 'UserAnalytics', 'UserIntentCount', 'UserStatsService']
\ No newline at end of file
@@ -2,10 +2,15 @@
 Database handler for AI Medical Chatbot
 """
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timedelta
 import json
-from .models import db, User, ChatHistory, UserAnalytics
+from .models import db, User, ChatHistory, UserAnalytics, UserIntentCount
+from .export import iter_history_rows, stream_csv
+from utils.pii_handler import pii_handler
 
 class DatabaseHandler:
     """Handles database operations for the medical chatbot"""
@@ -59,46 +64,161 @@ class DatabaseHandler:
             )
             
             db.session.add(chat)
-            db.session.commit()
             
-            # Update analytics
-            DatabaseHandler.update_user_analytics(user_id, intent)
+            # Update analytics in the same transaction
+            DatabaseHandler.upsert_daily_analytics(
+                user_id,
+                confidence_sum=confidence or 0.0,
+                intents={intent: 1} if intent else None
+            )
             
+            db.session.commit()
             return chat
         except SQLAlchemyError as e:
             db.session.rollback()
             raise e
     
+    @staticmethod
+    def upsert_daily_analytics(user_id, day=None, chats=1, confidence_sum=0.0, intents=None):
+        """
+        Add chat counts to a user's daily analytics row in the current transaction
+        
+        Uses INSERT ... ON CONFLICT on the unique (user_id, date) index, so
+        concurrent writers never race to create the same row. The caller
+        commits.
+        
+        Args:
+            user_id: User ID
+            day: Date of the row (default: today, UTC)
+            chats: Number of chats to add
+            confidence_sum: Sum of the added chats' confidence scores
+            intents: {intent: count} to add to the user's intent counters
+        """
+        day = day or datetime.utcnow().date()
+        table = UserAnalytics.__table__
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            stmt = insert(table).values(
+                user_id=user_id,
+                date=day,
+                total_chats=chats,
+                avg_confidence=confidence_sum / chats if chats else 0.0,
+                common_intents='{}'
+            )
+            # SET expressions see the existing row, so this is a running weighted average
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.date],
+                set_={
+                    'total_chats': table.c.total_chats + chats,
+                    'avg_confidence': (table.c.avg_confidence * table.c.total_chats + confidence_sum)
+                                      / (table.c.total_chats + chats)
+                }
+            )
+            db.session.execute(stmt)
+        else:
+            analytics = UserAnalytics.query.filter_by(user_id=user_id, date=day).with_for_update().first()
+            if not analytics:
+                analytics = UserAnalytics(user_id=user_id, date=day, total_chats=0,
+                                          avg_confidence=0.0, common_intents='{}')
+                db.session.add(analytics)
+                db.session.flush()
+            total = analytics.total_chats + chats
+            analytics.avg_confidence = (analytics.avg_confidence * analytics.total_chats + confidence_sum) / total
+            analytics.total_chats = total
+            db.session.flush()
+        
+        if intents:
+            DatabaseHandler.increment_intent_counts(user_id, day, intents)
+    
+    @staticmethod
+    def increment_intent_counts(user_id, day, intents):
+        """
+        Atomically add {intent: count} to a user's daily intent counters (caller commits)
+        
+        One multi-row INSERT ... ON CONFLICT DO UPDATE count = count + excluded.count
+        """
+        if not intents:
+            return
+        
+        table = UserIntentCount.__table__
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            stmt = insert(table).values([
+                {'user_id': user_id, 'date': day, 'intent': intent, 'count': count}
+                for intent, count in intents.items()
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.date, table.c.intent],
+                set_={'count': table.c.count + stmt.excluded.count}
+            )
+            db.session.execute(stmt)
+        else:
+            for intent, count in intents.items():
+                row = UserIntentCount.query.filter_by(user_id=user_id, date=day, intent=intent)\
+                    .with_for_update().first()
+                if not row:
+                    row = UserIntentCount(user_id=user_id, date=day, intent=intent, count=0)
+                    db.session.add(row)
+                row.count += count
+            db.session.flush()
+    
+    @staticmethod
+    def get_intent_distribution(user_id, start_date=None, end_date=None, limit=None):
+        """
+        Intent totals for a user over a date range, computed with GROUP BY
+        
+        Returns:
+            dict: {intent: count}, most frequent first
+        """
+        total = db.func.sum(UserIntentCount.count).label('total')
+        query = db.session.query(UserIntentCount.intent, total)\
+            .filter(UserIntentCount.user_id == user_id)
+        
+        if start_date:
+            query = query.filter(UserIntentCount.date >= start_date)
+        if end_date:
+            query = query.filter(UserIntentCount.date <= end_date)
+        
+        query = query.group_by(UserIntentCount.intent).order_by(db.desc('total'))
+        if limit:
+            query = query.limit(limit)
+        
+        return {intent: int(count) for intent, count in query.all()}
+    
+    @staticmethod
+    def get_daily_intents(user_id, start_date, end_date):
+        """
+        Per-day intent counts for a user
+        
+        Returns:
+            dict: {date: {intent: count}}
+        """
+        rows = db.session.query(UserIntentCount.date, UserIntentCount.intent, UserIntentCount.count)\
+            .filter(
+                UserIntentCount.user_id == user_id,
+                UserIntentCount.date >= start_date,
+                UserIntentCount.date <= end_date
+            ).all()
+        
+        daily = {}
+        for day, intent, count in rows:
+            daily.setdefault(day, {})[intent] = count
+        return daily
+    
     @staticmethod
     def update_user_analytics(user_id, intent):
         """Update user analytics"""
         try:
-            today = datetime.utcnow().date()
-            analytics = UserAnalytics.query.filter_by(
+            DatabaseHandler.upsert_daily_analytics(user_id, intents={intent: 1} if intent else None)
+            db.session.commit()
+            return UserAnalytics.query.filter_by(
                 user_id=user_id,
-                date=today
+                date=datetime.utcnow().date()
             ).first()
-            
-            if not analytics:
-                analytics = UserAnalytics(
-                    user_id=user_id,
-                    date=today,
-                    total_chats=0,
-                    avg_confidence=0.0,
-                    common_intents='{}'
-                )
-                db.session.add(analytics)
-            
-            analytics.total_chats += 1
-            
-            # Update intents
-            if intent:
-                intents_dict = json.loads(analytics.common_intents) if analytics.common_intents else {}
-                intents_dict[intent] = intents_dict.get(intent, 0) + 1
-                analytics.common_intents = json.dumps(intents_dict)
-            
-            db.session.commit()
-            return analytics
         except SQLAlchemyError as e:
             db.session.rollback()
             raise e
@@ -182,33 +302,78 @@ class DatabaseHandler:
     
     @staticmethod
     def export_chat_history_csv(user_id):
-        """Export chat history as CSV data"""
-        import csv
-        import io
-        
-        chats = ChatHistory.query.filter_by(user_id=user_id)\
-            .order_by(ChatHistory.timestamp.desc())\
-            .all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['Timestamp', 'User Query', 'Bot Response', 'Intent', 'Confidence', 'Entities'])
-        
-        # Write data
-        for chat in chats:
-            writer.writerow([
+        """Export chat history as CSV data (use iter_chat_history_csv to stream it)"""
+        return b''.join(DatabaseHandler.iter_chat_history_csv(user_id)).decode('utf-8')
+    
+    @staticmethod
+    def iter_chat_history_csv(user_id, batch_size=500):
+        """Full-text CSV export as UTF-8 byte chunks, reading batch_size rows at a time"""
+        return stream_csv(
+            iter_history_rows(user_id, batch_size=batch_size),
+            header=['Timestamp', 'User Query', 'Bot Response', 'Intent', 'Confidence', 'Entities'],
+            to_row=lambda chat: [
                 chat.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
                 chat.user_query,
                 chat.bot_response,
                 chat.intent or '',
                 f"{chat.confidence * 100:.1f}%" if chat.confidence else '',
                 chat.entities or ''
-            ])
+            ]
+        )
+    
+    @staticmethod
+    def scrub_pii_in_history(user_id=None, batch_size=500, hashed=True):
+        """
+        Mask PII in stored chat history, batch_size rows per transaction
+        
+        Args:
+            user_id: Only scrub this user's history (None = everyone)
+            batch_size: Rows read, masked and written back per commit
+            hashed: Use hashed masks ([EMAIL_1a2b3c4d]) rather than plain labels
+        
+        Returns:
+            dict with rows scanned and rows updated
+        """
+        table = ChatHistory.__table__
+        update = table.update()\
+            .where(table.c.id == bindparam('row_id'))\
+            .values(user_query=bindparam('new_query'), bot_response=bindparam('new_response'))
         
-        output.seek(0)
-        return output.getvalue()
+        scanned = updated = 0
+        last_id = 0
+        try:
+            while True:
+                query = db.select(table.c.id, table.c.user_query, table.c.bot_response)\
+                    .where(table.c.id > last_id)\
+                    .order_by(table.c.id)\
+                    .limit(batch_size)
+                if user_id is not None:
+                    query = query.where(table.c.user_id == user_id)
+                
+                rows = db.session.execute(query).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                scanned += len(rows)
+                
+                masked_queries = pii_handler.detect_and_mask_batch([row.user_query for row in rows], hashed=hashed)
+                masked_responses = pii_handler.detect_and_mask_batch([row.bot_response for row in rows], hashed=hashed)
+                
+                changes = [
+                    {'row_id': row.id, 'new_query': new_query, 'new_response': new_response}
+                    for row, (new_query, query_types), (new_response, response_types)
+                    in zip(rows, masked_queries, masked_responses)
+                    if query_types or response_types
+                ]
+                if changes:
+                    db.session.execute(update, changes)
+                    updated += len(changes)
+                db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise e
+        
+        return {'scanned': scanned, 'updated': updated}
     
     @staticmethod
     def cleanup_old_records(days_to_keep=90):
@@ -225,6 +390,9 @@ class DatabaseHandler:
             old_analytics = UserAnalytics.query.filter(
                 UserAnalytics.date < cutoff_date.date()
             ).delete()
+            UserIntentCount.query.filter(
+                UserIntentCount.date < cutoff_date.date()
+            ).delete()
             
             db.session.commit()
             
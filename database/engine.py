@@ -0,0 +1,91 @@
+"""
+Database engine profiles for AI Medical Chatbot
+SQLite gets WAL journaling and tuned pragmas on every new connection;
+server databases (DATABASE_URL=postgresql://...) get a pre-pinged connection pool
+"""
+from typing import Any, Dict, Mapping
+
+from sqlalchemy import event
+
+
+def is_sqlite(uri: str) -> bool:
+    return uri.startswith('sqlite')
+
+
+def normalize_database_uri(uri: str) -> str:
+    """Accept the postgres:// scheme many hosts hand out; SQLAlchemy only knows postgresql://"""
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def sqlite_pragmas(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """PRAGMA name -> value applied to each SQLite connection"""
+    pragmas = {
+        'synchronous': config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': -int(config.get('SQLITE_CACHE_SIZE_KB', 65536)),  # negative = KiB
+        'mmap_size': int(config.get('SQLITE_MMAP_SIZE', 268435456)),
+        'busy_timeout': int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'temp_store': 'MEMORY'
+    }
+    if config.get('SQLITE_WAL', True):
+        pragmas = {'journal_mode': 'WAL', **pragmas}
+    return pragmas
+
+
+def build_engine_options(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database
+
+    Args:
+        config: Flask app.config (or any mapping with the DB_* / SQLITE_* keys)
+
+    Returns:
+        Keyword arguments for create_engine()
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = {
+        'pool_size': int(config.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(config.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(config.get('DB_POOL_TIMEOUT', 30))
+    }
+
+    if is_sqlite(uri):
+        if ':memory:' in uri or uri.rstrip('/') in ('sqlite:', 'sqlite:/', 'sqlite://'):
+            return {}  # in-memory databases use a single shared connection
+
+        # Socket.IO and the background workers use connections from several threads;
+        # the pool hands each connection to one thread at a time
+        options['connect_args'] = {
+            'check_same_thread': False,
+            'timeout': int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000.0
+        }
+        return options
+
+    options['pool_pre_ping'] = True
+    options['pool_recycle'] = int(config.get('DB_POOL_RECYCLE', 1800))
+    return options
+
+
+def install_sqlite_pragmas(engine, pragmas: Mapping[str, Any]) -> bool:
+    """
+    Run the pragmas on every new connection of a SQLite engine
+
+    Returns:
+        False when the engine is not SQLite (nothing installed)
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    # Connections opened before the listener existed keep stock settings
+    engine.dispose()
+    return True
@@ -0,0 +1,151 @@
+"""
+Streaming chat history export for AI Medical Chatbot
+Rows are read from the database in batches (yield_per) and written out as CSV
+or JSON Lines chunk by chunk, optionally gzip-compressed on the fly, so memory
+use stays flat however long the history is.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from sqlalchemy import select
+
+from .models import db, ChatHistory
+
+EXPORT_FORMATS = {
+    'csv': {'mimetype': 'text/csv', 'extension': 'csv'},
+    'jsonl': {'mimetype': 'application/x-ndjson', 'extension': 'jsonl'}
+}
+
+# Header and row layout of the dashboard's CSV download
+CSV_HEADER = ['ID', 'Timestamp', 'User Query', 'AI Response', 'Intent', 'Confidence', 'Processing Time (s)']
+
+_EXPORT_COLUMNS = (
+    ChatHistory.id,
+    ChatHistory.timestamp,
+    ChatHistory.user_query,
+    ChatHistory.bot_response,
+    ChatHistory.intent,
+    ChatHistory.entities,
+    ChatHistory.confidence,
+    ChatHistory.processing_time
+)
+
+
+def iter_history_rows(user_id: int, batch_size: int = 500) -> Iterator[Any]:
+    """
+    A user's chat history, newest first, fetched batch_size rows at a time
+
+    Yields plain column rows rather than ORM objects, so nothing piles up in
+    the session's identity map during a long export.
+    """
+    statement = select(*_EXPORT_COLUMNS)\
+        .where(ChatHistory.user_id == user_id)\
+        .order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc())\
+        .execution_options(yield_per=batch_size)
+
+    result = db.session.execute(statement)
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def csv_row(row) -> list:
+    return [
+        row.id,
+        row.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        row.user_query[:200],
+        row.bot_response[:200],
+        row.intent or 'N/A',
+        f"{row.confidence * 100:.1f}%" if row.confidence else 'N/A',
+        f"{row.processing_time:.2f}" if row.processing_time else 'N/A'
+    ]
+
+
+def jsonl_record(row) -> dict:
+    try:
+        entities = json.loads(row.entities) if row.entities else []
+    except (json.JSONDecodeError, TypeError):
+        entities = []
+    return {
+        'id': row.id,
+        'timestamp': row.timestamp.isoformat(),
+        'user_query': row.user_query,
+        'bot_response': row.bot_response,
+        'intent': row.intent,
+        'entities': entities,
+        'confidence': row.confidence,
+        'processing_time': row.processing_time
+    }
+
+
+def stream_csv(rows: Iterable[Any], header: Sequence[str] = CSV_HEADER,
+               to_row: Callable[[Any], list] = csv_row, chunk_size: int = 65536) -> Iterator[bytes]:
+    """Encode rows as UTF-8 CSV, yielding roughly chunk_size bytes at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    for row in rows:
+        writer.writerow(to_row(row))
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_jsonl(rows: Iterable[Any], to_record: Callable[[Any], dict] = jsonl_record,
+                 chunk_size: int = 65536) -> Iterator[bytes]:
+    """Encode rows as JSON Lines, yielding roughly chunk_size bytes at a time"""
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(to_record(row), ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+            size = 0
+
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into gzip format incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_history(user_id: int, fmt: str = 'csv', compress: bool = False,
+                   batch_size: int = 500) -> Iterator[bytes]:
+    """
+    Byte chunks of a user's chat history export
+
+    Args:
+        user_id: Owner of the history
+        fmt: 'csv' or 'jsonl'
+        compress: gzip the output on the fly
+        batch_size: Rows fetched from the database per round trip
+
+    Raises:
+        ValueError: for an unknown format
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    rows = iter_history_rows(user_id, batch_size=batch_size)
+    chunks = stream_csv(rows) if fmt == 'csv' else stream_jsonl(rows)
+    return gzip_stream(chunks) if compress else chunks
@@ -0,0 +1,181 @@
+"""
+Lightweight schema migrations for AI Medical Chatbot
+db.create_all() only creates missing tables, so changes to existing tables
+(indexes, constraints, new tables fed from old data) are applied here, once,
+in version order. Applied versions are recorded in the schema_version table.
+"""
+import json
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+
+from .models import db, UserIntentCount
+from .search import create_fts_index, drop_fts_index
+
+SCHEMA_VERSION_TABLE = 'schema_version'
+
+
+def _merge_duplicate_daily_analytics(conn):
+    """Fold duplicate (user_id, date) analytics rows into the oldest one"""
+    duplicates = conn.execute(text(
+        "SELECT user_id, date FROM user_analytics "
+        "GROUP BY user_id, date HAVING COUNT(*) > 1"
+    )).fetchall()
+
+    for user_id, day in duplicates:
+        rows = conn.execute(text(
+            "SELECT id, total_chats, avg_confidence, common_intents FROM user_analytics "
+            "WHERE user_id = :user_id AND date = :day ORDER BY id"
+        ), {'user_id': user_id, 'day': day}).fetchall()
+
+        total_chats = sum(row.total_chats or 0 for row in rows)
+        weighted_confidence = sum((row.avg_confidence or 0.0) * (row.total_chats or 0) for row in rows)
+        intents = {}
+        for row in rows:
+            try:
+                for intent, count in json.loads(row.common_intents or '{}').items():
+                    intents[intent] = intents.get(intent, 0) + count
+            except (json.JSONDecodeError, TypeError, AttributeError):
+                continue
+
+        keep_id = rows[0].id
+        conn.execute(text(
+            "UPDATE user_analytics SET total_chats = :total, avg_confidence = :confidence, "
+            "common_intents = :intents WHERE id = :id"
+        ), {
+            'total': total_chats,
+            'confidence': weighted_confidence / total_chats if total_chats else 0.0,
+            'intents': json.dumps(intents),
+            'id': keep_id
+        })
+        conn.execute(text(
+            "DELETE FROM user_analytics WHERE user_id = :user_id AND date = :day AND id != :id"
+        ), {'user_id': user_id, 'day': day, 'id': keep_id})
+
+    if duplicates:
+        print(f"🔧 Merged duplicate daily analytics for {len(duplicates)} user/day pairs")
+
+
+def _add_history_and_analytics_indexes(conn):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_chat_history_user_timestamp ON chat_history (user_id, timestamp)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_chat_history_user_intent ON chat_history (user_id, intent)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_chat_history_timestamp ON chat_history (timestamp)"
+    ))
+
+    # The unique index fails on existing duplicates, so merge them first
+    _merge_duplicate_daily_analytics(conn)
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_analytics_user_date ON user_analytics (user_id, date)"
+    ))
+
+
+def _backfill_intent_counts(conn):
+    """Copy the JSON intent counts of user_analytics into the normalized user_intent_count table"""
+    UserIntentCount.__table__.create(conn, checkfirst=True)
+
+    rows = conn.execute(text(
+        "SELECT user_id, date, common_intents FROM user_analytics "
+        "WHERE common_intents IS NOT NULL AND common_intents != '{}'"
+    )).fetchall()
+
+    counts = []
+    for row in rows:
+        try:
+            intents = json.loads(row.common_intents)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        for intent, count in intents.items():
+            if intent and count:
+                counts.append({'user_id': row.user_id, 'date': row.date, 'intent': intent[:50], 'count': int(count)})
+
+    # Counters written by new code before this ran (none in practice) are kept and added to
+    for entry in counts:
+        updated = conn.execute(text(
+            "UPDATE user_intent_count SET count = count + :count "
+            "WHERE user_id = :user_id AND date = :date AND intent = :intent"
+        ), entry).rowcount
+        if not updated:
+            conn.execute(text(
+                "INSERT INTO user_intent_count (user_id, date, intent, count) "
+                "VALUES (:user_id, :date, :intent, :count)"
+            ), entry)
+
+    print(f"🔧 Migrated {len(counts)} intent counters from {len(rows)} analytics rows")
+
+
+def _add_chat_search_index(conn):
+    if create_fts_index(conn):
+        print("🔧 Indexed chat history for full-text search")
+    else:
+        print("⚠️ No full-text index on this database; chat search uses LIKE")
+
+
+# (version, description, function(connection)) - append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, 'Composite indexes on chat_history, unique (user_id, date) on user_analytics',
+     _add_history_and_analytics_indexes),
+    (2, 'Normalized user_intent_count table backfilled from user_analytics.common_intents',
+     _backfill_intent_counts),
+    (3, 'FTS5 full-text index over chat_history queries and responses (SQLite)',
+     _add_chat_search_index),
+]
+
+
+def get_schema_version(conn) -> int:
+    """Highest applied migration version (0 for a database that has never been migrated)"""
+    return conn.execute(text(f"SELECT COALESCE(MAX(version), 0) FROM {SCHEMA_VERSION_TABLE}")).scalar()
+
+
+def drop_unmapped_schema():
+    """
+    Drop what db.drop_all() leaves behind: the FTS index and the schema_version
+    table. Call together with drop_all() so run_migrations() starts from scratch.
+    """
+    with db.engine.begin() as conn:
+        drop_fts_index(conn)
+        conn.execute(text(f"DROP TABLE IF EXISTS {SCHEMA_VERSION_TABLE}"))
+
+
+def run_migrations() -> int:
+    """
+    Apply pending migrations; call after db.create_all() inside an app context
+
+    Each migration runs in its own transaction together with its
+    schema_version row, so a failure leaves the database at the previous
+    version and the migration is retried on the next start.
+
+    Returns:
+        Number of migrations applied
+    """
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR(200) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL)"
+        ))
+        current = get_schema_version(conn)
+
+    applied = 0
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+
+        print(f"🔧 Applying database migration {version}: {description}")
+        with db.engine.begin() as conn:
+            migrate(conn)
+            conn.execute(text(
+                f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description, applied_at) "
+                "VALUES (:version, :description, :applied_at)"
+            ), {'version': version, 'description': description, 'applied_at': datetime.utcnow()})
+        applied += 1
+
+    if applied:
+        print(f"✅ Database schema at version {MIGRATIONS[-1][0]} ({applied} migration(s) applied)")
+    return applied
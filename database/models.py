@@ -1,7 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-import json
 
 db = SQLAlchemy()
 
@@ -17,6 +16,13 @@ class User(UserMixin, db.Model):
     analytics = db.relationship('UserAnalytics', backref='user', lazy=True)
 
 class ChatHistory(db.Model):
+    # Every history/analytics endpoint filters on user_id and sorts or ranges on timestamp
+    __table_args__ = (
+        db.Index('ix_chat_history_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_chat_history_user_intent', 'user_id', 'intent'),
+        db.Index('ix_chat_history_timestamp', 'timestamp'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user_query = db.Column(db.Text, nullable=False)
@@ -39,14 +45,26 @@ class ChatHistory(db.Model):
         }
 
 class UserAnalytics(db.Model):
+    # One analytics row per user per day
+    __table_args__ = (
+        db.Index('uq_user_analytics_user_date', 'user_id', 'date', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, default=datetime.utcnow, nullable=False)
     total_chats = db.Column(db.Integer, default=0, nullable=False)
     avg_confidence = db.Column(db.Float, default=0.0, nullable=False)
-    common_intents = db.Column(db.Text, default='{}')  
+    common_intents = db.Column(db.Text, default='{}')  # legacy JSON counts, superseded by UserIntentCount
+
+class UserIntentCount(db.Model):
+    """Per-user, per-day intent counters; incremented atomically and aggregated with GROUP BY"""
+    __table_args__ = (
+        db.Index('uq_user_intent_count_user_date_intent', 'user_id', 'date', 'intent', unique=True),
+    )
     
-    def update_intents(self, intent):
-        intents_dict = json.loads(self.common_intents) if self.common_intents else {}
-        intents_dict[intent] = intents_dict.get(intent, 0) + 1
-        self.common_intents = json.dumps(intents_dict)
\ No newline at end of file
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    intent = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
@@ -0,0 +1,86 @@
+"""
+Keyset (cursor) pagination for AI Medical Chatbot
+Pages of chat history are read with WHERE (timestamp, id) < (last seen) instead
+of OFFSET, so every page costs the same indexed range scan however deep it is.
+Cursors are opaque URL-safe tokens; clients pass back the next_cursor they got.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import db, ChatHistory
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token was not produced by encode_cursor()"""
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Opaque token for a position (timestamp/id for keyset pages, offset for ranked results)"""
+    payload = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """
+    Position stored in a cursor token; an empty token means the first page
+
+    Raises:
+        InvalidCursor: if the token is malformed
+    """
+    if not token:
+        return {}
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        position = json.loads(payload)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}") from e
+    if not isinstance(position, dict):
+        raise InvalidCursor("Malformed cursor")
+    return position
+
+
+def history_cursor(record: ChatHistory) -> str:
+    """Cursor pointing just past a chat history record (newest-first order)"""
+    return encode_cursor({'ts': record.timestamp.isoformat(), 'id': record.id})
+
+
+def keyset_history_page(user_id: int, cursor: str = '',
+                        limit: int = 20) -> Tuple[List[ChatHistory], Optional[str]]:
+    """
+    One page of a user's chat history, newest first
+
+    Args:
+        user_id: Owner of the history
+        cursor: next_cursor of the previous page, or '' for the first page
+        limit: Records per page
+
+    Returns:
+        (records, next_cursor) - next_cursor is None on the last page
+
+    Raises:
+        InvalidCursor: if the cursor is malformed
+    """
+    position = decode_cursor(cursor)
+    query = ChatHistory.query.filter(ChatHistory.user_id == user_id)
+
+    if position:
+        try:
+            last_timestamp = datetime.fromisoformat(position['ts'])
+            last_id = int(position['id'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidCursor(f"Malformed cursor: {e}") from e
+
+        # id breaks ties between chats saved within the same timestamp
+        query = query.filter(db.or_(
+            ChatHistory.timestamp < last_timestamp,
+            db.and_(ChatHistory.timestamp == last_timestamp, ChatHistory.id < last_id)
+        ))
+
+    # One extra row tells whether another page exists without a COUNT(*)
+    records = query.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1).all()
+    if len(records) <= limit:
+        return records, None
+    records = records[:limit]
+    return records, history_cursor(records[-1])
@@ -0,0 +1,241 @@
+"""
+Chat history search for AI Medical Chatbot
+On SQLite, queries and responses are indexed in an FTS5 table (chat_history_fts)
+kept in sync by triggers; results are ranked with bm25 and come with highlighted
+snippets. Other databases, or SQLite builds without FTS5, fall back to LIKE.
+"""
+import html
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from .models import db, ChatHistory
+
+FTS_TABLE = 'chat_history_fts'
+
+# Private-use characters mark matches inside snippets so the surrounding text
+# can be HTML-escaped before the markers become <mark> tags
+_MATCH_START = '\ue000'
+_MATCH_END = '\ue001'
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def create_fts_index(conn) -> bool:
+    """
+    Create the FTS5 table and its sync triggers, then index existing rows
+
+    Returns:
+        False when the database is not SQLite or SQLite was built without FTS5
+    """
+    if conn.dialect.name != 'sqlite':
+        return False
+
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "user_query, bot_response, "
+            "content='chat_history', content_rowid='id', "
+            "tokenize='porter unicode61 remove_diacritics 2')"
+        ))
+    except Exception as e:
+        savepoint.rollback()
+        print(f"⚠️ FTS5 unavailable, chat search will use LIKE: {e}")
+        return False
+    savepoint.commit()
+
+    # External-content table: the triggers mirror every insert, update and delete
+    # on chat_history, including bulk deletes that bypass the ORM
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON chat_history BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, user_query, bot_response) "
+        "VALUES (new.id, new.user_query, new.bot_response); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON chat_history BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_query, bot_response) "
+        "VALUES ('delete', old.id, old.user_query, old.bot_response); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF user_query, bot_response ON chat_history BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_query, bot_response) "
+        "VALUES ('delete', old.id, old.user_query, old.bot_response); "
+        f"INSERT INTO {FTS_TABLE}(rowid, user_query, bot_response) "
+        "VALUES (new.id, new.user_query, new.bot_response); END"
+    ))
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def drop_fts_index(conn):
+    """Remove the FTS5 table and triggers (db.drop_all() does not know about them)"""
+    if conn.dialect.name != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression
+
+    Every word must appear (implicit AND) and the last word is matched as a
+    prefix, so results keep up while the user is typing. Words are quoted, so
+    FTS5 operators and punctuation in the input are treated as plain text.
+
+    Returns:
+        None when the text contains no searchable words
+    """
+    tokens = _TOKEN_PATTERN.findall(search)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def render_snippet(snippet: Optional[str]) -> Optional[str]:
+    """HTML-escape a marked snippet and turn the match markers into <mark> tags"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+
+
+def highlight_text(value: str, search: str, context: int = 60) -> str:
+    """
+    Snippet of value around the first case-insensitive occurrence of search,
+    in the same escaped <mark> format as the FTS snippets (LIKE fallback and
+    rows not yet written to the database)
+    """
+    value = value or ''
+    position = value.lower().find(search.lower()) if search else -1
+    if position < 0:
+        snippet = value[:context * 2] + ('…' if len(value) > context * 2 else '')
+        return html.escape(snippet)
+
+    start = max(0, position - context)
+    end = min(len(value), position + len(search) + context)
+    snippet = (
+        ('…' if start > 0 else '') + value[start:position]
+        + _MATCH_START + value[position:position + len(search)] + _MATCH_END
+        + value[position + len(search):end] + ('…' if end < len(value) else '')
+    )
+    return render_snippet(snippet)
+
+
+class ChatHistorySearch:
+    """
+    Searches one user's chat history.
+
+    Whether the FTS5 index exists is checked once per engine and remembered,
+    so each search costs a single indexed MATCH query plus a count.
+    """
+
+    def __init__(self, snippet_tokens: int = 16):
+        """
+        Args:
+            snippet_tokens: Approximate number of words in each highlighted snippet
+        """
+        self.snippet_tokens = snippet_tokens
+        self._fts_available: Dict[str, bool] = {}
+
+    def fts_available(self) -> bool:
+        """True when the current database has the FTS5 index"""
+        engine = db.engine
+        key = str(engine.url)
+        if key not in self._fts_available:
+            available = False
+            if engine.dialect.name == 'sqlite':
+                with engine.connect() as conn:
+                    available = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+                    ), {'name': FTS_TABLE}).first() is not None
+            self._fts_available[key] = available
+        return self._fts_available[key]
+
+    def reset(self):
+        """Forget the availability check, e.g. after the index was created or dropped"""
+        self._fts_available.clear()
+
+    def search(self, user_id: int, search: str, limit: int = 10,
+               offset: int = 0) -> List[Tuple[ChatHistory, Dict[str, Any]]]:
+        """
+        Matching chats of a user, best match first
+
+        Returns:
+            List of (ChatHistory, highlight) where highlight has HTML-safe
+            user_query/bot_response snippets with <mark> around matches and,
+            for FTS results, the bm25 rank (lower is better)
+        """
+        match = build_match_query(search) if self.fts_available() else None
+        if match is None:
+            return self._search_like(user_id, search, limit, offset)
+
+        rows = db.session.execute(text(
+            f"SELECT chat_history.id AS id, "
+            f"snippet({FTS_TABLE}, 0, :start, :end, '…', :tokens) AS query_snippet, "
+            f"snippet({FTS_TABLE}, 1, :start, :end, '…', :tokens) AS response_snippet, "
+            f"bm25({FTS_TABLE}, 2.0, 1.0) AS rank "
+            f"FROM {FTS_TABLE} JOIN chat_history ON chat_history.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match AND chat_history.user_id = :user_id "
+            "ORDER BY rank, chat_history.timestamp DESC LIMIT :limit OFFSET :offset"
+        ), {
+            'start': _MATCH_START,
+            'end': _MATCH_END,
+            'tokens': self.snippet_tokens,
+            'match': match,
+            'user_id': user_id,
+            'limit': limit,
+            'offset': offset
+        }).fetchall()
+
+        if not rows:
+            return []
+
+        records = {
+            record.id: record
+            for record in ChatHistory.query.filter(ChatHistory.id.in_([row.id for row in rows])).all()
+        }
+        return [
+            (records[row.id], {
+                'user_query': render_snippet(row.query_snippet),
+                'bot_response': render_snippet(row.response_snippet),
+                'rank': row.rank
+            })
+            for row in rows if row.id in records
+        ]
+
+    def count(self, user_id: int, search: str) -> int:
+        """Number of chats of a user matching search"""
+        match = build_match_query(search) if self.fts_available() else None
+        if match is None:
+            return self._like_query(user_id, search).count()
+
+        return db.session.execute(text(
+            f"SELECT COUNT(*) FROM {FTS_TABLE} JOIN chat_history ON chat_history.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match AND chat_history.user_id = :user_id"
+        ), {'match': match, 'user_id': user_id}).scalar()
+
+    @staticmethod
+    def _like_query(user_id: int, search: str):
+        return ChatHistory.query.filter(
+            ChatHistory.user_id == user_id,
+            (ChatHistory.user_query.contains(search)) |
+            (ChatHistory.bot_response.contains(search))
+        )
+
+    def _search_like(self, user_id: int, search: str, limit: int,
+                     offset: int) -> List[Tuple[ChatHistory, Dict[str, Any]]]:
+        records = self._like_query(user_id, search)\
+            .order_by(ChatHistory.timestamp.desc())\
+            .offset(offset).limit(limit).all()
+        return [
+            (record, {
+                'user_query': highlight_text(record.user_query, search),
+                'bot_response': highlight_text(record.bot_response, search)
+            })
+            for record in records
+        ]
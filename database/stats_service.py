@@ -0,0 +1,125 @@
+"""
+Per-user dashboard statistics for AI Medical Chatbot
+Aggregates are computed with a couple of indexed queries per user and cached briefly
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from .db_handler import DatabaseHandler
+from .models import db, ChatHistory
+
+
+class UserStatsService:
+    """
+    Computes the stats shown on the dashboard (total chats, average
+    confidence, most common intent, last activity).
+
+    Each computation touches only the requesting user's rows, and results are
+    cached for ttl_seconds. Writers call invalidate() after committing so the
+    next read reflects the new chat.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_users: int = 1024, intent_window_days: int = 30):
+        """
+        Args:
+            ttl_seconds: How long a computed result is reused; 0 disables caching
+            max_users: Cached users kept before the oldest entries are dropped
+            intent_window_days: Look-back window for the most common intent
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.intent_window_days = intent_window_days
+
+        self._lock = threading.Lock()
+        self._cache: Dict[int, tuple] = {}     # user_id -> (expires_at, raw stats)
+        self._generations: Dict[int, int] = {}  # bumped on invalidate to drop in-flight results
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, user_id: int) -> Dict[str, Any]:
+        """
+        Get statistics for a user
+
+        Returns:
+            dict with total_chats, avg_confidence, most_common_intent, last_active
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(user_id)
+            generation = self._generations.get(user_id, 0)
+            if cached and cached[0] > now:
+                self.stats['hits'] += 1
+                return self._format(cached[1])
+            self.stats['misses'] += 1
+
+        raw = self._compute(user_id)
+
+        if self.ttl_seconds > 0:
+            with self._lock:
+                # A save that landed while we were querying makes this result stale
+                if self._generations.get(user_id, 0) == generation:
+                    if len(self._cache) >= self.max_users and user_id not in self._cache:
+                        self._cache.pop(next(iter(self._cache)))
+                    self._cache[user_id] = (now + self.ttl_seconds, raw)
+
+        return self._format(raw)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Drop the cached stats of one user, or of everyone when user_id is None"""
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+                for key in self._generations:
+                    self._generations[key] += 1
+            else:
+                self._cache.pop(user_id, None)
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self.stats['invalidations'] += 1
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for status endpoints"""
+        with self._lock:
+            return {**self.stats, 'cached_users': len(self._cache), 'ttl_seconds': self.ttl_seconds}
+
+    def _compute(self, user_id: int) -> Dict[str, Any]:
+        """Run the aggregate queries for one user"""
+        total_chats, avg_confidence, last_timestamp = db.session.query(
+            db.func.count(ChatHistory.id),
+            db.func.avg(ChatHistory.confidence),
+            db.func.max(ChatHistory.timestamp)
+        ).filter(ChatHistory.user_id == user_id).one()
+
+        window_start = datetime.utcnow().date() - timedelta(days=self.intent_window_days)
+        top_intents = DatabaseHandler.get_intent_distribution(user_id, start_date=window_start, limit=1)
+
+        return {
+            'total_chats': total_chats or 0,
+            'avg_confidence': round((avg_confidence or 0) * 100, 1),
+            'most_common_intent': next(iter(top_intents), None),
+            'last_timestamp': last_timestamp
+        }
+
+    @staticmethod
+    def _format(raw: Dict[str, Any]) -> Dict[str, Any]:
+        """Render cached raw values; last_active is relative to now so it is never cached"""
+        most_common_intent = raw['most_common_intent']
+        last_timestamp = raw['last_timestamp']
+
+        if last_timestamp:
+            time_diff = (datetime.utcnow() - last_timestamp).total_seconds()
+            if time_diff < 60:
+                last_active = 'Just now'
+            elif time_diff < 3600:
+                last_active = f'{int(time_diff // 60)} min ago'
+            else:
+                last_active = last_timestamp.strftime('%H:%M')
+        else:
+            last_active = 'Never'
+
+        return {
+            'total_chats': raw['total_chats'],
+            'avg_confidence': raw['avg_confidence'],
+            'most_common_intent': most_common_intent.replace('_', ' ').upper() if most_common_intent else 'N/A',
+            'last_active': last_active
+        }
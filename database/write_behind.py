@@ -0,0 +1,286 @@
+"""
+Write-behind buffer for chat history
+Queues ChatHistory rows and daily analytics increments in memory and writes
+them in batches, so bursts of chats share one transaction instead of each
+paying its own commit and fsync
+"""
+import atexit
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+
+from .db_handler import DatabaseHandler
+from .models import db, ChatHistory
+
+# Errors that say nothing about the rows themselves (database locked, connection
+# lost, pool exhausted); batches failing with these are retried, never dropped
+TRANSIENT_ERRORS = (OperationalError, PoolTimeoutError)
+
+
+class ChatWriteBehind:
+    """
+    Buffers chat rows and flushes them when batch_size rows are pending or
+    flush_interval seconds have passed, whichever comes first.
+
+    Analytics increments are merged per (user_id, date) before flushing, so
+    a batch costs one upsert per active user-day rather than one per chat.
+    Rows stay visible through pending_for_user() until their batch commits.
+    """
+
+    def __init__(self,
+                 batch_size: int = 50,
+                 flush_interval: float = 0.5,
+                 max_pending: int = 5000,
+                 max_batch_attempts: int = 5,
+                 wrapper: Optional[Callable[[Callable], Any]] = None,
+                 on_flush: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """
+        Args:
+            batch_size: Pending rows that trigger an immediate flush
+            flush_interval: Maximum seconds a row waits before being written
+            max_pending: Buffer limit; enqueue() refuses rows beyond it so callers can write directly
+            max_batch_attempts: Failed attempts after which a batch is written row by row,
+                dropping only the rows that fail with a permanent error (constraint, bad data);
+                transient errors are retried with backoff however often they happen
+            wrapper: Runs each flush, e.g. inside a Flask app context
+            on_flush: Called with the rows of every committed batch (stats invalidation, broadcasts)
+        """
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_batch_attempts = max(1, max_batch_attempts)
+        self.wrapper = wrapper
+        self.on_flush = on_flush
+
+        self._lock = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._in_flight: List[Dict[str, Any]] = []
+        self._oldest_pending: Optional[float] = None
+        self._retry_delay = 0.0
+        self._failed_attempts = 0
+        self._stats = {'enqueued': 0, 'flushed': 0, 'batches': 0, 'failed_batches': 0, 'rejected': 0, 'dropped': 0}
+
+        self._worker = threading.Thread(target=self._run, name='chat-write-behind', daemon=True)
+        self._worker.start()
+        atexit.register(self.drain)
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """
+        Buffer a ChatHistory row (column name -> value)
+
+        Returns:
+            False when the buffer is full; the caller should write the row itself
+        """
+        with self._lock:
+            if len(self._pending) + len(self._in_flight) >= self.max_pending:
+                self._stats['rejected'] += 1
+                return False
+
+            self._pending.append(row)
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            self._stats['enqueued'] += 1
+            if len(self._pending) >= self.batch_size:
+                self._lock.notify()
+            return True
+
+    def pending_for_user(self, user_id: int) -> List[Dict[str, Any]]:
+        """Rows of a user that are not committed yet, newest first (read-your-writes)"""
+        with self._lock:
+            rows = [row for row in self._in_flight + self._pending if row['user_id'] == user_id]
+        return sorted(rows, key=lambda row: row['timestamp'], reverse=True)
+
+    def discard_user(self, user_id: int) -> int:
+        """
+        Drop a user's queued rows, e.g. when they clear their history
+
+        Waits for a batch that is already being written, so once this returns
+        none of the user's buffered rows (or their analytics increments) can
+        still be committed; delete the user's stored rows after calling it.
+        """
+        with self._flush_lock:
+            with self._lock:
+                before = len(self._pending)
+                self._pending = [row for row in self._pending if row['user_id'] != user_id]
+                if not self._pending:
+                    self._oldest_pending = None
+                return before - len(self._pending)
+
+    def flush(self) -> int:
+        """Write everything pending right now; returns the number of rows committed"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = []
+                self._oldest_pending = None
+                self._in_flight = batch
+
+            unwritten = []
+            try:
+                self._write(batch)
+            except Exception as e:
+                with self._lock:
+                    self._failed_attempts += 1
+                    self._stats['failed_batches'] += 1
+                    attempts = self._failed_attempts
+
+                if isinstance(e, TRANSIENT_ERRORS) or attempts < self.max_batch_attempts:
+                    print(f"❌ Write-behind flush of {len(batch)} rows failed "
+                          f"(attempt {attempts}), will retry: {e}")
+                    self._requeue(batch)
+                    return 0
+
+                # A row that can never be written must not block everything behind it
+                print(f"⚠️ Write-behind flush of {len(batch)} rows failed {attempts} times, "
+                      f"writing rows one by one: {e}")
+                batch, unwritten = self._write_rows_individually(batch)
+                if unwritten:
+                    self._requeue(unwritten)
+
+            with self._lock:
+                self._in_flight = []
+                self._stats['flushed'] += len(batch)
+                if batch:
+                    self._stats['batches'] += 1
+                if not unwritten:
+                    self._retry_delay = 0.0
+                    self._failed_attempts = 0
+
+        if self.on_flush and batch:
+            try:
+                self.on_flush(batch)
+            except Exception as e:
+                print(f"⚠️ Write-behind on_flush callback failed: {e}")
+
+        return len(batch)
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Flush until the buffer is empty (called at shutdown); returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                empty = not self._pending and not self._in_flight
+            if empty:
+                return True
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    lost = len(self._pending) + len(self._in_flight)
+                print(f"❌ Write-behind drain timed out with {lost} rows unwritten")
+                return False
+            if not self.flush():
+                time.sleep(0.1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Buffer counters for status endpoints"""
+        with self._lock:
+            return {
+                **self._stats,
+                'pending': len(self._pending) + len(self._in_flight),
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval
+            }
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        if self.wrapper:
+            self.wrapper(lambda: self._write_batch(batch))
+        else:
+            self._write_batch(batch)
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        """Put unwritten rows back in front of anything queued meanwhile and back off"""
+        with self._lock:
+            self._pending = rows + self._pending
+            self._oldest_pending = time.monotonic()
+            self._in_flight = []
+            self._retry_delay = min(max(self._retry_delay * 2, 0.5), 30.0)
+
+    def _write_rows_individually(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Write each row in its own transaction
+
+        Rows failing with a permanent error are logged and dropped. A transient
+        error stops the pass: that row and the ones after it are returned for a retry.
+
+        Returns:
+            (rows written, rows still to write)
+        """
+        written = []
+        for i, row in enumerate(batch):
+            try:
+                self._write([row])
+                written.append(row)
+            except TRANSIENT_ERRORS as e:
+                print(f"❌ Write-behind row-by-row pass interrupted, will retry {len(batch) - i} rows: {e}")
+                return written, batch[i:]
+            except Exception as e:
+                print(f"❌ Dropping chat row for user {row.get('user_id')} "
+                      f"({row.get('timestamp')}) after repeated failures: {e}")
+                with self._lock:
+                    self._stats['dropped'] += 1
+        return written, []
+
+    @staticmethod
+    def _write_batch(batch: List[Dict[str, Any]]):
+        """Insert the rows and apply merged analytics increments in one transaction"""
+        increments: Dict[Tuple[int, Any], Dict[str, Any]] = {}
+        for row in batch:
+            key = (row['user_id'], row['timestamp'].date())
+            merged = increments.setdefault(key, {'chats': 0, 'confidence_sum': 0.0, 'intents': Counter()})
+            merged['chats'] += 1
+            merged['confidence_sum'] += row.get('confidence') or 0.0
+            if row.get('intent'):
+                merged['intents'][row['intent']] += 1
+
+        try:
+            db.session.execute(ChatHistory.__table__.insert(), batch)
+            for (user_id, day), merged in increments.items():
+                DatabaseHandler.upsert_daily_analytics(
+                    user_id,
+                    day=day,
+                    chats=merged['chats'],
+                    confidence_sum=merged['confidence_sum'],
+                    intents=dict(merged['intents'])
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while True:
+                    if self._pending and len(self._pending) >= self.batch_size and not self._retry_delay:
+                        break
+                    if self._oldest_pending is not None:
+                        due = self._oldest_pending + max(self.flush_interval, self._retry_delay)
+                        remaining = due - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._lock.wait(remaining)
+                    else:
+                        self._lock.wait()
+
+            self.flush()
+
+
+def new_chat_row(user_id: int, user_query: str, bot_response: str, intent: str = None,
+                 entities: str = None, confidence: float = None, processing_time: float = None) -> Dict[str, Any]:
+    """Column dict for ChatHistory with the timestamp taken now, as the row is queued"""
+    return {
+        'user_id': user_id,
+        'user_query': user_query,
+        'bot_response': bot_response,
+        'intent': intent,
+        'entities': entities,
+        'confidence': confidence,
+        'processing_time': processing_time,
+        'timestamp': datetime.utcnow()
+    }
@@ -6,11 +6,15 @@ from .rag_system import OptimizedMedicalRAG
 from .safety_checker import SafetyChecker
 from .embeddings import EmbeddingGenerator
 from .llama_model import OptimizedLLaMAModel
+from .response_cache import SemanticResponseCache
+from .toxicity import ToxicityScorer
 
 __all__ = [
     'MedicalNLP',
     'OptimizedMedicalRAG',
     'SafetyChecker',
     'EmbeddingGenerator',
-    'OptimizedLLaMAModel'  
+    'OptimizedLLaMAModel',
+    'SemanticResponseCache',
+    'ToxicityScorer'
 ]
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+CPU inference backends for the sentence embedding model
+Full-precision PyTorch (the default), int8 dynamic quantization of the
+Linear layers, or an ONNX Runtime export. Each backend returns an object
+with SentenceTransformer's encode() / get_sentence_embedding_dimension(),
+so EmbeddingGenerator does not care which one it holds.
+"""
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_BACKENDS = ('pytorch', 'int8', 'onnx')
+
+# Written next to the ONNX export; a different model name forces a re-export
+ONNX_ENCODER_CONFIG = 'encoder_config.json'
+
+
+def _build_pytorch_model(model_name: str, device: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+def _build_int8_model(model_name: str):
+    """Dynamic int8 quantization of the Linear layers, which dominate the transformer's CPU time"""
+    import torch
+
+    model = _build_pytorch_model(model_name, 'cpu')
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxSentenceEncoder:
+    """
+    SentenceTransformer-compatible encoder over an ONNX Runtime session.
+
+    Applies the same mean pooling over the attention mask and the same
+    max_seq_length truncation as the sentence-transformers models this
+    app uses (all-mpnet-base-v2, all-MiniLM-L6-v2).
+    """
+
+    def __init__(self, model_name: str, onnx_path: Optional[str] = None):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        saved = self._saved_config(onnx_path)
+        if saved and saved.get('model_name') == model_name:
+            self.model = ORTModelForFeatureExtraction.from_pretrained(onnx_path)
+            self.tokenizer = AutoTokenizer.from_pretrained(onnx_path)
+            self.max_seq_length = saved['max_seq_length']
+        else:
+            print(f"🔧 Exporting {model_name} to ONNX (first run only)...")
+            # The sentence-transformers config holds the truncation length
+            self.max_seq_length = _build_pytorch_model(model_name, 'cpu').max_seq_length
+            self.model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            if onnx_path:
+                self.model.save_pretrained(onnx_path)
+                self.tokenizer.save_pretrained(onnx_path)
+                with open(os.path.join(onnx_path, ONNX_ENCODER_CONFIG), 'w', encoding='utf-8') as f:
+                    json.dump({'model_name': model_name, 'max_seq_length': self.max_seq_length}, f, indent=2)
+
+        self.dimension = self.model.config.hidden_size
+
+        # The raw session is run directly: optimum exports sentence-transformers
+        # checkpoints with a token_embeddings output rather than the last_hidden_state
+        # ORTModelForFeatureExtraction.forward reads, and drops inputs folded to
+        # constants (token_type_ids for BERT models)
+        self.session = self.model.model
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        outputs = [node.name for node in self.session.get_outputs()]
+        self.token_output = 'last_hidden_state' if 'last_hidden_state' in outputs else 'token_embeddings'
+
+    @staticmethod
+    def _saved_config(onnx_path: Optional[str]):
+        if not onnx_path:
+            return None
+        config_path = os.path.join(onnx_path, ONNX_ENCODER_CONFIG)
+        if not (os.path.exists(config_path) and os.path.exists(os.path.join(onnx_path, 'model.onnx'))):
+            return None
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, convert_to_numpy=True,
+               normalize_embeddings=False, device=None):
+        """Embed texts as a (n, dim) float32 array; device is ignored (ONNX Runtime CPU provider)"""
+        if isinstance(texts, str):
+            texts = [texts]
+
+        # Similar lengths per batch keep padding short, as sentence-transformers does
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+
+        starts = range(0, len(texts), batch_size)
+        if show_progress_bar:
+            from tqdm import tqdm
+            starts = tqdm(starts, desc="Batches")
+
+        for start in starts:
+            batch_ids = order[start:start + batch_size]
+            inputs = self.tokenizer(
+                [texts[i] for i in batch_ids],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np'
+            )
+            feed = {name: inputs[name] for name in self.input_names}
+            token_embeddings = self.session.run([self.token_output], feed)[0]
+            mask = inputs['attention_mask'][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings[batch_ids] = pooled
+
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+
+def load_embedding_model(model_name: str, backend: str, device: str,
+                         onnx_path: Optional[str] = None) -> Tuple[str, object]:
+    """
+    Build the requested backend, falling back towards plain PyTorch
+
+    Returns:
+        (backend actually loaded, model)
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        print(f"⚠️ Unknown embedding backend '{backend}', using pytorch")
+        backend = 'pytorch'
+
+    if backend == 'onnx':
+        try:
+            return 'onnx', OnnxSentenceEncoder(model_name, onnx_path)
+        except Exception as e:
+            print(f"⚠️ ONNX Runtime embedding backend unavailable ({e}), trying int8")
+            backend = 'int8'
+
+    if backend == 'int8':
+        try:
+            return 'int8', _build_int8_model(model_name)
+        except Exception as e:
+            print(f"⚠️ int8 quantization failed ({e}), using full precision")
+
+    return 'pytorch', _build_pytorch_model(model_name, device)
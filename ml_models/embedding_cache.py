@@ -0,0 +1,190 @@
+"""
+Content-addressed cache for text embeddings
+Keeps recently used vectors in an in-memory LRU bounded by bytes and,
+optionally, every vector ever computed in a SQLite file so restarts and
+index rebuilds do not re-run the embedding model.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+DEFAULT_EMBEDDING_CACHE_CONFIG = {
+    'enabled': True,
+    'max_bytes': 64 * 1024 * 1024,
+    'persist_path': None  # SQLite file for the persistent tier, None for memory only
+}
+
+# Rough per-entry bookkeeping (key string, OrderedDict node, array header)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by a SHA-1 of the model namespace and the exact text.
+
+    Lookups check the memory tier first, then the persistent tier; disk hits
+    are promoted into memory. The namespace (model name and backend) is part
+    of every key, so vectors from another model are never returned.
+    """
+
+    def __init__(self,
+                 namespace: str,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 persist_path: Optional[str] = None):
+        """
+        Args:
+            namespace: Identifies the model producing the vectors
+            max_bytes: Memory budget for cached vectors; least recently used are evicted
+            persist_path: SQLite file for the persistent tier, None for memory only
+        """
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.persist_path = persist_path
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        if persist_path:
+            self._open_store(persist_path)
+
+    def _open_store(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " namespace TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+            print(f"✅ Embedding cache store: {path}")
+        except Exception as e:
+            print(f"⚠️ Could not open embedding cache store ({e}), using memory only")
+            self._db = None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.namespace}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the given keys; missing keys are absent from the result"""
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.stats['memory_hits'] += len(found)
+
+            from_disk: Dict[str, np.ndarray] = {}
+            if missing and self._db is not None:
+                from_disk = self._read_store(missing)
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+                found.update(from_disk)
+                self.stats['disk_hits'] += len(from_disk)
+
+            self.stats['misses'] += len(missing) - len(from_disk)
+
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        """Store freshly computed vectors in both tiers"""
+        if not vectors:
+            return
+
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+
+            if self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, namespace, dim, vector) VALUES (?, ?, ?, ?)",
+                        [
+                            (key, self.namespace, int(vector.shape[0]), np.asarray(vector, dtype=np.float32).tobytes())
+                            for key, vector in vectors.items()
+                        ]
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not persist embeddings: {e}")
+
+    def clear(self, persistent: bool = False):
+        """Empty the memory tier, and this namespace's rows on disk if persistent"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if persistent and self._db is not None:
+                self._db.execute("DELETE FROM embeddings WHERE namespace = ?", (self.namespace,))
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory usage for status endpoints"""
+        with self._lock:
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            lookups = hits + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._memory),
+                'memory_mb': round(self._memory_bytes / (1024 * 1024), 2),
+                'max_memory_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'persistent': self._db is not None,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _read_store(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        try:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not read embedding cache store: {e}")
+        return found
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the memory tier and evict down to the byte budget"""
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes + _ENTRY_OVERHEAD_BYTES
+
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes + _ENTRY_OVERHEAD_BYTES
+
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes + _ENTRY_OVERHEAD_BYTES
+            self.stats['evictions'] += 1
@@ -2,39 +2,64 @@
 Embedding generation for medical text using sentence-transformers/all-mpnet-base-v2
 """
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import torch
 import warnings
+
+from .embedding_backends import load_embedding_model
+from .embedding_cache import DEFAULT_EMBEDDING_CACHE_CONFIG, EmbeddingCache
+from .similarity import rank_candidates, rank_candidates_batch
 warnings.filterwarnings('ignore')
 
 class EmbeddingGenerator:
     """Generate embeddings for medical text"""
     
-    def __init__(self, model_name='sentence-transformers/all-mpnet-base-v2'):
+    def __init__(self, model_name='sentence-transformers/all-mpnet-base-v2', cache_config=None,
+                 backend='pytorch', onnx_path=None):
         """
         Initialize embedding generator
         
         Args:
             model_name (str): Name of the sentence transformer model
+            cache_config (dict): Overrides for DEFAULT_EMBEDDING_CACHE_CONFIG
+                (enabled, max_bytes, persist_path)
+            backend (str): 'pytorch' (fp32), 'int8' (dynamic quantization) or
+                'onnx' (ONNX Runtime); int8 and onnx run on CPU
+            onnx_path (str): Directory the ONNX export is saved to and reused from
         """
         self.model_name = model_name
+        self.backend = backend
+        self.onnx_path = onnx_path
         self.model = None
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self._load_model()
+        
+        # Keyed on the model and backend actually loaded, which may be a fallback
+        self.cache = None
+        cache_config = {**DEFAULT_EMBEDDING_CACHE_CONFIG, **(cache_config or {})}
+        if cache_config['enabled']:
+            self.cache = EmbeddingCache(
+                namespace=f"{self.model_name}:{self.backend}",
+                max_bytes=cache_config['max_bytes'],
+                persist_path=cache_config['persist_path']
+            )
     
     def _load_model(self):
-        """Load the sentence transformer model"""
+        """Load the sentence transformer model with the configured backend"""
         try:
-            print(f"Loading embedding model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name, device=self.device)
-            print(f"✅ Embedding model loaded successfully on {self.device}")
+            print(f"Loading embedding model: {self.model_name} ({self.backend})")
+            self.backend, self.model = load_embedding_model(
+                self.model_name, self.backend, self.device, self.onnx_path
+            )
+            if self.backend != 'pytorch':
+                self.device = 'cpu'
+            print(f"✅ Embedding model loaded successfully on {self.device} ({self.backend})")
             print(f"Embedding dimension: {self.model.get_sentence_embedding_dimension()}")
         except Exception as e:
             print(f"❌ Error loading model {self.model_name}: {e}")
             
             try:
                 self.model_name = 'all-MiniLM-L6-v2'
-                self.model = SentenceTransformer(self.model_name, device=self.device)
+                self.backend, self.model = load_embedding_model(self.model_name, 'pytorch', self.device)
                 print(f"✅ Loaded fallback model: {self.model_name}")
             except Exception as e2:
                 print(f"❌ Failed to load fallback model: {e2}")
@@ -44,6 +69,9 @@ class EmbeddingGenerator:
         """
         Generate embeddings for a list of texts
         
+        Texts already in the embedding cache are not re-encoded; the rest go
+        to the model in one batch.
+        
         Args:
             texts (list): List of text strings
             batch_size (int): Batch size for processing
@@ -57,6 +85,31 @@ class EmbeddingGenerator:
         if isinstance(texts, str):
             texts = [texts]
         
+        if self.cache is None:
+            embeddings = self._encode(texts, batch_size, show_progress_bar)
+            return embeddings if embeddings is not None else self._zero_embeddings(len(texts))
+        
+        keys = [self.cache.key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+        
+        # Only texts not seen before go to the model, once each, in one batch
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                pending.setdefault(key, text)
+        
+        if pending:
+            encoded = self._encode(list(pending.values()), batch_size, show_progress_bar)
+            if encoded is None:
+                return self._zero_embeddings(len(texts))
+            fresh = dict(zip(pending.keys(), encoded))
+            self.cache.put_many(fresh)
+            cached.update(fresh)
+        
+        return np.stack([cached[key] for key in keys])
+    
+    def _encode(self, texts, batch_size=32, show_progress_bar=False):
+        """Run the model over texts; None if encoding fails"""
         try:
             # Convert texts to embeddings
             embeddings = self.model.encode(
@@ -71,9 +124,11 @@ class EmbeddingGenerator:
             return embeddings
         except Exception as e:
             print(f"❌ Error generating embeddings: {e}")
-            # Return zero embeddings as fallback
-            embedding_dim = self.model.get_sentence_embedding_dimension()
-            return np.zeros((len(texts), embedding_dim))
+            return None
+    
+    def _zero_embeddings(self, count):
+        """Zero embeddings as fallback"""
+        return np.zeros((count, self.model.get_sentence_embedding_dimension()))
     
     def get_single_embedding(self, text):
         """
@@ -98,13 +153,10 @@ class EmbeddingGenerator:
         Returns:
             float: Cosine similarity score (0-1)
         """
-        emb1 = self.get_single_embedding(text1)
-        emb2 = self.get_single_embedding(text2)
-        
-        # Calculate cosine similarity
-        similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
+        emb1, emb2 = self.get_embeddings([text1, text2])
         
-        return float(similarity)
+        # Embeddings are L2-normalized, so the dot product is the cosine similarity
+        return float(np.dot(emb1, emb2))
     
     def find_most_similar(self, query, candidates, top_k=3, threshold=0.5):
         """
@@ -122,27 +174,48 @@ class EmbeddingGenerator:
         if not candidates:
             return []
         
-        query_embedding = self.get_single_embedding(query)
-        candidate_embeddings = self.get_embeddings(candidates)
+        embeddings = self.get_embeddings([query] + list(candidates))
+        query_embedding, candidate_embeddings = embeddings[0], embeddings[1:]
         
-        # Calculate similarities
-        similarities = []
-        for i, cand_emb in enumerate(candidate_embeddings):
-            similarity = np.dot(query_embedding, cand_emb) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(cand_emb)
-            )
-            if similarity >= threshold:
-                similarities.append((i, float(similarity), candidates[i]))
+        ranked = rank_candidates(query_embedding, candidate_embeddings, top_k, threshold)
+        return [(i, similarity, candidates[i]) for i, similarity in ranked]
+    
+    def find_most_similar_batch(self, queries, candidates, top_k=3, threshold=0.5):
+        """
+        find_most_similar for many queries against the same candidates, e.g.
+        reranking or deduplicating a corpus offline
+        
+        Args:
+            queries (list): Query texts
+            candidates (list): List of candidate texts
+            top_k (int): Number of top results per query
+            threshold (float): Similarity threshold
+            
+        Returns:
+            list: One list of (index, similarity_score, text) tuples per query
+        """
+        if not queries:
+            return []
+        if not candidates:
+            return [[] for _ in queries]
         
-        # Sort by similarity (descending)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        queries = list(queries)
+        embeddings = self.get_embeddings(queries + list(candidates))
+        query_embeddings, candidate_embeddings = embeddings[:len(queries)], embeddings[len(queries):]
         
-        return similarities[:top_k]
+        return [
+            [(i, similarity, candidates[i]) for i, similarity in ranked]
+            for ranked in rank_candidates_batch(query_embeddings, candidate_embeddings, top_k, threshold)
+        ]
     
     def get_embedding_dimension(self):
         """Get the dimension of embeddings"""
         return self.model.get_sentence_embedding_dimension()
     
+    def get_cache_stats(self):
+        """Embedding cache counters, None when the cache is disabled"""
+        return self.cache.get_stats() if self.cache else None
+    
     def save_embeddings(self, texts, output_path):
         """
         Save embeddings to file
@@ -4,15 +4,29 @@ FIXED: Complete response generation (no ellipsis)
 """
 from llama_cpp import Llama
 import torch
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Union
 import warnings
 import gc
 import os
 import subprocess
 import sys
+import time
 
 warnings.filterwarnings('ignore')
 
+# ============================================
+#  simple medical system prompt
+# ============================================
+SYSTEM_PROMPT = """You are MedAI, a helpful medical AI assistant. 
+Provide clear, complete medical information. Always include safety disclaimers.
+Never diagnose or prescribe. Encourage consulting healthcare professionals.
+Keep responses informative and complete."""
+
+# Llama-3 instruct chat template, split at the point where requests start to differ.
+# BOS is added by the tokenizer.
+SYSTEM_PREFIX_TEMPLATE = "<|start_header_id|>system<|end_header_id|>\n\n{system}<|eot_id|><|start_header_id|>user<|end_header_id|>\n\n"
+USER_SUFFIX_TEMPLATE = "{prompt}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"
+
 class OptimizedLLaMAModel:
     def __init__(self, model_path: str = None, config: Dict[str, Any] = None):
         """
@@ -40,6 +54,7 @@ class OptimizedLLaMAModel:
         self.use_mmap = self.config.get('use_mmap', True)
         self.use_mlock = self.config.get('use_mlock', False)
         self.offload_kqv = self.config.get('offload_kqv', True)  
+        self.cache_system_prompt = self.config.get('cache_system_prompt', True)
         
         
         self.f16_kv = self.config.get('f16_kv', True)
@@ -56,7 +71,12 @@ class OptimizedLLaMAModel:
             
             gc.disable()  
         
+        # Evaluated KV state of the fixed system prompt, restored per request
+        self._system_prefix_tokens: List[int] = []
+        self._system_prefix_state = None
+        
         self._load_model(model_path)
+        self._cache_system_prefix()
     
     def _get_system_info(self) -> Dict[str, Any]:
         """Get detailed system information without torch.cuda dependency"""
@@ -209,6 +229,90 @@ class OptimizedLLaMAModel:
         print("❌ All fallback attempts failed. Running in CPU-only mode with minimal settings.")
         self.model = None
     
+    def _cache_system_prefix(self):
+        """Evaluate the system prompt once and save its KV state for reuse"""
+        if not self.model:
+            return
+        
+        prefix_text = SYSTEM_PREFIX_TEMPLATE.format(system=SYSTEM_PROMPT)
+        self._system_prefix_tokens = self.model.tokenize(prefix_text.encode('utf-8'), add_bos=True, special=True)
+        
+        if not self.cache_system_prompt:
+            return
+        
+        try:
+            start = time.time()
+            self.model.reset()
+            self.model.eval(self._system_prefix_tokens)
+            self._system_prefix_state = self.model.save_state()
+            print(f"✅ System prompt KV cache ready ({len(self._system_prefix_tokens)} tokens, {time.time() - start:.2f}s)")
+        except Exception as e:
+            print(f"⚠️ Could not cache system prompt state: {e}")
+            self._system_prefix_state = None
+    
+    def _restore_system_prefix(self):
+        """
+        Make sure the KV cache starts with the evaluated system prompt.
+        
+        llama.cpp reuses the longest matching token prefix already in the
+        context, so when the prefix is still resident nothing is restored;
+        otherwise the saved state is loaded instead of re-running prefill.
+        """
+        if self._system_prefix_state is None:
+            return
+        
+        n_prefix = len(self._system_prefix_tokens)
+        if self.model.n_tokens >= n_prefix and list(self.model.input_ids[:n_prefix]) == self._system_prefix_tokens:
+            return
+        
+        self.model.load_state(self._system_prefix_state)
+    
+    def _build_prompt_tokens(self, prompt: str) -> List[int]:
+        """Tokenize a request as <cached system prefix> + <user turn>"""
+        if not self._system_prefix_tokens:
+            self._cache_system_prefix()
+        
+        suffix = USER_SUFFIX_TEMPLATE.format(prompt=prompt)
+        suffix_tokens = self.model.tokenize(suffix.encode('utf-8'), add_bos=False, special=True)
+        
+        self._restore_system_prefix()
+        return self._system_prefix_tokens + suffix_tokens
+    
+    def _generation_params(self,
+                           max_tokens: Optional[int] = None,
+                           temperature: Optional[float] = None,
+                           top_p: Optional[float] = None,
+                           top_k: Optional[int] = None,
+                           repeat_penalty: Optional[float] = None) -> Dict[str, Any]:
+        """Resolve sampling parameters against the configured defaults"""
+        return {
+            'max_tokens': max_tokens or self.max_tokens,
+            'temperature': temperature or self.temperature,
+            'top_p': top_p or self.top_p,
+            'top_k': top_k or self.top_k,
+            'repeat_penalty': repeat_penalty or self.repeat_penalty,
+            'stop': ["<|end_of_text|>", "<|eot_id|>", "###", "Disclaimer:"]
+        }
+    
+    def _finalize_response(self, response_text: str, prompt: str) -> Tuple[str, bool]:
+        """
+        Clean a raw completion and swap it for a safe fallback if it fails validation
+        
+        Returns: (response_text, generated) where generated is False when the
+        text is a canned apology or the safety fallback rather than a model answer
+        """
+        generated = bool(response_text)
+        if not generated:
+            response_text = "I'm sorry, I couldn't generate a response. Please try again."
+        
+        response_text = self._clean_response(response_text)
+        
+        # Validate safety
+        if not self._validate_response_safety(response_text):
+            return self._get_safe_fallback_response(prompt), False
+        
+        return response_text, generated
+    
     def generate_response(self, 
                          prompt: str, 
                          max_tokens: Optional[int] = None,
@@ -216,7 +320,7 @@ class OptimizedLLaMAModel:
                          top_p: Optional[float] = None,
                          top_k: Optional[int] = None,
                          repeat_penalty: Optional[float] = None,
-                         stream: bool = False) -> str:
+                         stream: bool = False) -> Union[str, Iterator[Dict[str, Any]]]:
         """
         Generate response using LLaMA-3 8B Q3_K_M - FIXED FOR COMPLETE RESPONSES
         
@@ -227,74 +331,109 @@ class OptimizedLLaMAModel:
             top_p: Top-p sampling
             top_k: Top-k sampling
             repeat_penalty: Penalty for repeating tokens
-            stream: Whether to stream response
+            stream: Return a generator of events instead (see stream_response)
             
         Returns:
-            Generated response
+            Generated response, or an event generator when stream=True
+        """
+        if stream:
+            return self.stream_response(prompt, max_tokens, temperature, top_p, top_k, repeat_penalty)
+        
+        return self.generate_with_status(prompt, max_tokens, temperature, top_p, top_k, repeat_penalty)[0]
+    
+    def generate_with_status(self,
+                             prompt: str,
+                             max_tokens: Optional[int] = None,
+                             temperature: Optional[float] = None,
+                             top_p: Optional[float] = None,
+                             top_k: Optional[int] = None,
+                             repeat_penalty: Optional[float] = None) -> Tuple[str, bool]:
+        """
+        generate_response() that also reports whether the model produced the answer
+        
+        Returns: (response_text, generated); generated is False for the
+        unavailable-model, error, empty-completion and safety-fallback texts
         """
         if not self.model:
-            return "Model not available. Please check configuration and try again."
+            return "Model not available. Please check configuration and try again.", False
         
         try:
-            # ============================================
-            #  simple medical system prompt
-            # ============================================
-            system_content = """You are MedAI, a helpful medical AI assistant. 
-Provide clear, complete medical information. Always include safety disclaimers.
-Never diagnose or prescribe. Encourage consulting healthcare professionals.
-Keep responses informative and complete."""
-
-            # Use proper chat format for Llama-3
-            messages = [
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": prompt}
-            ]
-            
-            # Use parameters from config 
-            max_tokens = max_tokens or self.max_tokens
-            temperature = temperature or self.temperature
-            top_p = top_p or self.top_p
-            top_k = top_k or self.top_k
-            repeat_penalty = repeat_penalty or self.repeat_penalty
-            
+            params = self._generation_params(max_tokens, temperature, top_p, top_k, repeat_penalty)
             
             print(f"\n🔍 DEBUG - Generating response for: '{prompt[:50]}...'")
-            print(f"   Temperature: {temperature}")
-            print(f"   Max tokens: {max_tokens}")
-            print(f"   Repeat penalty: {repeat_penalty}")
+            print(f"   Temperature: {params['temperature']}")
+            print(f"   Max tokens: {params['max_tokens']}")
+            print(f"   Repeat penalty: {params['repeat_penalty']}")
             
-            # Generate response using Llama-3 chat completion API
-            response = self.model.create_chat_completion(
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                top_k=top_k,
-                repeat_penalty=repeat_penalty,
-                stop=["<|end_of_text|>", "<|eot_id|>", "###", "Disclaimer:"]
+            # Only the user turn is prefilled; the system prompt comes from the KV cache
+            response = self.model.create_completion(
+                prompt=self._build_prompt_tokens(prompt),
+                **params
             )
             
             
+            response_text = ''
             if response and 'choices' in response and len(response['choices']) > 0:
-                response_text = response['choices'][0]['message']['content'].strip()
-            else:
-                response_text = "I'm sorry, I couldn't generate a response. Please try again."
+                response_text = response['choices'][0]['text'].strip()
             
             
-            response_text = self._clean_response(response_text)
-            
-            # Validate safety
-            if not self._validate_response_safety(response_text):
-                response_text = self._get_safe_fallback_response(prompt)
+            response_text, generated = self._finalize_response(response_text, prompt)
             
             print(f"✅ Response generated ({len(response_text)} chars)")
-            return response_text
+            return response_text, generated
             
         except Exception as e:
             print(f"❌ Error generating response: {e}")
             import traceback
             traceback.print_exc()
-            return self._get_error_response()
+            return self._get_error_response(), False
+    
+    def stream_response(self,
+                        prompt: str,
+                        max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None,
+                        top_p: Optional[float] = None,
+                        top_k: Optional[int] = None,
+                        repeat_penalty: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a response token-by-token from llama.cpp
+        
+        Yields:
+            {'type': 'delta', 'text': ...} for every generated piece, followed by
+            one {'type': 'done', 'response': ..., 'generated': ...} carrying the
+            cleaned and safety-validated text, which may differ from the streamed
+            deltas; generated is False when it is an error or fallback text
+        """
+        if not self.model:
+            yield {'type': 'done', 'response': "Model not available. Please check configuration and try again.",
+                   'generated': False}
+            return
+        
+        pieces = []
+        try:
+            params = self._generation_params(max_tokens, temperature, top_p, top_k, repeat_penalty)
+            print(f"\n🔍 DEBUG - Streaming response for: '{prompt[:50]}...'")
+            
+            for chunk in self.model.create_completion(
+                prompt=self._build_prompt_tokens(prompt),
+                stream=True,
+                **params
+            ):
+                delta = chunk['choices'][0].get('text')
+                if delta:
+                    pieces.append(delta)
+                    yield {'type': 'delta', 'text': delta}
+            
+            response_text, generated = self._finalize_response(''.join(pieces).strip(), prompt)
+            print(f"✅ Response streamed ({len(response_text)} chars)")
+            
+        except Exception as e:
+            print(f"❌ Error streaming response: {e}")
+            import traceback
+            traceback.print_exc()
+            response_text, generated = self._get_error_response(), False
+        
+        yield {'type': 'done', 'response': response_text, 'generated': generated}
     
     def _clean_response(self, response: str) -> str:
         """Clean and format the response for medical context - FIXED"""
@@ -455,7 +594,9 @@ I want to ensure I provide safe and accurate information. For health-related que
                 'use_mmap': self.use_mmap,
                 'f16_kv': self.f16_kv,
                 'offload_kqv': self.offload_kqv,
-                'batch_size': self.n_batch
+                'batch_size': self.n_batch,
+                'system_prompt_cached': self._system_prefix_state is not None,
+                'system_prompt_tokens': len(self._system_prefix_tokens)
             },
             'system': {
                 'os': self.system_info.get('os'),
@@ -6,11 +6,117 @@ import faiss
 import numpy as np
 import json
 import os
-from typing import List, Dict, Any, Optional
+import hashlib
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from datetime import datetime
 
 from .llama_model import OptimizedLLaMAModel
 from .embeddings import EmbeddingGenerator
+from .response_cache import SemanticResponseCache
+from utils.micro_batcher import MicroBatcher
+
+# Bump when chunk construction or the on-disk bundle layout changes so that
+# previously saved indexes are rebuilt instead of silently reused
+INDEX_BUNDLE_VERSION = 1
+
+VECTOR_INDEX_TYPES = ('flat', 'ivf_flat', 'hnsw', 'ivf_pq')
+
+DEFAULT_VECTOR_INDEX_CONFIG = {
+    'type': 'flat',
+    'nlist': 0,                 # IVF lists, 0 = 4 * sqrt(n)
+    'nprobe': 8,                # IVF lists scanned per query
+    'hnsw_m': 32,               # HNSW graph degree
+    'ef_construction': 80,
+    'ef_search': 64,
+    'pq_m': 16,                 # PQ sub-quantizers, must divide the dimension
+    'pq_nbits': 8,
+    'train_sample': 50000       # max vectors used to train IVF/PQ
+}
+
+# Parameters baked into the index at build time; changing any of them forces a rebuild
+VECTOR_INDEX_BUILD_KEYS = ('type', 'nlist', 'hnsw_m', 'ef_construction', 'pq_m', 'pq_nbits')
+
+
+def build_vector_index(embeddings: np.ndarray, index_config: Optional[Dict[str, Any]] = None):
+    """
+    Build, train and populate an inner-product FAISS index
+    
+    Args:
+        embeddings: L2-normalized float32 matrix of shape (n, dimension)
+        index_config: Index type and parameters, see DEFAULT_VECTOR_INDEX_CONFIG
+        
+    Returns:
+        FAISS index with search parameters applied
+    """
+    index_config = {**DEFAULT_VECTOR_INDEX_CONFIG, **(index_config or {})}
+    index_type = index_config['type']
+    n, dimension = embeddings.shape
+    
+    if index_type not in VECTOR_INDEX_TYPES:
+        print(f"⚠️ Unknown vector index type '{index_type}', using flat")
+        index_type = 'flat'
+    
+    # IVF wants ~39 training points per list; tiny corpora gain nothing from it
+    nlist = index_config['nlist'] or int(4 * np.sqrt(n))
+    nlist = max(1, min(nlist, n // 39))
+    if index_type in ('ivf_flat', 'ivf_pq') and nlist < 2:
+        print(f"⚠️ {n} vectors is too few for {index_type}, using flat")
+        index_type = 'flat'
+    
+    if index_type == 'ivf_pq' and (n < 2 ** index_config['pq_nbits'] or dimension % index_config['pq_m']):
+        print(f"⚠️ PQ{index_config['pq_m']}x{index_config['pq_nbits']} does not fit {n} x {dimension} vectors, using ivf_flat")
+        index_type = 'ivf_flat'
+    
+    if index_type == 'flat':
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, index_config['hnsw_m'], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = index_config['ef_construction']
+    elif index_type == 'ivf_flat':
+        index = faiss.index_factory(dimension, f"IVF{nlist},Flat", faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.index_factory(
+            dimension,
+            f"IVF{nlist},PQ{index_config['pq_m']}x{index_config['pq_nbits']}",
+            faiss.METRIC_INNER_PRODUCT
+        )
+    
+    if not index.is_trained:
+        sample_size = min(n, index_config['train_sample'])
+        if sample_size < n:
+            sample = embeddings[np.random.default_rng(0).choice(n, sample_size, replace=False)]
+        else:
+            sample = embeddings
+        print(f"🎓 Training {index_type} index on {sample_size} vectors...")
+        index.train(sample)
+    
+    index.add(embeddings)
+    apply_search_params(index, index_config)
+    return index
+
+
+def apply_search_params(index, index_config: Optional[Dict[str, Any]] = None):
+    """Set query-time knobs: nprobe for IVF indexes, efSearch for HNSW"""
+    index_config = {**DEFAULT_VECTOR_INDEX_CONFIG, **(index_config or {})}
+    
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = min(index_config['nprobe'], ivf.nlist)
+    except RuntimeError:
+        pass  # not an IVF index
+    
+    hnsw = getattr(index, 'hnsw', None)
+    if hnsw is not None:
+        hnsw.efSearch = index_config['ef_search']
+
+
+def vector_index_type(index) -> str:
+    """Type of a built index, which differs from the configured one when build_vector_index fell back"""
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        return 'ivf_pq' if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else 'ivf_flat'
+    except RuntimeError:
+        return 'hnsw' if getattr(index, 'hnsw', None) is not None else 'flat'
 
 class OptimizedMedicalRAG:
     def __init__(self, 
@@ -22,6 +128,7 @@ class OptimizedMedicalRAG:
         self.knowledge_base_path = knowledge_base_path
         self.vector_db_path = vector_db_path
         self.config = config or {}
+        self.index_config = {**DEFAULT_VECTOR_INDEX_CONFIG, **self.config.get('vector_index', {})}
         
         print("=" * 50)
         print("🚀 Initializing Optimized Medical RAG System")
@@ -30,15 +137,24 @@ class OptimizedMedicalRAG:
         
         print("📥 Loading embedding model...")
         self.embedding_generator = EmbeddingGenerator(
-            model_name=self.config.get('embedding_model', 'sentence-transformers/all-mpnet-base-v2')
+            model_name=self.config.get('embedding_model', 'sentence-transformers/all-mpnet-base-v2'),
+            cache_config=self.config.get('embedding_cache'),
+            backend=self.config.get('embedding_backend', 'pytorch'),
+            onnx_path=self.config.get('embedding_onnx_path')
         )
         
         
         self.knowledge_base = []
+        self.knowledge_base_hash = None
         self.text_chunks = []
+        self.chunk_entry_ids = np.empty(0, dtype=np.int32)
         self.index = None
+        self.response_cache = None
+        self.retrieval_batcher = None
         
         self.load_knowledge_base(knowledge_base_path)
+        self._init_response_cache()
+        self._init_retrieval_batcher()
         
         # Initialize LLaMA model
         self.llama_model = None
@@ -59,7 +175,7 @@ class OptimizedMedicalRAG:
         print("=" * 50)
         print("✅ RAG System Initialized")
         print(f"   • Model: {'LLaMA-3 8B' if self.llama_model else 'Retrieval Only'}")
-        print(f"   • Embeddings: {self.embedding_generator.model_name}")
+        print(f"   • Embeddings: {self.embedding_generator.model_name} ({self.embedding_generator.backend})")
         print(f"   • Knowledge Base: {len(self.knowledge_base)} entries")
         print("=" * 50)
     
@@ -69,13 +185,23 @@ class OptimizedMedicalRAG:
         
         if os.path.exists(path):
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.knowledge_base = data.get("medical_faqs", [])
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                
+                self.knowledge_base_hash = hashlib.sha256(raw).hexdigest()
+                data = json.loads(raw.decode('utf-8'))
+                self.knowledge_base = data.get("medical_faqs", [])
                 
                 print(f"✅ Loaded {len(self.knowledge_base)} medical entries")
                 self._create_text_chunks()
-                self._build_vector_index()
+                
+                # Reuse the saved index when it was built from this exact knowledge base
+                if not self._load_vector_index():
+                    self._build_vector_index()
+                
+                # Answers cached against the previous knowledge base are stale
+                if self.response_cache and self.response_cache.version != self._cache_version():
+                    self.response_cache.invalidate(self._cache_version())
                 
             except Exception as e:
                 print(f"❌ Error loading knowledge base: {e}")
@@ -87,8 +213,9 @@ class OptimizedMedicalRAG:
     def _create_text_chunks(self):
         """Create optimized text chunks for retrieval"""
         self.text_chunks = []
+        entry_ids = []
         
-        for entry in self.knowledge_base:
+        for entry_id, entry in enumerate(self.knowledge_base):
             # Create multiple chunk variations for better retrieval
             chunks = [
                 
@@ -104,6 +231,10 @@ class OptimizedMedicalRAG:
                 f"Keywords: {self._extract_keywords(entry['question'])}\n{entry['answer'][:100]}"
             ]
             self.text_chunks.extend(chunks)
+            entry_ids.extend([entry_id] * len(chunks))
+        
+        # Parallel to FAISS ids: chunk i was generated from knowledge_base[chunk_entry_ids[i]]
+        self.chunk_entry_ids = np.asarray(entry_ids, dtype=np.int32)
         
         print(f"📝 Created {len(self.text_chunks)} text chunks")
     
@@ -184,18 +315,18 @@ class OptimizedMedicalRAG:
             dimension = embeddings.shape[1]
             print(f"📐 Embedding dimension: {dimension}")
             
-            # Use IndexFlatIP for cosine similarity 
-            self.index = faiss.IndexFlatIP(dimension)
-            
            
+            embeddings = np.ascontiguousarray(embeddings, dtype='float32')
             faiss.normalize_L2(embeddings)
-            self.index.add(embeddings.astype('float32'))
             
-            # Save index
-            os.makedirs(os.path.dirname(self.vector_db_path), exist_ok=True)
-            faiss.write_index(self.index, self.vector_db_path)
+            # Inner product on normalized vectors = cosine similarity
+            self.index = build_vector_index(embeddings, self.index_config)
+            
+            # Save index bundle
+            self._save_index_bundle()
             
             print(f"✅ FAISS index built and saved to: {self.vector_db_path}")
+            print(f"   • Type: {vector_index_type(self.index)}")
             print(f"   • Vectors: {self.index.ntotal}")
             print(f"   • Dimension: {dimension}")
             
@@ -203,63 +334,251 @@ class OptimizedMedicalRAG:
             print(f"❌ Error building vector index: {e}")
             self.index = None
     
-    def retrieve_relevant_info(self, query: str, k: int = 3, similarity_threshold: float = 0.3) -> List[Dict[str, Any]]:
-        """Retrieve relevant information with optimizations"""
-        if self.index is None or not self.text_chunks:
-            print("⚠️ Index not available")
-            return []
+    def _bundle_paths(self) -> Dict[str, str]:
+        """Paths of the files that make up the on-disk index bundle"""
+        base = os.path.splitext(self.vector_db_path)[0]
+        return {
+            'index': self.vector_db_path,
+            'entries': f"{base}.entries.npy",
+            'manifest': f"{base}.manifest.json"
+        }
+    
+    def _index_manifest(self) -> Dict[str, Any]:
+        """Fields that must match for a saved index bundle to be reused"""
+        return {
+            'bundle_version': INDEX_BUNDLE_VERSION,
+            'knowledge_base_sha256': self.knowledge_base_hash,
+            'embedding_model': self.embedding_generator.model_name,
+            'embedding_backend': self.embedding_generator.backend,
+            'dimension': self.embedding_generator.get_embedding_dimension(),
+            'num_chunks': len(self.text_chunks),
+            'index': {key: self.index_config[key] for key in VECTOR_INDEX_BUILD_KEYS}
+        }
+    
+    def _save_index_bundle(self):
+        """Write index, chunk->entry mapping and manifest to disk"""
+        paths = self._bundle_paths()
+        os.makedirs(os.path.dirname(self.vector_db_path) or '.', exist_ok=True)
+        
+        # Drop the old manifest first so a crash mid-write never leaves a
+        # manifest that vouches for a half-written index
+        if os.path.exists(paths['manifest']):
+            os.remove(paths['manifest'])
+        
+        faiss.write_index(self.index, paths['index'] + '.tmp')
+        os.replace(paths['index'] + '.tmp', paths['index'])
+        
+        with open(paths['entries'] + '.tmp', 'wb') as f:
+            np.save(f, self.chunk_entry_ids)
+        os.replace(paths['entries'] + '.tmp', paths['entries'])
+        
+        manifest = self._index_manifest()
+        manifest['created_at'] = datetime.now().isoformat()
+        with open(paths['manifest'] + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(paths['manifest'] + '.tmp', paths['manifest'])
+    
+    def _load_vector_index(self) -> bool:
+        """
+        Load the saved index bundle if its manifest matches the current
+        knowledge base, embedding model and embedding backend
+        
+        Returns:
+            True if the index was loaded, False if it must be rebuilt
+        """
+        paths = self._bundle_paths()
+        if not all(os.path.exists(p) for p in paths.values()):
+            print("ℹ️ No saved FAISS index bundle found")
+            return False
         
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_generator.get_single_embedding(query)
-            query_embedding = query_embedding.reshape(1, -1)
+            with open(paths['manifest'], 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
             
-           
-            faiss.normalize_L2(query_embedding)
+            expected = self._index_manifest()
+            stale = [key for key, value in expected.items() if manifest.get(key) != value]
+            if stale:
+                print(f"🔄 Saved FAISS index is stale ({', '.join(stale)} changed), rebuilding")
+                return False
             
+            # Memory-map where the index type supports it; flat indexes fall back to a plain read
+            try:
+                index = faiss.read_index(paths['index'], faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except Exception:
+                index = faiss.read_index(paths['index'])
             
-            k_search = min(k * 3, len(self.text_chunks))  
-            distances, indices = self.index.search(
-                query_embedding.astype('float32'),
-                k_search
-            )
+            entry_ids = np.load(paths['entries'], mmap_mode='r')
             
+            if index.ntotal != len(self.text_chunks) or len(entry_ids) != index.ntotal:
+                print("🔄 Saved FAISS index does not match the knowledge base, rebuilding")
+                return False
             
-            results = []
-            seen_questions = set()
+            apply_search_params(index, self.index_config)
+            self.index = index
+            self.chunk_entry_ids = entry_ids
             
-            for idx, distance in zip(indices[0], distances[0]):
-                if idx < len(self.text_chunks) and distance >= similarity_threshold:
-                    chunk = self.text_chunks[idx]
-                    
-                    # Find corresponding knowledge base entry
-                    for entry in self.knowledge_base:
-                        if entry['question'] in chunk and entry['question'] not in seen_questions:
-                            results.append({
-                                'question': entry['question'],
-                                'answer': entry['answer'],
-                                'category': entry.get('category', 'general'),
-                                'severity': entry.get('severity', 'unknown'),
-                                'similarity': float(distance),
-                                'source': 'knowledge_base'
-                            })
-                            seen_questions.add(entry['question'])
-                            break
-                
-                if len(results) >= k:
-                    break
+            print(f"✅ FAISS index loaded from: {self.vector_db_path}")
+            print(f"   • Vectors: {self.index.ntotal}")
+            print(f"   • Dimension: {self.index.d}")
+            return True
             
-            # Sort by similarity
-            results.sort(key=lambda x: x['similarity'], reverse=True)
+        except Exception as e:
+            print(f"⚠️ Could not load saved FAISS index: {e}")
+            return False
+    
+    def _init_response_cache(self):
+        """Create the semantic response cache from config['response_cache']"""
+        cache_config = self.config.get('response_cache', {})
+        if not cache_config.get('enabled', True):
+            return
+        
+        try:
+            self.response_cache = SemanticResponseCache(
+                dimension=self.embedding_generator.get_embedding_dimension(),
+                threshold=cache_config.get('threshold', 0.92),
+                max_entries=cache_config.get('max_entries', 1000),
+                ttl_seconds=cache_config.get('ttl_seconds', 86400),
+                version=self._cache_version(),
+                persist_path=cache_config.get('persist_path')
+            )
+            print(f"✅ Response cache ready (threshold: {self.response_cache.threshold})")
+        except Exception as e:
+            print(f"⚠️ Could not initialize response cache: {e}")
+            self.response_cache = None
+    
+    def _cache_version(self) -> str:
+        """Cached answers are only valid for one knowledge base + embedding model and backend"""
+        return f"{self.knowledge_base_hash}:{self.embedding_generator.model_name}:{self.embedding_generator.backend}"
+    
+    def _init_retrieval_batcher(self):
+        """Create the micro-batcher for concurrent embedding + search from config['micro_batch']"""
+        batch_config = self.config.get('micro_batch', {})
+        if not batch_config.get('enabled', True):
+            return
+        
+        self.retrieval_batcher = MicroBatcher(
+            self._prepare_batch,
+            max_batch_size=batch_config.get('max_batch_size', 32),
+            max_wait_ms=batch_config.get('max_wait_ms', 5.0),
+            name='retrieval-batcher'
+        )
+        print(f"✅ Retrieval micro-batching ready (max batch: {self.retrieval_batcher.max_batch_size}, "
+              f"window: {self.retrieval_batcher.max_wait * 1000:.0f}ms)")
+    
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed queries in one model call as a normalized (n, dim) float32 matrix"""
+        query_embeddings = self.embedding_generator.get_embeddings(queries)
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype='float32').reshape(len(queries), -1)
+        
+       
+        faiss.normalize_L2(query_embeddings)
+        return query_embeddings
+    
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a query as a normalized (1, dim) float32 matrix"""
+        return self._embed_queries([query])
+    
+    def prepare_query(self, user_query: str) -> Dict[str, Any]:
+        """
+        Embed a query and retrieve its context ahead of generation
+        
+        Concurrent callers are grouped by the retrieval batcher so that a
+        burst of requests costs one embedding call and one index search.
+        
+        Returns:
+            {'embedding': (1, dim) matrix, 'retrieved_info': [...]}
+        """
+        if self.retrieval_batcher:
+            return self.retrieval_batcher.process(user_query)
+        return self._prepare_batch([user_query])[0]
+    
+    def _prepare_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Batch function behind prepare_query()"""
+        query_embeddings = self._embed_queries(queries)
+        retrieved = self._search_batch(query_embeddings, k=3)
+        return [
+            {'embedding': query_embeddings[i:i + 1], 'retrieved_info': retrieved[i]}
+            for i in range(len(queries))
+        ]
+    
+    def retrieve_relevant_info(self, query: str, k: int = 3, similarity_threshold: float = 0.3,
+                               query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Retrieve relevant information with optimizations"""
+        # Generate query embedding unless the caller already has one
+        if query_embedding is None:
+            query_embedding = self._embed_query(query)
+        
+        return self._search_batch(query_embedding, k, similarity_threshold)[0]
+    
+    def _search_batch(self, query_embeddings: np.ndarray, k: int = 3,
+                      similarity_threshold: float = 0.3) -> List[List[Dict[str, Any]]]:
+        """
+        Search the index for every row of a query matrix in a single call
+        
+        Args:
+            query_embeddings: Normalized (n, dim) float32 matrix
+            k: Maximum number of knowledge base entries per query
+            similarity_threshold: Minimum cosine similarity
             
-            return results
+        Returns:
+            One list of retrieved entries per query row
+        """
+        num_queries = len(query_embeddings)
+        if self.index is None or len(self.chunk_entry_ids) == 0:
+            print("⚠️ Index not available")
+            return [[] for _ in range(num_queries)]
+        
+        try:
+            
+            k_search = min(k * 3, len(self.chunk_entry_ids))  
+            distances, indices = self.index.search(
+                query_embeddings,
+                k_search
+            )
+            
+            return [
+                self._collect_hits(indices[row], distances[row], k, similarity_threshold)
+                for row in range(num_queries)
+            ]
             
         except Exception as e:
             print(f"❌ Error retrieving information: {e}")
-            return []
+            return [[] for _ in range(num_queries)]
+    
+    def _collect_hits(self, indices: np.ndarray, distances: np.ndarray,
+                      k: int, similarity_threshold: float) -> List[Dict[str, Any]]:
+        """Turn one row of FAISS results into up to k distinct knowledge base entries"""
+        results = []
+        seen_entries = set()
+        
+        for idx, distance in zip(indices, distances):
+            # FAISS pads missing neighbours with -1
+            if 0 <= idx < len(self.chunk_entry_ids) and distance >= similarity_threshold:
+                # Chunk metadata gives the source entry directly
+                entry_id = int(self.chunk_entry_ids[idx])
+                
+                if entry_id not in seen_entries:
+                    entry = self.knowledge_base[entry_id]
+                    results.append({
+                        'question': entry['question'],
+                        'answer': entry['answer'],
+                        'category': entry.get('category', 'general'),
+                        'severity': entry.get('severity', 'unknown'),
+                        'similarity': float(distance),
+                        'source': 'knowledge_base'
+                    })
+                    seen_entries.add(entry_id)
+            
+            if len(results) >= k:
+                break
+        
+        # Sort by similarity
+        results.sort(key=lambda x: x['similarity'], reverse=True)
+        
+        return results
     
-    def generate_rag_response(self, query: str, retrieved_info: List[Dict[str, Any]] = None) -> str:
-        """Generate response using RAG with LLaMA-3 - OPTIMIZED FOR SPEED"""
+    def _build_rag_prompt(self, query: str, retrieved_info: List[Dict[str, Any]] = None) -> str:
+        """Build the LLaMA prompt from the query and retrieved context"""
         # Prepare context
         context = ""
         if retrieved_info and len(retrieved_info) > 0:
@@ -271,17 +590,26 @@ class OptimizedMedicalRAG:
         # ============================================
         #  PROMPT FOR SPEED 
         # ============================================
-        prompt = f"""Question: {query}
+        return f"""Question: {query}
 
 Medical Context:
 {context}
 
 Provide a clear, concise medical answer. Include safety disclaimer."""
+    
+    def generate_rag_response(self, query: str, retrieved_info: List[Dict[str, Any]] = None) -> Tuple[str, bool]:
+        """
+        Generate response using RAG with LLaMA-3 - OPTIMIZED FOR SPEED
+        
+        Returns: (response, generated) where generated is False for error,
+        safety-fallback and retrieval-only template answers
+        """
+        prompt = self._build_rag_prompt(query, retrieved_info)
         
         
         if self.llama_model:
             try:
-                response = self.llama_model.generate_response(
+                return self.llama_model.generate_with_status(
                     prompt=prompt,
                     max_tokens=250, 
                     temperature=0.3,  
@@ -290,13 +618,11 @@ Provide a clear, concise medical answer. Include safety disclaimer."""
                     repeat_penalty=1.1
                 )
                 
-                return response
-                
             except Exception as e:
                 print(f"❌ LLaMA generation error: {e}")
-                return self._generate_fallback_response(query, retrieved_info)
+                return self._generate_fallback_response(query, retrieved_info), False
         else:
-            return self._generate_fallback_response(query, retrieved_info)
+            return self._generate_fallback_response(query, retrieved_info), False
     
     def _generate_fallback_response(self, query: str, retrieved_info: List[Dict[str, Any]] = None) -> str:
         """Generate fallback response without LLaMA"""
@@ -323,25 +649,121 @@ Provide a clear, concise medical answer. Include safety disclaimer."""
         
         return response
     
-    def query(self, user_query: str) -> Dict[str, Any]:
+    def query(self, user_query: str, prepared: Optional[Dict[str, Any]] = None,
+              check_cache: bool = True) -> Dict[str, Any]:
         """
         Complete RAG pipeline optimized for Q3_K_M
         
         Args:
             user_query: User's query
+            prepared: Output of prepare_query() if retrieval already ran
+            check_cache: Look the query up in the response cache first; False
+                when the caller already did (see cached_result())
             
         Returns:
             Dictionary with response and metadata
         """
         start_time = datetime.now()
         
-        # Retrieve relevant information
-        retrieved_info = self.retrieve_relevant_info(user_query, k=3)
+        # Embedding + retrieval (batched with concurrent requests)
+        prepared = prepared or self.prepare_query(user_query)
+        query_embedding = prepared['embedding']
+        
+        cached = self.cached_result(query_embedding, start_time) if check_cache else None
+        if cached:
+            return cached
+        
+        retrieved_info = prepared['retrieved_info']
         
        
-        response = self.generate_rag_response(user_query, retrieved_info)
+        response, generated = self.generate_rag_response(user_query, retrieved_info)
         
+        result = self._build_result(user_query, response, retrieved_info, start_time)
+        if generated:
+            self._cache_result(user_query, query_embedding, result)
+        return result
+    
+    def query_stream(self, user_query: str, prepared: Optional[Dict[str, Any]] = None,
+                     check_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of query()
+        
+        Yields:
+            {'type': 'delta', 'text': ...} events while LLaMA generates, then one
+            {'type': 'done', 'result': ...} event whose result matches query()
+        """
+        start_time = datetime.now()
+        
+        prepared = prepared or self.prepare_query(user_query)
+        query_embedding = prepared['embedding']
+        
+        cached = self.cached_result(query_embedding, start_time) if check_cache else None
+        if cached:
+            yield {'type': 'done', 'result': cached}
+            return
         
+        retrieved_info = prepared['retrieved_info']
+        
+        response = None
+        generated = False
+        if self.llama_model:
+            prompt = self._build_rag_prompt(user_query, retrieved_info)
+            for event in self.llama_model.stream_response(
+                prompt=prompt,
+                max_tokens=250,
+                temperature=0.3,
+                top_p=0.95,
+                top_k=40,
+                repeat_penalty=1.1
+            ):
+                if event['type'] == 'delta':
+                    yield event
+                else:
+                    response = event['response']
+                    generated = event.get('generated', False)
+        
+        if response is None:
+            response = self._generate_fallback_response(user_query, retrieved_info)
+        
+        result = self._build_result(user_query, response, retrieved_info, start_time)
+        if generated:
+            self._cache_result(user_query, query_embedding, result)
+        yield {'type': 'done', 'result': result}
+    
+    def cached_result(self, query_embedding: np.ndarray, start_time: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of a cached result for a near-identical earlier query
+        
+        Cheap enough to call on the request thread, so cache hits never have
+        to queue behind LLaMA generations
+        """
+        if not self.response_cache:
+            return None
+        
+        hit = self.response_cache.lookup(query_embedding)
+        if not hit:
+            return None
+        
+        cached_result, similarity = hit
+        print(f"⚡ Response cache hit (similarity: {similarity:.3f})")
+        return {
+            **cached_result,
+            'processing_time': (datetime.now() - start_time).total_seconds(),
+            'timestamp': datetime.now().isoformat(),
+            'cached': True,
+            'cache_similarity': similarity
+        }
+    
+    def _cache_result(self, user_query: str, query_embedding: np.ndarray, result: Dict[str, Any]):
+        """Cache an answer LLaMA actually generated (callers skip error and fallback texts)"""
+        if not self.response_cache:
+            return
+        
+        self.response_cache.put(user_query, query_embedding, result)
+    
+    def _build_result(self, user_query: str, response: str,
+                      retrieved_info: List[Dict[str, Any]], start_time: datetime) -> Dict[str, Any]:
+        """Assemble the response metadata returned by query() and query_stream()"""
         processing_time = (datetime.now() - start_time).total_seconds()
         
         
@@ -406,8 +828,13 @@ Provide a clear, concise medical answer. Include safety disclaimer."""
         return {
             'llama_loaded': self.llama_model is not None,
             'embedding_model': self.embedding_generator.model_name,
+            'embedding_backend': self.embedding_generator.backend,
             'knowledge_base_entries': len(self.knowledge_base),
             'vector_index_loaded': self.index is not None,
+            'vector_index_type': vector_index_type(self.index) if self.index is not None else None,
             'text_chunks': len(self.text_chunks),
+            'response_cache': self.response_cache.get_stats() if self.response_cache else None,
+            'embedding_cache': self.embedding_generator.get_cache_stats(),
+            'retrieval_batching': self.retrieval_batcher.get_stats() if self.retrieval_batcher else None,
             'optimization': 'Q3_K_M (3.74GB) - GTX 1650 4GB Optimized'
         }
\ No newline at end of file
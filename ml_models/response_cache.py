@@ -0,0 +1,216 @@
+"""
+Semantic response cache keyed on query embeddings
+Serves stored answers for near-identical questions without running LLaMA
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticResponseCache:
+    """Cosine-similarity cache over L2-normalized query embeddings with LRU + TTL eviction"""
+
+    def __init__(self,
+                 dimension: int,
+                 threshold: float = 0.92,
+                 max_entries: int = 1000,
+                 ttl_seconds: int = 86400,
+                 version: Optional[str] = None,
+                 persist_path: Optional[str] = None,
+                 persist_interval: int = 60):
+        """
+        Args:
+            dimension: Embedding dimension
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Capacity before least-recently-used entries are evicted
+            ttl_seconds: Entry lifetime; 0 disables expiry
+            version: Knowledge base / embedding model version; entries from other versions are dropped
+            persist_path: Base path for the on-disk copy (without extension), None for memory only
+            persist_interval: Minimum seconds between automatic saves
+        """
+        self.dimension = dimension
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+        self.persist_path = persist_path
+        self.persist_interval = persist_interval
+
+        self._lock = threading.Lock()
+        self._embeddings = np.zeros((max_entries, dimension), dtype=np.float32)
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()  # slot -> entry, LRU order
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._dirty = False
+        self._last_save = time.time()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+        if self.persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    def lookup(self, query_embedding: np.ndarray) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Find a cached result for a query embedding
+
+        Returns:
+            (result, similarity) on a hit, None on a miss
+        """
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+
+        with self._lock:
+            slot, similarity = self._best_match(query_embedding)
+
+            if slot is not None and similarity >= self.threshold:
+                entry = self._entries[slot]
+                if self._expired(entry):
+                    self._evict(slot)
+                    self.stats['expirations'] += 1
+                else:
+                    self._entries.move_to_end(slot)
+                    self.stats['hits'] += 1
+                    return entry['result'], similarity
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, query: str, query_embedding: np.ndarray, result: Dict[str, Any]):
+        """Store a result, replacing a near-duplicate entry if one exists"""
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+
+        with self._lock:
+            slot, similarity = self._best_match(query_embedding)
+
+            if slot is None or similarity < self.threshold:
+                if not self._free_slots:
+                    lru_slot = next(iter(self._entries))
+                    self._evict(lru_slot)
+                    self.stats['evictions'] += 1
+                slot = self._free_slots.pop()
+
+            self._embeddings[slot] = query_embedding
+            self._valid[slot] = True
+            self._entries[slot] = {
+                'query': query,
+                'result': result,
+                'created_at': time.time()
+            }
+            self._entries.move_to_end(slot)
+            self._dirty = True
+
+        self.maybe_save()
+
+    def invalidate(self, version: Optional[str] = None):
+        """Drop every entry, e.g. when the knowledge base changes"""
+        with self._lock:
+            self._clear()
+            self.version = version
+            self.stats['invalidations'] += 1
+            self._dirty = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                'threshold': self.threshold
+            }
+
+    def maybe_save(self):
+        """Persist if there are unsaved changes and the save interval has elapsed"""
+        if self.persist_path and self._dirty and time.time() - self._last_save >= self.persist_interval:
+            self.save()
+
+    def save(self):
+        """Write the cache to <persist_path>.npz / .json"""
+        if not self.persist_path:
+            return
+
+        try:
+            with self._lock:
+                slots = list(self._entries.keys())
+                embeddings = self._embeddings[slots].copy()
+                entries = [self._entries[slot] for slot in slots]
+                meta = {'version': self.version, 'dimension': self.dimension, 'entries': entries}
+                self._dirty = False
+                self._last_save = time.time()
+
+            os.makedirs(os.path.dirname(self.persist_path) or '.', exist_ok=True)
+
+            with open(self.persist_path + '.npz.tmp', 'wb') as f:
+                np.savez(f, embeddings=embeddings)
+            with open(self.persist_path + '.json.tmp', 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            os.replace(self.persist_path + '.npz.tmp', self.persist_path + '.npz')
+            os.replace(self.persist_path + '.json.tmp', self.persist_path + '.json')
+        except Exception as e:
+            print(f"⚠️ Could not save response cache: {e}")
+
+    def load(self):
+        """Load a previously saved cache, skipping expired entries and other versions"""
+        meta_path = self.persist_path + '.json'
+        emb_path = self.persist_path + '.npz'
+        if not (os.path.exists(meta_path) and os.path.exists(emb_path)):
+            return
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+            if meta.get('version') != self.version or meta.get('dimension') != self.dimension:
+                print("🔄 Saved response cache is from another knowledge base or model, discarding")
+                return
+
+            embeddings = np.load(emb_path)['embeddings']
+            entries = meta.get('entries', [])
+
+            with self._lock:
+                # Most recently used entries are last; keep the newest ones if capacity shrank
+                start = max(0, len(entries) - self.max_entries)
+                for embedding, entry in zip(embeddings[start:], entries[start:]):
+                    if self._expired(entry):
+                        continue
+                    slot = self._free_slots.pop()
+                    self._embeddings[slot] = embedding
+                    self._valid[slot] = True
+                    self._entries[slot] = entry
+
+            print(f"✅ Loaded {len(self._entries)} cached responses from: {self.persist_path}")
+        except Exception as e:
+            print(f"⚠️ Could not load response cache: {e}")
+            with self._lock:
+                self._clear()
+
+    def _best_match(self, query_embedding: np.ndarray) -> Tuple[Optional[int], float]:
+        if not self._entries:
+            return None, -1.0
+
+        similarities = self._embeddings @ query_embedding
+        similarities[~self._valid] = -np.inf
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return self.ttl_seconds > 0 and time.time() - entry['created_at'] > self.ttl_seconds
+
+    def _evict(self, slot: int):
+        del self._entries[slot]
+        self._valid[slot] = False
+        self._free_slots.append(slot)
+        self._dirty = True
+
+    def _clear(self):
+        self._entries.clear()
+        self._valid[:] = False
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
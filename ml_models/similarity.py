@@ -0,0 +1,93 @@
+"""
+Vectorized cosine-similarity ranking over L2-normalized embeddings
+Scores are plain dot products (the vectors are already unit length) and
+top-k selection uses np.argpartition, so ranking n candidates costs one
+matrix product and an O(n) partition instead of a Python loop and a sort.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+# Query rows scored per matrix product in the batch variant, bounding the
+# (queries x candidates) score matrix held in memory at once
+DEFAULT_QUERY_CHUNK = 1024
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores in a 1-D array, best first"""
+    if top_k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if top_k < scores.size:
+        indices = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        indices = np.arange(scores.size)
+    return indices[np.argsort(-scores[indices], kind='stable')]
+
+
+def rank_candidates(query_embedding: np.ndarray,
+                    candidate_embeddings: np.ndarray,
+                    top_k: int = 3,
+                    threshold: float = 0.5) -> List[Tuple[int, float]]:
+    """
+    Rank candidates against one query
+
+    Args:
+        query_embedding: (dim,) normalized query vector
+        candidate_embeddings: (n, dim) normalized candidate vectors
+        top_k: Number of results to return
+        threshold: Minimum similarity
+
+    Returns:
+        (index, similarity) pairs, most similar first
+    """
+    scores = np.asarray(candidate_embeddings) @ np.asarray(query_embedding).reshape(-1)
+    return [
+        (int(i), float(scores[i]))
+        for i in top_k_indices(scores, top_k) if scores[i] >= threshold
+    ]
+
+
+def rank_candidates_batch(query_embeddings: np.ndarray,
+                          candidate_embeddings: np.ndarray,
+                          top_k: int = 3,
+                          threshold: float = 0.5,
+                          chunk_size: int = DEFAULT_QUERY_CHUNK) -> List[List[Tuple[int, float]]]:
+    """
+    rank_candidates for many queries, one matrix product per chunk of queries
+
+    Args:
+        query_embeddings: (m, dim) normalized query vectors
+        candidate_embeddings: (n, dim) normalized candidate vectors
+        top_k: Number of results per query
+        threshold: Minimum similarity
+        chunk_size: Queries scored per matrix product
+
+    Returns:
+        One list of (index, similarity) pairs per query, most similar first
+    """
+    query_embeddings = np.atleast_2d(np.asarray(query_embeddings))
+    candidate_embeddings = np.atleast_2d(np.asarray(candidate_embeddings))
+    num_candidates = candidate_embeddings.shape[0]
+    k = min(top_k, num_candidates)
+    if k <= 0:
+        return [[] for _ in range(len(query_embeddings))]
+
+    results = []
+    for start in range(0, len(query_embeddings), chunk_size):
+        scores = query_embeddings[start:start + chunk_size] @ candidate_embeddings.T
+
+        if k < num_candidates:
+            indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            indices = np.broadcast_to(np.arange(num_candidates), scores.shape)
+        top_scores = np.take_along_axis(scores, indices, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        indices = np.take_along_axis(indices, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for row_indices, row_scores in zip(indices.tolist(), top_scores.tolist()):
+            results.append([
+                (i, score) for i, score in zip(row_indices, row_scores) if score >= threshold
+            ])
+    return results
@@ -0,0 +1,183 @@
+"""
+Toxicity scoring for the safety checker
+Runs unitary/toxic-bert on CPU with a choice of backend (full-precision
+PyTorch, int8 dynamic quantization or ONNX Runtime), groups concurrent
+messages into one forward pass and remembers recent verdicts.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.micro_batcher import MicroBatcher
+
+TOXICITY_BACKENDS = ('pytorch', 'int8', 'onnx')
+
+DEFAULT_TOXICITY_CONFIG = {
+    'model_name': 'unitary/toxic-bert',
+    'backend': 'pytorch',
+    'threshold': 0.8,
+    'cache_size': 4096,
+    'onnx_path': 'models/toxic-bert-onnx',
+    'micro_batch': {'enabled': True, 'max_batch_size': 16, 'max_wait_ms': 10.0},
+    'timeout': 5.0
+}
+
+# The classifier only ever saw the first 512 characters of a message
+MAX_TEXT_CHARS = 512
+
+
+def normalize_text(text: str) -> str:
+    """Case and whitespace do not change toxic-bert's (uncased) input"""
+    return ' '.join(text[:MAX_TEXT_CHARS].lower().split())
+
+
+def _build_pytorch_pipeline(model_name: str):
+    from transformers import pipeline
+    return pipeline("text-classification", model=model_name, device=-1)
+
+
+def _build_int8_pipeline(model_name: str):
+    """Dynamic int8 quantization of the Linear layers, which dominate BERT's CPU time"""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("text-classification", model=quantized, tokenizer=tokenizer, device=-1)
+
+
+def _build_onnx_pipeline(model_name: str, onnx_path: Optional[str]):
+    """ONNX Runtime session via optimum; the exported graph is saved to onnx_path and reused"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer, pipeline
+
+    if onnx_path and os.path.exists(os.path.join(onnx_path, 'model.onnx')):
+        model = ORTModelForSequenceClassification.from_pretrained(onnx_path)
+        tokenizer = AutoTokenizer.from_pretrained(onnx_path)
+    else:
+        print(f"🔧 Exporting {model_name} to ONNX (first run only)...")
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if onnx_path:
+            model.save_pretrained(onnx_path)
+            tokenizer.save_pretrained(onnx_path)
+    return pipeline("text-classification", model=model, tokenizer=tokenizer)
+
+
+class ToxicityScorer:
+    """
+    Decides whether a message is toxic: the top label is 'toxic' with a score
+    above the threshold (0.8 by default), as SafetyChecker always did.
+
+    Verdicts are cached by a hash of the normalized text. Cache misses from
+    concurrent requests are scored together by a MicroBatcher.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config: Overrides for DEFAULT_TOXICITY_CONFIG (model_name, backend,
+                threshold, cache_size, onnx_path, micro_batch, timeout)
+        """
+        self.config = {**DEFAULT_TOXICITY_CONFIG, **(config or {})}
+        self.threshold = self.config['threshold']
+        self.cache_size = self.config['cache_size']
+        self.timeout = self.config['timeout']
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # text hash -> (label, score)
+        self.stats = {'hits': 0, 'misses': 0, 'scored': 0}
+
+        self.backend, self.classifier = self._load_classifier(self.config['backend'])
+
+        self.batcher: Optional[MicroBatcher] = None
+        batch_config = self.config.get('micro_batch') or {}
+        if batch_config.get('enabled', True):
+            self.batcher = MicroBatcher(
+                self._score_batch,
+                max_batch_size=batch_config.get('max_batch_size', 16),
+                max_wait_ms=batch_config.get('max_wait_ms', 10.0),
+                name='toxicity-batcher'
+            )
+
+    def _load_classifier(self, backend: str):
+        """Build the requested backend, falling back towards plain PyTorch"""
+        if backend not in TOXICITY_BACKENDS:
+            print(f"⚠️ Unknown toxicity backend '{backend}', using pytorch")
+            backend = 'pytorch'
+
+        model_name = self.config['model_name']
+        if backend == 'onnx':
+            try:
+                return 'onnx', _build_onnx_pipeline(model_name, self.config.get('onnx_path'))
+            except Exception as e:
+                print(f"⚠️ ONNX Runtime backend unavailable ({e}), trying int8")
+                backend = 'int8'
+
+        if backend == 'int8':
+            try:
+                return 'int8', _build_int8_pipeline(model_name)
+            except Exception as e:
+                print(f"⚠️ int8 quantization failed ({e}), using full precision")
+
+        return 'pytorch', _build_pytorch_pipeline(model_name)
+
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+    def _score_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """One forward pass over a batch; returns the top (label, score) per text"""
+        results = self.classifier(
+            [text[:MAX_TEXT_CHARS] for text in texts],
+            batch_size=len(texts),
+            truncation=True
+        )
+        with self._lock:
+            self.stats['scored'] += len(texts)
+        return [(result['label'], float(result['score'])) for result in results]
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Top (label, score) for a message, from the cache when possible"""
+        key = self._cache_key(text)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return cached
+            self.stats['misses'] += 1
+
+        if self.batcher:
+            verdict = self.batcher.process(text, timeout=self.timeout)
+        else:
+            verdict = self._score_batch([text])[0]
+
+        with self._lock:
+            self._cache[key] = verdict
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return verdict
+
+    def is_toxic(self, text: str) -> bool:
+        """True when the top label is 'toxic' with a score above the threshold"""
+        label, score = self.classify(text)
+        return label == 'toxic' and score > self.threshold
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Backend, cache and batching counters for status endpoints"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            stats = {
+                **self.stats,
+                'backend': self.backend,
+                'cached_verdicts': len(self._cache),
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+            }
+        stats['batching'] = self.batcher.get_stats() if self.batcher else None
+        return stats
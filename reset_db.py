@@ -7,6 +7,7 @@ import sys
 sys.path.append('.')
 
 from app import app, db
+from database.migrations import drop_unmapped_schema, run_migrations
 from database.models import User, ChatHistory, UserAnalytics
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash
@@ -16,12 +17,15 @@ with app.app_context():
     
     
     db.drop_all()
+    drop_unmapped_schema()
     print("✅ Dropped all tables")
     
     
     db.create_all()
     print("✅ Created all tables")
     
+    run_migrations()
+    
     # Create test user
     test_user = User(
         username='testuser',
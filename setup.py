@@ -175,6 +175,7 @@ SESSION_TYPE=filesystem
 KNOWLEDGE_BASE_PATH=data/medical_knowledge/medical_faqs.json
 VECTOR_DB_PATH=data/vector_db/medical_index.faiss
 EMBEDDING_MODEL=sentence-transformers/all-mpnet-base-v2
+# EMBEDDING_BACKEND=int8  # or onnx, for CPU-only deployments; benchmark_embedding_backends.py first
 # LLAMA_MODEL_PATH=models/llama-3-8b-q4_k_m.gguf  # Uncomment after downloading
 '''
         with open('.env', 'w') as f:
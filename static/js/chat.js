@@ -239,15 +239,15 @@ class ChatApp {
 
         try {
             
-            const response = await APIService.post('/api/chat', {
-                message: message,
-                session_id: this.sessionId
-            });
+            const { data: response, streamedId } = await this.streamChatResponse(message, typingId);
 
             
             this.removeTypingIndicator(typingId);
 
             if (response.error) {
+                if (streamedId) {
+                    document.getElementById(streamedId)?.remove();
+                }
                 this.addMessage(`Error: ${response.error}`, 'ai', true);
                 Utils.showAlert(response.error, 'error');
                 return;
@@ -260,7 +260,12 @@ class ChatApp {
 
             
             if (response.response) {
-                this.addMessage(response.response, 'ai');
+                // The final text is cleaned and safety-checked server-side, so it replaces the streamed draft
+                if (streamedId) {
+                    this.updateMessageText(streamedId, response.response);
+                } else {
+                    this.addMessage(response.response, 'ai');
+                }
 
                 
                 this.updateChatStats(response);
@@ -321,6 +326,101 @@ class ChatApp {
 
         
         this.scrollToBottom();
+
+        return messageId;
+    }
+
+    updateMessageText(messageId, text) {
+        const textElement = document.querySelector(`#${messageId} .message-text`);
+        if (textElement) {
+            textElement.innerHTML = this.formatMessageText(text);
+        }
+
+        const stored = this.messages.find(m => m.id === messageId);
+        if (stored) {
+            stored.text = text;
+        }
+
+        this.scrollToBottom();
+    }
+
+    async streamChatResponse(message, typingId) {
+        const response = await fetch('/api/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({
+                message: message,
+                session_id: this.sessionId
+            })
+        });
+
+        // Emergency, validation and error answers come back as plain JSON
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.includes('text/event-stream') || !response.body) {
+            const data = await response.json().catch(() => ({
+                error: `HTTP ${response.status}: ${response.statusText}`
+            }));
+            return { data: data, streamedId: null };
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let streamedId = null;
+        let streamedText = '';
+        let finalData = { error: 'The response stream ended unexpectedly.' };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const event = this.parseStreamEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (!event) continue;
+
+                if (event.type === 'delta') {
+                    if (!streamedId) {
+                        this.removeTypingIndicator(typingId);
+                        streamedId = this.addMessage('', 'ai');
+                    }
+                    streamedText += event.data.text;
+                    this.updateMessageText(streamedId, streamedText);
+                } else {
+                    finalData = event.data;
+                }
+            }
+        }
+
+        return { data: finalData, streamedId: streamedId };
+    }
+
+    parseStreamEvent(frame) {
+        let type = 'message';
+        const dataLines = [];
+
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+
+        if (dataLines.length === 0) return null;
+
+        try {
+            return { type: type, data: JSON.parse(dataLines.join('\n')) };
+        } catch (e) {
+            console.error('Malformed stream event:', frame);
+            return null;
+        }
     }
 
     formatMessageText(text) {
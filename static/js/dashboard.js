@@ -5,8 +5,12 @@ class DashboardApp {
         this.chatHistory = [];
         this.analyticsData = null;
         this.chartInstances = {};
-        this.currentPage = 1;
-        this.totalPages = 1;
+        this.historyPageSize = 20;
+        this.historyCursor = null;
+        this.historyHasMore = false;
+        this.historyLoading = false;
+        this.historyRequestId = 0;
+        this.historyObserver = null;
 
         this.init();
     }
@@ -72,7 +76,7 @@ class DashboardApp {
             this.loadAnalyticsAsync();
 
             
-            await this.loadHistoryPage(1);
+            await this.loadHistory();
 
             
             this.updateHealthTip();
@@ -902,14 +906,14 @@ class DashboardApp {
         
         if (historySearch) {
             historySearch.addEventListener('input', Utils.debounce(() => {
-                this.loadHistoryPage(1);
+                this.loadHistory();
             }, 300));
         }
 
         
         if (historyFilter) {
             historyFilter.addEventListener('change', () => {
-                this.loadHistoryPage(1);
+                this.loadHistory();
             });
         }
 
@@ -932,41 +936,90 @@ class DashboardApp {
         }
     }
 
-    async loadHistoryPage(page) {
+    async loadHistory(append = false) {
+        if (append && (this.historyLoading || !this.historyHasMore)) return;
+
+        // A newer search or reset supersedes any request still in flight
+        const requestId = ++this.historyRequestId;
+        this.historyLoading = true;
+        this.renderHistoryFooter();
+
         try {
             const search = document.getElementById('historySearch')?.value;
             const filter = document.getElementById('historyFilter')?.value;
+            const cursor = append ? this.historyCursor : '';
 
-            let url = `/api/history?page=${page}`;
+            let url = `/api/history?per_page=${this.historyPageSize}&cursor=${encodeURIComponent(cursor || '')}`;
             if (search) url += `&search=${encodeURIComponent(search)}`;
             if (filter && filter !== 'all') url += `&filter=${filter}`;
 
             const response = await APIService.get(url);
+            if (requestId !== this.historyRequestId) return;
 
             if (response && !response.error) {
-                this.currentPage = response.current_page || 1;
-                this.totalPages = response.total_pages || 1;
-                this.renderHistoryList(response.history || []);
-                this.renderPagination();
-            } else {
+                const pagination = response.pagination || {};
+                this.historyCursor = pagination.next_cursor || null;
+                this.historyHasMore = Boolean(pagination.has_next);
+                this.renderHistoryList(response.history || [], append);
+            } else if (!append) {
+                this.historyHasMore = false;
                 this.renderHistoryList([]);
             }
         } catch (error) {
             console.error('Failed to load history:', error);
-            this.renderHistoryList([]);
+            if (!append && requestId === this.historyRequestId) {
+                this.historyHasMore = false;
+                this.renderHistoryList([]);
+            }
+        } finally {
+            if (requestId === this.historyRequestId) {
+                this.historyLoading = false;
+                this.renderHistoryFooter();
+                this.watchHistoryEnd();
+            }
+        }
+    }
+
+    loadMoreHistory() {
+        return this.loadHistory(true);
+    }
+
+    watchHistoryEnd() {
+        const sentinel = document.getElementById('historyPagination');
+        if (!sentinel || !('IntersectionObserver' in window)) return;
+
+        if (!this.historyObserver) {
+            this.historyObserver = new IntersectionObserver((entries) => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    this.loadMoreHistory();
+                }
+            }, { rootMargin: '200px' });
+        }
+
+        // Re-observing reports the current intersection, so a short list that
+        // leaves the end of the history on screen keeps loading
+        this.historyObserver.unobserve(sentinel);
+        if (this.historyHasMore) {
+            this.historyObserver.observe(sentinel);
         }
     }
 
-    renderHistoryList(history) {
+    renderHistoryList(history, append = false) {
         const historyList = document.getElementById('historyList');
         if (!historyList) return;
 
+        if (append) {
+            historyList.insertAdjacentHTML('beforeend', history.map(record => this.renderHistoryItem(record)).join(''));
+            return;
+        }
+
         if (!history || history.length === 0) {
+            const searching = Boolean(document.getElementById('historySearch')?.value);
             historyList.innerHTML = `
                 <div class="history-placeholder">
                     <i class="fas fa-history"></i>
                     <h3>No chat history found</h3>
-                    <p>${this.currentPage > 1 ? 'Try going back to page 1' : 'Start a conversation with MedAI Assistant to see your history here.'}</p>
+                    <p>${searching ? 'No conversations match your search.' : 'Start a conversation with MedAI Assistant to see your history here.'}</p>
                     <button class="btn btn-primary" id="startChatFromHistory">
                         <i class="fas fa-comment-medical"></i>
                         Start a Chat
@@ -986,7 +1039,11 @@ class DashboardApp {
             return;
         }
 
-        historyList.innerHTML = history.map(record => `
+        historyList.innerHTML = history.map(record => this.renderHistoryItem(record)).join('');
+    }
+
+    renderHistoryItem(record) {
+        return `
             <div class="history-item">
                 <div class="history-item-header">
                     <span class="history-item-date">${Utils.formatDate(record.timestamp)}</span>
@@ -1000,63 +1057,43 @@ class DashboardApp {
                     </div>
                 </div>
                 <div class="history-item-preview">
+                    ${record.highlight ? `
+                    <strong>You:</strong> ${record.highlight.user_query}<br>
+                    <strong>AI:</strong> ${record.highlight.bot_response}
+                    ` : `
                     <strong>You:</strong> ${record.user_query.substring(0, 100)}${record.user_query.length > 100 ? '...' : ''}<br>
                     <strong>AI:</strong> ${record.bot_response.substring(0, 100)}${record.bot_response.length > 100 ? '...' : ''}
+                    `}
                 </div>
                 <div class="history-item-footer">
                     <span class="history-item-intent">${record.intent || 'general'}</span>
                     <span>${record.confidence ? `Confidence: ${(record.confidence * 100).toFixed(1)}%` : ''}</span>
                 </div>
             </div>
-        `).join('');
-    }
-
-    renderPagination() {
-        const pagination = document.getElementById('historyPagination');
-        if (!pagination) return;
-
-        if (this.totalPages <= 1) {
-            pagination.innerHTML = '';
-            return;
-        }
-
-        let paginationHTML = '';
-
-        // Previous button
-        paginationHTML += `
-            <button class="pagination-btn" ${this.currentPage <= 1 ? 'disabled' : ''} 
-                onclick="dashboard.loadHistoryPage(${this.currentPage - 1})">
-                <i class="fas fa-chevron-left"></i>
-            </button>
         `;
+    }
 
-        // Page numbers
-        const maxVisible = 5;
-        let startPage = Math.max(1, this.currentPage - Math.floor(maxVisible / 2));
-        let endPage = Math.min(this.totalPages, startPage + maxVisible - 1);
-
-        if (endPage - startPage + 1 < maxVisible) {
-            startPage = Math.max(1, endPage - maxVisible + 1);
-        }
+    renderHistoryFooter() {
+        const footer = document.getElementById('historyPagination');
+        if (!footer) return;
 
-        for (let i = startPage; i <= endPage; i++) {
-            paginationHTML += `
-                <button class="pagination-number ${i === this.currentPage ? 'active' : ''}" 
-                    onclick="dashboard.loadHistoryPage(${i})">
-                    ${i}
+        if (this.historyLoading) {
+            footer.innerHTML = `
+                <span class="history-loading">
+                    <i class="fas fa-spinner fa-spin"></i>
+                    Loading conversations...
+                </span>
+            `;
+        } else if (this.historyHasMore) {
+            // Fallback for browsers without IntersectionObserver
+            footer.innerHTML = `
+                <button class="btn btn-secondary" onclick="dashboard.loadMoreHistory()">
+                    Load more
                 </button>
             `;
+        } else {
+            footer.innerHTML = '';
         }
-
-        // Next button
-        paginationHTML += `
-            <button class="pagination-btn" ${this.currentPage >= this.totalPages ? 'disabled' : ''} 
-                onclick="dashboard.loadHistoryPage(${this.currentPage + 1})">
-                <i class="fas fa-chevron-right"></i>
-            </button>
-        `;
-
-        pagination.innerHTML = paginationHTML;
     }
 
     async deleteHistory(recordId) {
@@ -1068,7 +1105,7 @@ class DashboardApp {
             if (response && response.message) {
                 Utils.showAlert('Record deleted successfully', 'success');
                 
-                await this.loadHistoryPage(this.currentPage);
+                await this.loadHistory();
                 
                 await this.loadDashboardData();
             } else {
@@ -1091,9 +1128,9 @@ class DashboardApp {
 
             
             this.renderHistoryList([]);
-            this.currentPage = 1;
-            this.totalPages = 1;
-            this.renderPagination();
+            this.historyCursor = null;
+            this.historyHasMore = false;
+            this.renderHistoryFooter();
 
             Utils.showAlert('History cleared from view (demo only)', 'info');
         } catch (error) {
@@ -1102,30 +1139,16 @@ class DashboardApp {
         }
     }
 
-    async downloadHistory() {
-        try {
-            const response = await fetch('/api/download_history');
-
-            if (response.ok) {
-                const blob = await response.blob();
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = `medai_history_${new Date().toISOString().split('T')[0]}.csv`;
-                document.body.appendChild(a);
-                a.click();
-                document.body.removeChild(a);
-                window.URL.revokeObjectURL(url);
-
-                Utils.showAlert('History downloaded successfully', 'success');
-            } else {
-                const error = await response.text();
-                throw new Error(error || 'Download failed');
-            }
-        } catch (error) {
-            console.error('Download error:', error);
-            Utils.showAlert('Failed to download history', 'error');
-        }
+    downloadHistory(format = 'csv') {
+        // Let the browser stream the export straight to disk instead of buffering it in a Blob
+        const a = document.createElement('a');
+        a.href = `/api/download_history?format=${encodeURIComponent(format)}`;
+        a.download = '';
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+
+        Utils.showAlert('History download started', 'success');
     }
 
     async viewHistory(recordId) {
@@ -0,0 +1,62 @@
+"""
+Regression cases for PII masking
+Run with pytest, or directly: python test_pii_handler.py
+"""
+import sys
+sys.path.append(".")
+
+from utils.pii_handler import pii_handler
+
+# Clinical numbers that reach retrieval and the LLM and must survive masking
+CLINICAL_TEXTS = [
+    "took 100 200 3000 mg",
+    "readings 120 140 1600",
+    "blood pressure 120 80, pulse 72",
+    "metformin 500 850 1000 mg tablets",
+    "bp 120/80 and 3 x 500 mg",
+]
+
+PHONES = [
+    ("call 555-123-4567", "call [PHONE]"),
+    ("call 555.987.6543", "call [PHONE]"),
+    ("call 5551234567", "call [PHONE]"),
+    ("call (555) 987-6543", "call [PHONE]"),
+    ("call (555)987-6543", "call [PHONE]"),
+    ("call +1 (555) 987-6543", "call [PHONE]"),
+    ("call +44 555.123.4567", "call [PHONE]"),
+]
+
+
+def test_clinical_numbers_stay_unmasked():
+    for text in CLINICAL_TEXTS:
+        assert pii_handler.detect_and_mask(text, hashed=False) == (text, []), text
+        assert pii_handler.contains_pii(text) == (False, []), text
+
+
+def test_phone_numbers_masked():
+    for text, masked in PHONES:
+        assert pii_handler.detect_and_mask(text, hashed=False) == (masked, ['phone']), text
+
+
+def test_other_pii_masked():
+    masked, types = pii_handler.detect_and_mask(
+        "mail jane.doe@example.com, SSN 123-45-6789, card 4111 1111 1111 1111", hashed=False
+    )
+    assert masked == "mail [EMAIL], SSN [SSN], card [CREDIT_CARD]", masked
+    assert types == ['email', 'ssn', 'credit_card'], types
+
+
+def main():
+    failures = 0
+    for test in (test_clinical_numbers_stay_unmasked, test_phone_numbers_masked, test_other_pii_masked):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,73 @@
+"""
+Regression cases for the shared emergency keyword matcher
+Run with pytest, or directly: python test_safety_keywords.py
+"""
+import sys
+sys.path.append(".")
+
+from utils.keyword_matcher import EMERGENCY, HIGH_RISK, check_emergency
+
+# Ordinary questions that contain common emergency words
+NOT_EMERGENCIES = [
+    "What is emergency contraception?",
+    "Side effects of hair dying",
+    "How long does emergency contraception work?",
+    "Is hair dying safe during pregnancy?",
+]
+
+EMERGENCIES = [
+    ("I have crushing chest pain", EMERGENCY, 'chest pain'),
+    ("My dad is unconscious", EMERGENCY, 'unconscious'),
+    ("I can’t breathe", EMERGENCY, "can't breathe"),
+    ("sudden high fever in my baby", HIGH_RISK, 'high fever'),
+]
+
+# Only the fallback checker treats these words as emergencies, as whole words
+FALLBACK_EMERGENCIES = [
+    ("I think I'm dying", 'dying'),
+    ("This is an emergency, help", 'emergency'),
+]
+
+
+def test_common_words_are_not_emergencies():
+    for text in NOT_EMERGENCIES:
+        assert check_emergency(text) == (False, "SAFE", ""), text
+
+
+def test_emergency_keywords_detected():
+    for text, tier, keyword in EMERGENCIES:
+        assert check_emergency(text) == (True, tier, keyword), text
+        assert check_emergency(text, fallback_words=True) == (True, tier, keyword), text
+
+
+def test_fallback_words_match_whole_words_only():
+    for text, keyword in FALLBACK_EMERGENCIES:
+        assert check_emergency(text) == (False, "SAFE", ""), text
+        assert check_emergency(text, fallback_words=True) == (True, EMERGENCY, keyword), text
+
+    assert check_emergency("emergencyroom visit costs", fallback_words=True)[0] is False
+    assert check_emergency("hair dyingagent", fallback_words=True)[0] is False
+
+
+def test_fallback_words_do_not_outrank_main_emergencies():
+    assert check_emergency("emergency: high fever and chest pain", fallback_words=True) == (
+        True, EMERGENCY, 'chest pain'
+    )
+    assert check_emergency("emergency, high fever", fallback_words=True) == (True, EMERGENCY, 'emergency')
+
+
+def main():
+    failures = 0
+    for test in (test_common_words_are_not_emergencies, test_emergency_keywords_detected,
+                 test_fallback_words_match_whole_words_only, test_fallback_words_do_not_outrank_main_emergencies):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,131 @@
+"""
+Regression cases for the chat history write-behind buffer
+Run with pytest, or directly: python test_write_behind.py
+"""
+import os
+import sys
+import tempfile
+sys.path.append(".")
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from database.models import db, User, ChatHistory, UserAnalytics
+from database.write_behind import ChatWriteBehind, new_chat_row
+
+
+def create_app():
+    app = Flask(__name__)
+    db_path = os.path.join(tempfile.mkdtemp(), 'write_behind.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='patient', email='patient@example.com', password_hash='x'))
+        db.session.commit()
+    return app
+
+
+def create_buffer(app):
+    # A long flush interval keeps the worker thread out of the way; the tests flush by hand
+    def in_app_context(fn):
+        with app.app_context():
+            return fn()
+    return ChatWriteBehind(batch_size=1000, flush_interval=3600, max_batch_attempts=5, wrapper=in_app_context)
+
+
+def flush_until_empty(buffer, max_flushes=50):
+    for _ in range(max_flushes):
+        buffer.flush()
+        if not buffer.get_stats()['pending']:
+            return
+
+
+def stored_chats(app):
+    with app.app_context():
+        chats = ChatHistory.query.count()
+        analytics = UserAnalytics.query.filter_by(user_id=1).first()
+        return chats, analytics.total_chats if analytics else 0
+
+
+def test_transient_errors_never_drop_rows():
+    app = create_app()
+    buffer = create_buffer(app)
+    failures = {'left': 8}
+
+    def locked_then_ok(batch):
+        if failures['left']:
+            failures['left'] -= 1
+            raise OperationalError("INSERT INTO chat_history", {}, Exception("database is locked"))
+        ChatWriteBehind._write_batch(batch)
+
+    buffer._write_batch = locked_then_ok
+    for i in range(3):
+        buffer.enqueue(new_chat_row(1, f"question {i}", f"answer {i}", intent='general'))
+
+    flush_until_empty(buffer)
+
+    stats = buffer.get_stats()
+    assert failures['left'] == 0
+    assert stats['dropped'] == 0, stats
+    assert stats['flushed'] == 3, stats
+    assert stored_chats(app) == (3, 3)
+
+
+def test_permanent_errors_drop_only_bad_rows():
+    app = create_app()
+    buffer = create_buffer(app)
+
+    buffer.enqueue(new_chat_row(1, "good question", "good answer"))
+    buffer.enqueue(new_chat_row(1, None, "violates NOT NULL"))
+    buffer.enqueue(new_chat_row(1, "another question", "another answer"))
+
+    flush_until_empty(buffer)
+
+    stats = buffer.get_stats()
+    assert stats['dropped'] == 1, stats
+    assert stats['flushed'] == 2, stats
+    assert stats['pending'] == 0, stats
+    assert stored_chats(app) == (2, 2)
+
+
+def test_transient_error_during_row_by_row_pass_keeps_rows():
+    app = create_app()
+    buffer = create_buffer(app)
+    calls = {'good_row': 0}
+
+    def flaky(batch):
+        # Writing the good row on its own first hits a locked database, then works
+        if len(batch) == 1 and batch[0]['user_query'] == "good question":
+            calls['good_row'] += 1
+            if calls['good_row'] == 1:
+                raise OperationalError("INSERT INTO chat_history", {}, Exception("database is locked"))
+        ChatWriteBehind._write_batch(batch)
+
+    buffer._write_batch = flaky
+    buffer.enqueue(new_chat_row(1, None, "violates NOT NULL"))
+    buffer.enqueue(new_chat_row(1, "good question", "good answer"))
+
+    flush_until_empty(buffer)
+
+    stats = buffer.get_stats()
+    assert stats['dropped'] == 1, stats
+    assert stats['pending'] == 0, stats
+    assert stored_chats(app) == (1, 1)
+
+
+def main():
+    failures = 0
+    for test in (test_transient_errors_never_drop_rows, test_permanent_errors_drop_only_bad_rows,
+                 test_transient_error_during_row_by_row_pass_keeps_rows):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,81 @@
+"""
+Background task queue for work that should not delay an HTTP response
+(stats recomputation, Socket.IO broadcasts)
+"""
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class BackgroundTaskQueue:
+    """
+    Runs fire-and-forget tasks in order on a single daemon thread.
+
+    Tasks are best-effort: when the queue is full new tasks are dropped and
+    counted rather than blocking the caller.
+    """
+
+    def __init__(self, name: str = 'background-tasks', max_size: int = 1000,
+                 wrapper: Optional[Callable[[Callable], Any]] = None):
+        """
+        Args:
+            name: Worker thread name, also used in log messages
+            max_size: Maximum number of pending tasks
+            wrapper: Optional callable that runs each task, e.g. inside a Flask app context
+        """
+        self.name = name
+        self.wrapper = wrapper
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_size)
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'dropped': 0}
+        self._stats_lock = threading.Lock()
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+        atexit.register(self.drain)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> bool:
+        """Queue fn(*args, **kwargs); returns False if the task was dropped"""
+        try:
+            self._queue.put_nowait((fn, args, kwargs))
+        except queue.Full:
+            self._count('dropped')
+            print(f"⚠️ {self.name} queue full, dropping {getattr(fn, '__name__', 'task')}")
+            return False
+
+        self._count('submitted')
+        return True
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Wait up to timeout seconds for queued tasks to finish"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Task counters for status endpoints"""
+        with self._stats_lock:
+            return {**self._stats, 'pending': self._queue.qsize()}
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _run(self):
+        while True:
+            fn, args, kwargs = self._queue.get()
+            try:
+                if self.wrapper:
+                    self.wrapper(lambda: fn(*args, **kwargs))
+                else:
+                    fn(*args, **kwargs)
+                self._count('completed')
+            except Exception as e:
+                self._count('failed')
+                print(f"❌ {self.name} task {getattr(fn, '__name__', 'task')} failed: {e}")
+            finally:
+                self._queue.task_done()
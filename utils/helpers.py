@@ -14,7 +14,7 @@ def sanitize_input(text: str, max_length: int = 1000) -> str:
     if not text:
         return ""
     text = text.strip()[:max_length]
-    text = re.sub(r'[<>"'`;\\]', '', text)
+    text = re.sub(r'[<>"\'`;\\]', '', text)
     text = re.sub(r'\s+', ' ', text)
     return text
 
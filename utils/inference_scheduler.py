@@ -0,0 +1,261 @@
+"""
+Inference scheduler for the single shared LLaMA instance
+Serializes generation behind a bounded queue with per-user fairness
+"""
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterator, Optional
+
+_STREAM_END = object()
+
+
+class SchedulerSaturated(Exception):
+    """Raised when a job cannot be queued"""
+
+    def __init__(self, message: str, queue_depth: int, retry_after: int, per_user: bool = False):
+        super().__init__(message)
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self.per_user = per_user
+
+
+class JobCancelled(Exception):
+    """Raised when the result of a cancelled job is requested"""
+
+
+class InferenceJob:
+    """A unit of work queued on the scheduler"""
+
+    def __init__(self, user_id: Any, fn: Callable, args: tuple, kwargs: dict, stream: bool):
+        self.user_id = user_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.stream = stream
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        self._events = queue.Queue()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Cancel the job; a running stream stops at the next token"""
+        self._cancelled.set()
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Block until a non-streaming job finishes
+
+        Raises:
+            TimeoutError: if the job did not finish in time (the job is cancelled)
+            JobCancelled: if the job was cancelled before it ran
+        """
+        if not self._done.wait(timeout):
+            self.cancel()
+            raise TimeoutError("Inference job timed out")
+
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def events(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Iterate over the events of a streaming job
+
+        The job is cancelled if the consumer stops early, e.g. when the
+        client disconnects mid-stream.
+        """
+        try:
+            while True:
+                try:
+                    item = self._events.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError("Inference job timed out")
+
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.cancel()
+
+    def _finish(self, result: Any = None, error: Optional[BaseException] = None):
+        self._result = result
+        self._error = error
+        if self.stream:
+            self._events.put(error if error is not None else _STREAM_END)
+        self._done.set()
+
+
+class InferenceScheduler:
+    """
+    Owns access to the model: jobs run one at a time on a worker thread.
+
+    Users are served round-robin and each user's jobs run in FIFO order, so
+    one chatty client cannot starve everyone else.
+    """
+
+    def __init__(self, max_queue: int = 16, max_per_user: int = 2, default_service_time: float = 8.0):
+        """
+        Args:
+            max_queue: Maximum number of jobs waiting across all users
+            max_per_user: Maximum queued or running jobs per user
+            default_service_time: Initial estimate (seconds) of one job, used for ETAs
+        """
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+
+        self._lock = threading.Condition()
+        self._user_queues: "OrderedDict[Any, deque]" = OrderedDict()
+        self._depth = 0
+        self._running: Optional[InferenceJob] = None
+        self._avg_service_time = default_service_time
+        self._stats = {'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0}
+
+        self._worker = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._worker.start()
+
+    def submit(self, user_id: Any, fn: Callable, *args, stream: bool = False, **kwargs) -> InferenceJob:
+        """
+        Queue fn(*args, **kwargs) for execution on the worker thread
+
+        Args:
+            user_id: Owner of the job, used for fairness and per-user limits
+            fn: Callable to run; with stream=True it must return an iterator
+            stream: Forward the iterator's items through InferenceJob.events()
+
+        Raises:
+            SchedulerSaturated: if the user or the whole queue is at capacity
+        """
+        with self._lock:
+            user_jobs = len(self._user_queues.get(user_id, ()))
+            if self._running is not None and self._running.user_id == user_id:
+                user_jobs += 1
+
+            if user_jobs >= self.max_per_user:
+                self._stats['rejected'] += 1
+                raise SchedulerSaturated(
+                    "You already have a request in progress. Please wait for it to finish.",
+                    queue_depth=self._depth,
+                    retry_after=self._retry_after(self._depth),
+                    per_user=True
+                )
+
+            if self._depth >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise SchedulerSaturated(
+                    "The assistant is busy right now. Please try again shortly.",
+                    queue_depth=self._depth,
+                    retry_after=self._retry_after(self._depth)
+                )
+
+            job = InferenceJob(user_id, fn, args, kwargs, stream)
+            self._user_queues.setdefault(user_id, deque()).append(job)
+            self._depth += 1
+            self._lock.notify()
+            return job
+
+    def estimate_wait(self) -> float:
+        """Estimated seconds until a newly submitted job would start"""
+        with self._lock:
+            return self._estimate_wait(self._depth)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Queue depth, ETA and counters for status endpoints"""
+        with self._lock:
+            return {
+                'queue_depth': self._depth,
+                'max_queue': self.max_queue,
+                'max_per_user': self.max_per_user,
+                'busy': self._running is not None,
+                'active_users': len(self._user_queues),
+                'avg_service_time': round(self._avg_service_time, 2),
+                'estimated_wait': round(self._estimate_wait(self._depth), 1),
+                **self._stats
+            }
+
+    def _estimate_wait(self, depth: int) -> float:
+        running = 1 if self._running is not None else 0
+        return (depth + running) * self._avg_service_time
+
+    def _retry_after(self, depth: int) -> int:
+        return max(1, math.ceil(self._estimate_wait(depth)))
+
+    def _next_job(self) -> InferenceJob:
+        """Pop the next job round-robin across users (caller holds the lock)"""
+        user_id, jobs = next(iter(self._user_queues.items()))
+        job = jobs.popleft()
+
+        del self._user_queues[user_id]
+        if jobs:
+            # Re-append so this user goes to the back of the rotation
+            self._user_queues[user_id] = jobs
+
+        self._depth -= 1
+        return job
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._depth == 0:
+                    self._lock.wait()
+                job = self._next_job()
+
+                if job.cancelled:
+                    self._stats['cancelled'] += 1
+                    job._finish(error=JobCancelled("Inference job was cancelled"))
+                    continue
+
+                self._running = job
+
+            job.started_at = time.monotonic()
+            outcome = self._execute(job)
+            service_time = time.monotonic() - job.started_at
+
+            with self._lock:
+                self._running = None
+                self._stats[outcome] += 1
+                if outcome == 'completed':
+                    # Exponential moving average keeps the ETA responsive to load changes
+                    self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+
+    def _execute(self, job: InferenceJob) -> str:
+        try:
+            if not job.stream:
+                job._finish(result=job.fn(*job.args, **job.kwargs))
+                return 'completed'
+
+            iterator = job.fn(*job.args, **job.kwargs)
+            try:
+                for event in iterator:
+                    if job.cancelled:
+                        break
+                    job._events.put(event)
+            finally:
+                # Closing the generator stops llama.cpp from producing more tokens
+                close = getattr(iterator, 'close', None)
+                if close:
+                    close()
+
+            if job.cancelled:
+                job._finish(error=JobCancelled("Inference job was cancelled"))
+                return 'cancelled'
+
+            job._finish()
+            return 'completed'
+
+        except Exception as e:
+            print(f"❌ Inference job failed: {e}")
+            job._finish(error=e)
+            return 'failed'
@@ -0,0 +1,170 @@
+"""
+Precompiled keyword matching for AI Medical Chatbot safety checks
+All keywords of a matcher are merged into one trie-shaped regular expression,
+so a message is scanned once, left to right, whatever the number of keywords.
+The emergency and inappropriate-content keyword sets shared by SafetyChecker,
+the fallback checker and utils.validators are defined here.
+"""
+import re
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+# Emergency severity tiers, most severe first
+EMERGENCY = 'EMERGENCY_DETECTED'
+HIGH_RISK = 'HIGH_RISK_SYMPTOM'
+
+EMERGENCY_TIERS = {
+    EMERGENCY: [
+        'heart attack', 'stroke', 'suicide', 'severe pain',
+        'bleeding heavily', 'can\'t breathe', 'unconscious',
+        'chest pain', 'shortness of breath', 'sudden paralysis',
+        'choking', 'overdose', 'poisoning', 'seizure'
+    ],
+    HIGH_RISK: [
+        'severe headache', 'high fever', 'broken bone', 'deep cut',
+        'difficulty breathing', 'chest pressure', 'paralysis'
+    ]
+}
+
+# Extra emergency words of the fallback checker. They are too common to match
+# as substrings ("emergency contraception", "hair dying"), so they match as
+# whole words, and only while the fallback checker is serving
+FALLBACK_EMERGENCY_WORDS = ['dying', 'emergency']
+
+# Requests the chatbot refuses, matched as whole words
+INAPPROPRIATE_TIERS = {
+    'treatment_request': ['diagnose me', 'prescribe me', 'cure me', 'treat me'],
+    'self_harm': ['suicide', 'kill myself', 'end my life', 'self-harm'],
+    'substance_abuse': ['overdose', 'poison', 'illegal drugs', 'abuse'],
+    'security': ['hack', 'exploit', 'virus', 'malware']
+}
+
+_APOSTROPHES = str.maketrans({'’': "'", '‘': "'"})
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    tier: str
+    start: int
+
+
+def normalize_keyword(text: str) -> str:
+    """Lowercase and fold typographic apostrophes (can’t -> can't)"""
+    return text.lower().translate(_APOSTROPHES)
+
+
+def _escape_char(char: str) -> str:
+    if char == "'":
+        return "['‘’]"
+    return re.escape(char)
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Regex source matching any of keywords, with shared prefixes factored out
+    (heart attack|heat stroke -> hea(?:rt attack|t stroke)) so the engine
+    tests each position against one branch per distinct next character.
+    Longer keywords win over their own prefixes.
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [_escape_char(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        optional = '' in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if optional else group
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds keywords from several severity tiers in one pass over the text.
+
+    Matching is case-insensitive. By default keywords match anywhere in the
+    text (like `keyword in text.lower()`); with whole_words=True they must
+    sit on word boundaries. A keyword listed under several tiers belongs to
+    the first (most severe) one.
+    """
+
+    def __init__(self, tiers: Mapping[str, Iterable[str]], whole_words: bool = False):
+        """
+        Args:
+            tiers: Tier name -> keywords, most severe tier first
+            whole_words: Require word boundaries around matches
+        """
+        self.tier_order: List[str] = list(tiers)
+        self.keyword_tiers: Dict[str, str] = {}
+        for tier, keywords in tiers.items():
+            for keyword in keywords:
+                self.keyword_tiers.setdefault(normalize_keyword(keyword), tier)
+
+        # Text is lowercased before matching; a case-sensitive pattern lets the
+        # regex engine skip ahead to positions that can start a keyword
+        pattern = _trie_pattern(self.keyword_tiers)
+        if whole_words:
+            pattern = r'\b' + pattern + r'\b'
+        self.pattern = re.compile(pattern)
+        self._rank = {tier: index for index, tier in enumerate(self.tier_order)}
+
+    def contains_any(self, text: str) -> bool:
+        """True as soon as one keyword is found"""
+        return bool(text) and self.pattern.search(text.lower()) is not None
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """Every keyword occurrence, in text order"""
+        if not text:
+            return []
+        hits = []
+        for match in self.pattern.finditer(text.lower()):
+            keyword = normalize_keyword(match.group(0))
+            hits.append(KeywordHit(keyword, self.keyword_tiers[keyword], match.start()))
+        return hits
+
+    def keywords_in(self, text: str) -> List[str]:
+        """Distinct matched keywords, in order of first occurrence"""
+        return list(dict.fromkeys(hit.keyword for hit in self.find_all(text)))
+
+    def most_severe(self, text: str) -> Optional[KeywordHit]:
+        """The earliest hit of the most severe tier present, or None"""
+        best = None
+        for hit in self.find_all(text):
+            if best is None or self._rank[hit.tier] < self._rank[best.tier]:
+                best = hit
+                if self._rank[hit.tier] == 0:
+                    break
+        return best
+
+
+emergency_matcher = KeywordMatcher(EMERGENCY_TIERS)
+fallback_emergency_matcher = KeywordMatcher({EMERGENCY: FALLBACK_EMERGENCY_WORDS}, whole_words=True)
+inappropriate_matcher = KeywordMatcher(INAPPROPRIATE_TIERS, whole_words=True)
+
+
+def check_emergency(text: str, fallback_words: bool = False):
+    """
+    Shared implementation of SafetyChecker.check_emergency
+
+    Args:
+        text: User message
+        fallback_words: Also treat FALLBACK_EMERGENCY_WORDS (whole words) as
+            emergencies, as the fallback checker always has
+
+    Returns:
+        (is_emergency, tier, keyword) - tier is EMERGENCY_DETECTED,
+        HIGH_RISK_SYMPTOM or SAFE
+    """
+    hit = emergency_matcher.most_severe(text)
+    if fallback_words and (hit is None or hit.tier != EMERGENCY):
+        hit = fallback_emergency_matcher.most_severe(text) or hit
+    if hit is None:
+        return False, "SAFE", ""
+    return True, hit.tier, hit.keyword
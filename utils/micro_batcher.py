@@ -0,0 +1,108 @@
+"""
+Micro-batching for concurrent requests
+Collects items submitted from many threads for a few milliseconds and
+processes them with a single batched call
+"""
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submissions into batches for a vectorized function.
+
+    A batch is dispatched as soon as it is full or when the oldest item has
+    waited max_wait_ms, so a lone request pays at most that much extra latency.
+    """
+
+    def __init__(self,
+                 batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0,
+                 name: str = 'micro-batcher'):
+        """
+        Args:
+            batch_fn: Called with a list of items, must return one result per item in order
+            max_batch_size: Largest batch handed to batch_fn
+            max_wait_ms: How long the first item of a batch waits for company
+            name: Worker thread name, also used in log messages
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._lock = threading.Condition()
+        self._pending: List[tuple] = []  # (item, future)
+        self._stats = {'batches': 0, 'items': 0, 'largest_batch': 0, 'failed_batches': 0}
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item; the future resolves to its entry in batch_fn's output"""
+        future = Future()
+        with self._lock:
+            self._pending.append((item, future))
+            self._lock.notify()
+        return future
+
+    def process(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit an item and block until its result is ready"""
+        return self.submit(item).result(timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batch counters for status endpoints"""
+        with self._lock:
+            batches = self._stats['batches']
+            return {
+                **self._stats,
+                'pending': len(self._pending),
+                'avg_batch_size': round(self._stats['items'] / batches, 2) if batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0
+            }
+
+    def _next_batch(self) -> List[tuple]:
+        with self._lock:
+            while not self._pending:
+                self._lock.wait()
+
+            # Give concurrent callers a short window to join this batch
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._lock.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            items = [item for item, _ in batch]
+
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name} returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                print(f"❌ {self.name} batch of {len(items)} failed: {e}")
+                with self._lock:
+                    self._stats['failed_batches'] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self._stats['batches'] += 1
+                self._stats['items'] += len(items)
+                self._stats['largest_batch'] = max(self._stats['largest_batch'], len(items))
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,88 @@
+"""
+Readiness tracking for models loaded in the background
+loading -> warming -> ready, or degraded when loading fails or runs without LLaMA
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+LOADING = 'loading'
+WARMING = 'warming'
+READY = 'ready'
+DEGRADED = 'degraded'
+
+MODEL_STATES = (LOADING, WARMING, READY, DEGRADED)
+
+_TRANSITIONS = {
+    LOADING: (WARMING, READY, DEGRADED),
+    WARMING: (READY, DEGRADED),
+    READY: (DEGRADED,),
+    DEGRADED: (LOADING,)  # a reload may be attempted
+}
+
+
+class ModelReadiness:
+    """Thread-safe state machine shared by the loader thread and request handlers"""
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._state = LOADING
+        self._detail = 'Starting model loader'
+        self._started_at = time.time()
+        self._changed_at = self._started_at
+        self._history = [(LOADING, self._started_at)]
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def serving(self) -> bool:
+        """True once chat can be answered, by the real models or the fallbacks"""
+        return self._state in (READY, DEGRADED)
+
+    def set_state(self, state: str, detail: Optional[str] = None):
+        """
+        Move to a new state
+
+        Raises:
+            ValueError: on an unknown state or a transition the machine does not allow
+        """
+        if state not in MODEL_STATES:
+            raise ValueError(f"Unknown model state: {state}")
+
+        with self._lock:
+            if state != self._state and state not in _TRANSITIONS[self._state]:
+                raise ValueError(f"Invalid model state transition: {self._state} -> {state}")
+
+            self._state = state
+            self._detail = detail
+            self._changed_at = time.time()
+            self._history.append((state, self._changed_at))
+            self._lock.notify_all()
+
+        print(f"🔄 Model state: {state}{f' ({detail})' if detail else ''}")
+
+    def wait_until_serving(self, timeout: Optional[float] = None) -> bool:
+        """Block until ready or degraded; returns False on timeout"""
+        with self._lock:
+            return self._lock.wait_for(lambda: self.serving, timeout)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Current state and how long each phase took, for health endpoints"""
+        with self._lock:
+            now = time.time()
+            phases = {}
+            for (state, started), (_, ended) in zip(self._history, self._history[1:] + [(None, now)]):
+                phases[state] = round(phases.get(state, 0.0) + ended - started, 2)
+
+            return {
+                'state': self._state,
+                'ready': self._state == READY,
+                'serving': self.serving,
+                'detail': self._detail,
+                'since': datetime.fromtimestamp(self._changed_at).isoformat(),
+                'uptime': round(now - self._started_at, 2),
+                'phase_seconds': phases
+            }
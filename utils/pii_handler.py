@@ -1,72 +1,118 @@
 """
 PII (Personally Identifiable Information) Handler
 Properly masks PII while preserving query semantics
+All PII patterns are compiled once into a single alternation, so a text is
+scanned in one pass and masked with one re.sub call; overlapping candidates
+(an SSN-shaped run inside a phone number) resolve to a single match.
 """
 import re
-from typing import Tuple, List, Optional
+from typing import Dict, Iterable, List, NamedTuple, Tuple
 import hashlib
 
+
+class PIIMatch(NamedTuple):
+    pii_type: str
+    start: int
+    end: int
+    value: str
+
+
 class PIIHandler:
     """Handle PII detection and masking"""
-    
+
     def __init__(self):
-        # PII patterns with better detection
+        # PII patterns, most specific first: where two patterns match at the
+        # same position the earlier one wins (a card number is not a phone)
         self.patterns = {
             'email': {
                 'pattern': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-                'mask': '[EMAIL_{hash}]'
+                'mask': '[EMAIL_{hash}]',
+                'label': '[EMAIL]'
+            },
+            'credit_card': {
+                'pattern': r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b',
+                'mask': '[CARD_{hash}]',
+                'label': '[CREDIT_CARD]'
             },
             'phone': {
-                'pattern': r'\b(\+\d{1,3}[-.]?)?\(?\d{3}\)?[-.]?\d{3}[-.]?\d{4}\b',
-                'mask': '[PHONE_{hash}]'
+                # (?<!\w) rather than \b so "(555) 987-6543" matches from its parenthesis.
+                # A space only follows a parenthesised area code: bare runs such as
+                # "100 200 3000 mg" or "120 140 1600" are dosages and readings, not phones
+                'pattern': r'(?<!\w)(?:\+\d{1,3}[-. ]?)?(?:\(\d{3}\) ?|\d{3}[-.]?)\d{3}[-.]?\d{4}\b',
+                'mask': '[PHONE_{hash}]',
+                'label': '[PHONE]'
             },
             'ssn': {
                 'pattern': r'\b\d{3}[-.]?\d{2}[-.]?\d{4}\b',
-                'mask': '[SSN_{hash}]'
-            },
-            'credit_card': {
-                'pattern': r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b',
-                'mask': '[CARD_{hash}]'
+                'mask': '[SSN_{hash}]',
+                'label': '[SSN]'
             }
         }
-    
-    def detect_and_mask(self, text: str) -> Tuple[str, List[str]]:
+
+        # Only the email pattern can start on a letter; the numeric patterns sit
+        # behind a lookahead so most positions are rejected with one class test
+        numeric = '|'.join(
+            f"(?P<{pii_type}>{config['pattern']})"
+            for pii_type, config in self.patterns.items() if pii_type != 'email'
+        )
+        numeric = rf"(?=[\d+(])(?:{numeric})"
+        self.combined_pattern = re.compile(
+            f"(?P<email>{self.patterns['email']['pattern']})|{numeric}", re.IGNORECASE
+        )
+        # Same scan for texts without an @, which cannot contain an email
+        self._numeric_pattern = re.compile(numeric)
+
+        # Every pattern needs a digit or an @; texts without either skip the regex
+        self._quick_check = re.compile(r'[\d@]')
+
+    def _pattern_for(self, text: str):
+        return self.combined_pattern if '@' in text else self._numeric_pattern
+
+    def scan(self, text: str) -> List[PIIMatch]:
+        """All PII matches in text order, without overlaps"""
+        if not text or not self._quick_check.search(text):
+            return []
+        return [
+            PIIMatch(match.lastgroup, match.start(), match.end(), match.group())
+            for match in self._pattern_for(text).finditer(text)
+        ]
+
+    def detect_and_mask(self, text: str, hashed: bool = True) -> Tuple[str, List[str]]:
         """
         Detect and mask PII in text
+
+        Args:
+            text: Text to scrub
+            hashed: Masks carry a short hash of the value ([EMAIL_1a2b3c4d]) so equal
+                values stay recognisable; False uses plain labels ([EMAIL])
+
         Returns: (masked_text, detected_types)
         """
-        if not text:
+        if not text or not self._quick_check.search(text):
             return text, []
-        
-        masked_text = text
-        detected_types = []
-        
-        for pii_type, config in self.patterns.items():
-            pattern = config['pattern']
-            mask_template = config['mask']
-            
-            matches = list(re.finditer(pattern, text, re.IGNORECASE))
-            if matches:
-                detected_types.append(pii_type)
-                
-                for match in matches:
-                    pii_value = match.group()
-                    
-                    pii_hash = hashlib.md5(pii_value.encode()).hexdigest()[:8]
-                    mask = mask_template.format(hash=pii_hash)
-                    masked_text = masked_text.replace(pii_value, mask)
-        
-        return masked_text, detected_types
-    
+
+        detected_types: Dict[str, None] = {}
+
+        def replace(match):
+            pii_type = match.lastgroup
+            detected_types[pii_type] = None
+            config = self.patterns[pii_type]
+            if not hashed:
+                return config['label']
+            pii_hash = hashlib.md5(match.group().encode()).hexdigest()[:8]
+            return config['mask'].format(hash=pii_hash)
+
+        masked_text = self._pattern_for(text).sub(replace, text)
+        return masked_text, list(detected_types)
+
+    def detect_and_mask_batch(self, texts: Iterable[str], hashed: bool = True) -> List[Tuple[str, List[str]]]:
+        """detect_and_mask for many texts, e.g. when scrubbing stored history"""
+        return [self.detect_and_mask(text, hashed=hashed) for text in texts]
+
     def contains_pii(self, text: str) -> Tuple[bool, List[str]]:
         """Check if text contains PII without masking"""
-        detected_types = []
-        
-        for pii_type, config in self.patterns.items():
-            if re.search(config['pattern'], text, re.IGNORECASE):
-                detected_types.append(pii_type)
-        
+        detected_types = list(dict.fromkeys(match.pii_type for match in self.scan(text)))
         return len(detected_types) > 0, detected_types
 
 # Singleton instance
-pii_handler = PIIHandler()
\ No newline at end of file
+pii_handler = PIIHandler()
@@ -0,0 +1,245 @@
+"""
+Tiered safety pipeline for chat messages
+Runs the safety checks as ordered stages with explicit cost tiers: cheap
+lexical stages (tier 0) settle most messages, and the model-based toxicity
+classifier (tier 1) only sees messages whose lexical risk score crosses a
+configurable threshold. Every stage records its decision and timing.
+"""
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from .keyword_matcher import KeywordMatcher
+from .pii_handler import pii_handler
+
+# Stage decisions
+PASS = 'pass'          # stage found nothing, continue
+BLOCK = 'block'        # reject the message
+EMERGENCY = 'emergency'
+SKIP = 'skip'          # stage not needed for this message
+ESCALATE = 'escalate'  # lexical stage defers to the model tier
+MASKED = 'masked'      # stage rewrote the message
+
+# Lexicon behind the risk score; whole words, so medical terms such as
+# "painkiller" or "dickens" do not count
+RISK_TIERS = {
+    'strong': [
+        'fuck', 'fucking', 'fucker', 'shit', 'bitch', 'bastard', 'asshole',
+        'cunt', 'dick', 'retard', 'retarded', 'whore', 'slut', 'motherfucker'
+    ],
+    'mild': [
+        'stupid', 'idiot', 'idiots', 'dumb', 'moron', 'shut up', 'hate you',
+        'loser', 'useless', 'pathetic', 'ugly', 'kill you', 'go die', 'worthless'
+    ]
+}
+
+DEFAULT_RISK_WEIGHTS = {
+    'strong': 0.6,       # per strong-lexicon hit
+    'mild': 0.3,         # per mild-lexicon hit
+    'obfuscated': 0.3,   # masked swear words such as f*ck or sh!t
+    'shouting': 0.2,     # mostly upper case
+    'punctuation': 0.1   # runs of !!! or ???
+}
+
+_OBFUSCATED = re.compile(r'[a-z][*#$!]+[a-z]', re.IGNORECASE)
+_PUNCTUATION_RUN = re.compile(r'[!?]{3,}')
+
+
+@dataclass
+class StageResult:
+    name: str
+    tier: int
+    decision: str
+    duration_ms: float
+    detail: Optional[str] = None
+
+
+@dataclass
+class SafetyVerdict:
+    """Outcome of a pipeline run; text is the (possibly PII-masked) message"""
+    action: str                           # 'allow', 'block' or 'emergency'
+    text: str
+    message: Optional[str] = None         # user-facing reason when blocked
+    emergency_keyword: Optional[str] = None
+    pii_types: List[str] = field(default_factory=list)
+    risk_score: float = 0.0
+    stages: List[StageResult] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(stage.duration_ms for stage in self.stages)
+
+    def summary(self) -> Dict[str, Any]:
+        """Decision trace without the message text, for logs and status"""
+        return {
+            'action': self.action,
+            'risk_score': round(self.risk_score, 3),
+            'total_ms': round(self.total_ms, 3),
+            'stages': [
+                {'name': s.name, 'tier': s.tier, 'decision': s.decision, 'ms': round(s.duration_ms, 3)}
+                for s in self.stages
+            ]
+        }
+
+
+class LexicalRiskScorer:
+    """Cheap 0..1 estimate of how likely a message is to be toxic"""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = {**DEFAULT_RISK_WEIGHTS, **(weights or {})}
+        self.matcher = KeywordMatcher(RISK_TIERS, whole_words=True)
+
+    def score(self, text: str) -> float:
+        risk = 0.0
+        for hit in self.matcher.find_all(text):
+            risk += self.weights[hit.tier]
+
+        if _OBFUSCATED.search(text):
+            risk += self.weights['obfuscated']
+
+        letters = [char for char in text if char.isalpha()]
+        if len(letters) >= 10 and sum(char.isupper() for char in letters) / len(letters) > 0.6:
+            risk += self.weights['shouting']
+
+        if _PUNCTUATION_RUN.search(text):
+            risk += self.weights['punctuation']
+
+        return min(risk, 1.0)
+
+
+class SafetyPipeline:
+    """
+    Ordered safety stages for one message:
+
+        tier 0  emergency     emergency keywords -> emergency answer
+        tier 0  lexical       length and inappropriate-request filters -> block
+        tier 0  risk_score    lexical toxicity risk; below the threshold the model is skipped
+        tier 1  toxicity      model classifier, only for escalated messages -> block
+        tier 0  pii           mask personal data in what continues to the model
+
+    The pipeline stops at the first blocking or emergency decision.
+    """
+
+    def __init__(self,
+                 risk_threshold: float = 0.3,
+                 risk_weights: Optional[Dict[str, float]] = None,
+                 trace_size: int = 50):
+        """
+        Args:
+            risk_threshold: Lexical risk at or above which the model classifier runs
+                (0 runs it on every message, above 1 never)
+            risk_weights: Overrides for DEFAULT_RISK_WEIGHTS
+            trace_size: Recent decision traces kept for get_stats()
+        """
+        self.risk_threshold = risk_threshold
+        self.risk_scorer = LexicalRiskScorer(risk_weights)
+
+        self._lock = threading.Lock()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=trace_size)
+        self._actions: Dict[str, int] = {'allow': 0, 'block': 0, 'emergency': 0}
+        self._stage_totals: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, text: str, checker) -> SafetyVerdict:
+        """
+        Run the stages against a message
+
+        Args:
+            text: Sanitized user message
+            checker: SafetyChecker or FallbackSafetyChecker providing
+                check_emergency, validate_query and (optionally) toxicity_scorer
+        """
+        verdict = SafetyVerdict(action='allow', text=text)
+
+        # Tier 0: emergencies are answered before anything else
+        start = time.perf_counter()
+        is_emergency, emergency_type, keyword = checker.check_emergency(text)
+        self._record(verdict, 'emergency', 0, EMERGENCY if is_emergency else PASS, start,
+                     emergency_type if is_emergency else None)
+        if is_emergency:
+            verdict.action = 'emergency'
+            verdict.emergency_keyword = keyword
+            return self._finish(verdict)
+
+        # Tier 0: length limits and inappropriate-request keywords
+        start = time.perf_counter()
+        is_valid, validation_msg = checker.validate_query(text, check_toxicity=False)
+        self._record(verdict, 'lexical', 0, PASS if is_valid else BLOCK, start)
+        if not is_valid:
+            verdict.action = 'block'
+            verdict.message = validation_msg
+            return self._finish(verdict)
+
+        # Tier 0: lexical risk decides whether the classifier is worth running
+        scorer = getattr(checker, 'toxicity_scorer', None)
+        start = time.perf_counter()
+        verdict.risk_score = self.risk_scorer.score(text)
+        escalate = scorer is not None and verdict.risk_score >= self.risk_threshold
+        self._record(verdict, 'risk_score', 0, ESCALATE if escalate else PASS, start,
+                     f"{verdict.risk_score:.2f}")
+
+        # Tier 1: model classifier on the ambiguous residue only
+        start = time.perf_counter()
+        if not escalate:
+            self._record(verdict, 'toxicity', 1, SKIP, start)
+        else:
+            try:
+                toxic = scorer.is_toxic(text)
+            except Exception as e:
+                print(f"⚠️ Toxicity check skipped: {e}")
+                toxic = False
+            self._record(verdict, 'toxicity', 1, BLOCK if toxic else PASS, start)
+            if toxic:
+                verdict.action = 'block'
+                verdict.message = "This query appears to be inappropriate."
+                return self._finish(verdict)
+
+        # Tier 0: mask personal data before it reaches retrieval, the model or the history
+        start = time.perf_counter()
+        verdict.text, verdict.pii_types = pii_handler.detect_and_mask(text, hashed=False)
+        self._record(verdict, 'pii', 0, MASKED if verdict.pii_types else PASS, start,
+                     ','.join(verdict.pii_types) or None)
+
+        return self._finish(verdict)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-stage decision counts and timings plus recent decision traces"""
+        with self._lock:
+            stages = {
+                name: {
+                    'runs': totals['runs'],
+                    'avg_ms': round(totals['total_ms'] / totals['runs'], 3) if totals['runs'] else 0.0,
+                    'max_ms': round(totals['max_ms'], 3),
+                    'decisions': dict(totals['decisions'])
+                }
+                for name, totals in self._stage_totals.items()
+            }
+            return {
+                'risk_threshold': self.risk_threshold,
+                'actions': dict(self._actions),
+                'stages': stages,
+                'recent': list(self._recent)
+            }
+
+    @staticmethod
+    def _record(verdict: SafetyVerdict, name: str, tier: int, decision: str,
+                start: float, detail: Optional[str] = None):
+        duration_ms = (time.perf_counter() - start) * 1000.0
+        verdict.stages.append(StageResult(name, tier, decision, duration_ms, detail))
+
+    def _finish(self, verdict: SafetyVerdict) -> SafetyVerdict:
+        with self._lock:
+            self._actions[verdict.action] += 1
+            for stage in verdict.stages:
+                totals = self._stage_totals.setdefault(
+                    stage.name, {'runs': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'decisions': {}}
+                )
+                if stage.decision != SKIP:
+                    totals['runs'] += 1
+                    totals['total_ms'] += stage.duration_ms
+                    totals['max_ms'] = max(totals['max_ms'], stage.duration_ms)
+                totals['decisions'][stage.decision] = totals['decisions'].get(stage.decision, 0) + 1
+            self._recent.append(verdict.summary())
+        return verdict
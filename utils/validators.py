@@ -4,6 +4,8 @@ Validation functions for AI Medical Chatbot
 import re
 from typing import Tuple, Optional, List
 
+from .keyword_matcher import emergency_matcher
+
 def validate_email(email: str) -> Tuple[bool, str]:
     if not email:
         return False, "Email is required"
@@ -20,13 +22,5 @@ def validate_password(password: str) -> Tuple[bool, str]:
     return True, "Valid password"
 
 def contains_emergency_keywords(text: str) -> Tuple[bool, List[str]]:
-    emergency_keywords = [
-        'heart attack', 'stroke', 'chest pain', 'can\'t breathe',
-        'difficulty breathing', 'severe pain', 'unconscious'
-    ]
-    found = []
-    text_lower = text.lower()
-    for keyword in emergency_keywords:
-        if keyword in text_lower:
-            found.append(keyword)
+    found = emergency_matcher.keywords_in(text)
     return len(found) > 0, found